@@ -1,31 +1,39 @@
-import os, threading, asyncio, json
-from flask import Flask, render_template, request, jsonify, abort
+import os, threading, asyncio, json, queue
+import concurrent.futures
+from flask import Flask, Response, g, render_template, request, jsonify, abort, stream_with_context
 import jwt
 from datetime import datetime, timedelta
+from chatbot.admission import AdmissionController, AdmissionRejected
+from chatbot.config import CHAT_TIMEOUT
 from chatbot.database import auth_user, init_db
-from chatbot.mcp.client_sse import InteractiveBankingAssistant
+from chatbot.logger import get_logger, request_id_context, request_id_from_header, request_id_var, with_request_id
+from chatbot.metrics import render_metrics
+from chatbot.session_manager import SessionManager
 
 # Initialize Flask app pointing to local templates/ and static/
 app = Flask(__name__, template_folder="templates", static_folder="static")
+logger = get_logger("app")
 
 # JWT configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your_secret_key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
 
-# Instantiate & initialize the assistant at startup
-assistant = InteractiveBankingAssistant()
+# One assistant per logged-in user, created lazily on their first message
+session_manager = SessionManager()
 
 # Spin up a dedicated loop in a background thread
 background_loop = asyncio.new_event_loop()
 def _start_background_loop(loop):
     asyncio.set_event_loop(loop)
-    loop.run_until_complete(assistant.initialize_session())
     loop.run_forever()
 
 t = threading.Thread(target=_start_background_loop, args=(background_loop,), daemon=True)
 t.start()
 
+# Bound how much work can be in flight or waiting on the background loop
+admission = AdmissionController(background_loop)
+
 # Helpers for JWT
 def create_access_token(username: str) -> str:
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -45,6 +53,17 @@ def verify_access_token(token: str) -> str:
     except jwt.InvalidTokenError:
         abort(401, "Invalid token")
 
+# Tag each request, and everything logged while handling it, with a request ID
+@app.before_request
+def _assign_request_id():
+    g.request_id = request_id_from_header(request.headers.get("X-Request-ID"))
+    request_id_var.set(g.request_id)
+
+@app.after_request
+def _return_request_id(response):
+    response.headers["X-Request-ID"] = g.get("request_id", "-")
+    return response
+
 # Routes
 @app.route("/", methods=["GET"])
 def index():
@@ -79,14 +98,23 @@ def chat():
     if not msg:
         return jsonify({"reply": "💡 I didn’t get any text."}), 400
 
-    # 5) Schedule your send_message onto the background loop
-    future = asyncio.run_coroutine_threadsafe(
-        assistant.send_message(msg),
-        background_loop
-    )
+    # 5) Schedule the user's own assistant onto the background loop, if there is room
+    request_id = g.request_id
+    try:
+        future = admission.submit(
+            user, lambda: with_request_id(request_id, session_manager.send_message(user, msg)))
+    except AdmissionRejected as e:
+        logger.warning("Chat request rejected with %s: %s", e.status_code, e)
+        return _rejected_response(e)
     try:
-        result = future.result(timeout=30)   # wait up to 30s
+        result = future.result(timeout=CHAT_TIMEOUT)
+    except concurrent.futures.TimeoutError:
+        # Stop the work instead of leaving it running after we've given up
+        future.cancel()
+        logger.warning("Chat request timed out after %ss", CHAT_TIMEOUT)
+        return jsonify({"reply": "⌛ The assistant took too long to respond. Please try again."}), 504
     except Exception as e:
+        logger.exception("Chat request failed")
         return jsonify({"reply": f"❌ Internal error: {e}"}), 500
 
     # 6) Handle the two possible return types
@@ -102,6 +130,101 @@ def chat():
     # Otherwise, just stringify the payload
     return jsonify({"reply": json.dumps(result, indent=2)})
 
+def _sse_event(data: dict, event: str = None) -> str:
+    """Encode one server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+def _rejected_response(error: AdmissionRejected):
+    """Turn an admission rejection into a 429/503 with a Retry-After header."""
+    response = jsonify({"reply": f"⏳ {error} Please try again in a moment."})
+    response.status_code = error.status_code
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+def _start_stream(user: str, agen, request_id: str):
+    """
+    Admit an async generator and start driving it on the background loop.
+
+    Returns the future for the pump and the queue its items are delivered on.
+    """
+    chunks = queue.Queue()
+
+    async def pump():
+        with request_id_context(request_id):
+            try:
+                async for chunk in agen:
+                    chunks.put(("chunk", chunk))
+            except Exception as e:
+                logger.exception("Streamed chat request failed")
+                chunks.put(("error", str(e)))
+            finally:
+                await agen.aclose()
+                chunks.put(("done", None))
+
+    return admission.submit(user, pump), chunks
+
+def _drain_stream(future, chunks):
+    """Yield the items a pump delivers until it is done."""
+    try:
+        while True:
+            kind, value = chunks.get(timeout=CHAT_TIMEOUT)
+            if kind == "done":
+                return
+            yield kind, value
+    finally:
+        # Also reached when the client disconnects mid-stream
+        future.cancel()
+
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    auth_header = request.headers.get("Authorization", "")
+    if not auth_header.startswith("Bearer "):
+        return jsonify({"reply": "🔒 Please login to continue."}), 401
+    token = auth_header.split(" ", 1)[1]
+    user = verify_access_token(token)
+
+    msg = request.json.get("message", "").strip()
+    if not msg:
+        return jsonify({"reply": "💡 I didn’t get any text."}), 400
+
+    try:
+        future, chunks = _start_stream(user, session_manager.stream_message(user, msg), g.request_id)
+    except AdmissionRejected as e:
+        logger.warning("Streamed chat request rejected with %s: %s", e.status_code, e)
+        return _rejected_response(e)
+
+    def generate():
+        try:
+            for kind, value in _drain_stream(future, chunks):
+                if kind == "error":
+                    yield _sse_event({"error": f"❌ Internal error: {value}"}, event="error")
+                    return
+                yield _sse_event({"delta": value})
+        except queue.Empty:
+            yield _sse_event({"error": "❌ Internal error: response timed out"}, event="error")
+            return
+        yield _sse_event({}, event="done")
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/sessions/stats", methods=["GET"])
+def session_stats():
+    return jsonify(session_manager.stats())
+
+@app.route("/admission/stats", methods=["GET"])
+def admission_stats():
+    return jsonify(admission.stats())
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
 if __name__ == "__main__":
     init_db()
     # Turn off the reloader
@@ -2,8 +2,8 @@ from datetime import date
 from datetime import timedelta
 from decimal import Decimal
 import chatbot.database
-from chatbot.models import Account
-from chatbot.database import load_accounts, load_transfer_target_accounts, transfer_fund_between_accounts
+from chatbot.models import Account, Transfer, TransferOutcome
+from chatbot.database import load_accounts, load_transfer_target_accounts, transfer_fund_between_accounts, transfer_many
 
 
 def list_accounts(user_id: str) -> list[Account]:
@@ -38,3 +38,14 @@ def transfer_between_accounts(user_id: str,
     :param to_account: The account number or account name that the fund will be transfered to.
     """
     transfer_fund_between_accounts(user_id, from_account, to_account, amount)
+
+
+def transfer_many_between_accounts(user_id: str, transfers: list[Transfer]) -> list[TransferOutcome]:
+    """
+    Apply a batch of transfers between the same owner's accounts, all or nothing.
+
+    :param user_id: The user ID of the account owner.
+    :param transfers: The transfers to apply, in order; those with an idempotency key already used by the owner are skipped.
+    :return: One outcome per requested transfer, saying whether it was applied or was a duplicate.
+    """
+    return transfer_many(user_id, transfers)
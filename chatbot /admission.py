@@ -0,0 +1,153 @@
+"""Admission control for work scheduled onto the background event loop."""
+import asyncio
+import math
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict
+
+from chatbot.config import (
+    ADMISSION_MAX_CONCURRENCY, ADMISSION_MAX_QUEUE,
+    ADMISSION_MAX_PER_USER, ADMISSION_RETRY_AFTER
+)
+from chatbot.metrics import ADMISSION_EXECUTION, ADMISSION_QUEUE_WAIT, ADMISSION_REJECTED
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted right now."""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class _Timing:
+    """Running count, total and maximum of a duration in seconds."""
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.histogram.observe(seconds)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg_seconds": self.total / self.count if self.count else 0.0,
+            "max_seconds": self.max,
+        }
+
+
+class AdmissionController:
+    """
+    Bounded admission queue in front of coroutines run on a background loop.
+
+    At most ``max_concurrency`` coroutines run at once and at most ``max_queue``
+    more wait for a slot.  Anything beyond that is rejected immediately with a
+    503, and a user with ``max_per_user`` requests already pending gets a 429.
+    ``submit`` is called from Flask worker threads; the coroutines themselves
+    run on ``loop``.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop,
+                 max_concurrency: int = ADMISSION_MAX_CONCURRENCY,
+                 max_queue: int = ADMISSION_MAX_QUEUE,
+                 max_per_user: int = ADMISSION_MAX_PER_USER,
+                 retry_after: int = ADMISSION_RETRY_AFTER):
+        self.loop = loop
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._per_user = Counter()
+        self._semaphore = None
+        self._rejected = Counter()
+        self._cancelled = 0
+        self.queue_wait = _Timing(ADMISSION_QUEUE_WAIT)
+        self.execution = _Timing(ADMISSION_EXECUTION)
+
+    def submit(self, user_id: str, coro_factory: Callable[[], Awaitable[Any]]) -> Future:
+        """
+        Admit a request and schedule it on the loop.
+
+        :param user_id: The user the work is for, used for the per-user limit.
+        :param coro_factory: Called on the loop to create the coroutine once a slot is free.
+        :return: A future for the result; cancelling it cancels the coroutine.
+        :raises AdmissionRejected: If the user or the whole queue is at capacity.
+        """
+        with self._lock:
+            if self._per_user[user_id] >= self.max_per_user:
+                self._rejected[429] += 1
+                ADMISSION_REJECTED.labels("429").inc()
+                raise AdmissionRejected("Too many requests in progress for this user.",
+                                        429, self.retry_after)
+            if self._pending >= self.max_concurrency + self.max_queue:
+                self._rejected[503] += 1
+                ADMISSION_REJECTED.labels("503").inc()
+                raise AdmissionRejected("The assistant is busy.", 503, self._estimate_retry_after())
+            self._pending += 1
+            self._per_user[user_id] += 1
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._run(coro_factory, time.monotonic()), self.loop
+        )
+        # Done callbacks fire even if the future is cancelled before the coroutine starts
+        future.add_done_callback(lambda f: self._release(user_id, f))
+        return future
+
+    def _release(self, user_id: str, future: Future):
+        with self._lock:
+            self._pending -= 1
+            self._per_user[user_id] -= 1
+            if self._per_user[user_id] <= 0:
+                del self._per_user[user_id]
+            if future.cancelled():
+                self._cancelled += 1
+
+    async def _run(self, coro_factory: Callable[[], Awaitable[Any]], submitted: float):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            started = time.monotonic()
+            self.queue_wait.observe(started - submitted)
+            self._running += 1
+            try:
+                return await coro_factory()
+            finally:
+                self._running -= 1
+                self.execution.observe(time.monotonic() - started)
+
+    def _estimate_retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up, from average execution time."""
+        if not self.execution.count:
+            return self.retry_after
+        avg = self.execution.total / self.execution.count
+        waves = self._pending / max(self.max_concurrency, 1)
+        return max(self.retry_after, math.ceil(avg * waves))
+
+    def stats(self) -> Dict[str, Any]:
+        """Report current load, rejections and queue-wait vs execution time."""
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "max_per_user": self.max_per_user,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "rejected_429": self._rejected[429],
+                "rejected_503": self._rejected[503],
+                "cancelled": self._cancelled,
+                "queue_wait": self.queue_wait.as_dict(),
+                "execution": self.execution.as_dict(),
+            }
@@ -0,0 +1,124 @@
+"""
+Async versions of the data-access functions, for code running on an event loop.
+
+The functions in ``chatbot.database`` block on SQLite.  Called from an async
+MCP tool they would stall every other client on the server while a query runs
+or a transfer waits for the write lock, so here each call runs on a dedicated
+thread pool instead: reads on ``DB_READ_WORKERS`` threads, writes on
+``DB_WRITE_WORKERS`` (one by default, since SQLite allows a single writer and
+queueing in-process is cheaper than spinning on ``busy_timeout``).  Every pool
+thread keeps its own persistent connection from ``chatbot.db_connection``, and
+runs the call in the caller's context so log lines keep their request ID.
+
+Transfers are queued for ``chatbot.write_queue``'s single writer thread when
+group commit is on (``DB_GROUP_COMMIT_ENABLED``), which commits the writes that
+arrive together in one transaction.
+
+With ``DB_ASYNC_ENABLED=0`` the calls run inline on the loop, as before.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Callable, Dict, Optional, TypeVar
+
+from chatbot import database
+from chatbot.config import DB_ASYNC_ENABLED, DB_GROUP_COMMIT_ENABLED, DB_READ_WORKERS, DB_WRITE_WORKERS
+from chatbot.metrics import DB_EXECUTOR_IN_FLIGHT, DB_EXECUTOR_WAIT, time_db
+from chatbot.models import Account, Transfer, TransferOutcome
+
+T = TypeVar("T")
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _executor(kind: str) -> ThreadPoolExecutor:
+    """The read or write thread pool, created on first use."""
+    executor = _executors.get(kind)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(kind)
+            if executor is None:
+                workers = DB_READ_WORKERS if kind == "read" else DB_WRITE_WORKERS
+                executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"db-{kind}")
+                _executors[kind] = executor
+    return executor
+
+
+async def _run(kind: str, function: Callable[..., T], *args) -> T:
+    if not DB_ASYNC_ENABLED:
+        return function(*args)
+
+    queued = time.perf_counter()
+    context = contextvars.copy_context()
+
+    def call():
+        DB_EXECUTOR_WAIT.labels(kind).observe(time.perf_counter() - queued)
+        return context.run(function, *args)
+
+    DB_EXECUTOR_IN_FLIGHT.labels(kind).inc()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor(kind), call)
+    finally:
+        DB_EXECUTOR_IN_FLIGHT.labels(kind).dec()
+
+
+async def run_read(function: Callable[..., T], *args) -> T:
+    """Run a function that only reads the database on the read executor."""
+    return await _run("read", function, *args)
+
+
+async def run_write(function: Callable[..., T], *args) -> T:
+    """Run a function that writes to the database on the write executor."""
+    return await _run("write", function, *args)
+
+
+def shutdown():
+    """Stop the executors after their queued calls finish; they are recreated on next use."""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=True)
+
+
+async def load_accounts(user_id: str) -> list[Account]:
+    """Async ``database.load_accounts``."""
+    return await run_read(database.load_accounts, user_id)
+
+
+async def load_transfer_target_accounts(user_id: str, from_account: str) -> list[Account]:
+    """Async ``database.load_transfer_target_accounts``."""
+    return await run_read(database.load_transfer_target_accounts, user_id, from_account)
+
+
+async def load_transaction_history(account_number: str, start_date: str, limit: int,
+                                   cursor: Optional[str] = None):
+    """Async ``database.load_transaction_history``."""
+    return await run_read(database.load_transaction_history, account_number, start_date, limit, cursor)
+
+
+async def load_balance_as_of(account_number: str, as_of: str) -> Optional[Decimal]:
+    """Async ``database.load_balance_as_of``."""
+    return await run_read(database.load_balance_as_of, account_number, as_of)
+
+
+async def _write(name: str, write: Callable[..., T], *args) -> T:
+    """
+    Run ``write(connection, *args)`` in a write transaction.
+
+    With group commit the write goes straight onto the writer thread's queue and the
+    loop awaits its commit, so no executor thread is tied up waiting for the writer.
+    """
+    if DB_ASYNC_ENABLED and DB_GROUP_COMMIT_ENABLED:
+        with time_db(name):
+            return await asyncio.wrap_future(database.write_queue.submit(write, *args))
+    return await run_write(database.run_in_write_transaction, write, *args)
+
+
+async def transfer_many(user_id: str, transfers: list[Transfer]) -> list[TransferOutcome]:
+    """Async ``database.transfer_many``."""
+    return await _write("transfer_many", database.apply_transfers, user_id, transfers)
@@ -0,0 +1,132 @@
+"""
+Latency of point-in-time balance lookups from checkpoints versus summing the history.
+
+Builds scratch databases from the schema migrations in which one pair of
+accounts has exchanged ``--transfers`` transfers over the past year (for each
+history length in ``--transfers``), with their balances stored on each transfer
+like the transfer functions store them.  Times ``load_balance_as_of`` at
+random moments against a full scan that adds up every transfer up to the
+moment, and exits with status 1 if the two ever disagree, so it doubles as a
+check of the checkpoint triggers.  The transfers are inserted in time order,
+so adding them up by time and by sequence number gives the same balances.
+
+Example::
+
+    python -m chatbot.benchmarks.balance_as_of --transfers 1000 10000 100000
+"""
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+from chatbot.database import (BALANCE_CHECKPOINT_SQL, BALANCE_CUTOFF_SQL, BALANCE_DELTA_SQL, apply_migrations,
+                              explain_query_plan, load_balance_as_of, utc_timestamp)
+from chatbot.db_connection import ConnectionProvider, adapt_money
+
+OPENING_BALANCE = Decimal(100000)
+
+FULL_SCAN_SQL = """
+    SELECT CASE WHEN ToAccountNumber = :account_number THEN Amount ELSE -Amount END AS "amount [CENTS]"
+    FROM Transfers
+    WHERE (FromAccountNumber = :account_number OR ToAccountNumber = :account_number)
+    AND TransferDateTime <= :as_of
+"""
+
+
+def seed(con: sqlite3.Connection, transfers: int, seed: int) -> tuple[datetime, datetime]:
+    """Two accounts of one owner moving random amounts back and forth over the past year."""
+    rng = random.Random(seed)
+    balances = {"1000000001": OPENING_BALANCE, "1000000002": OPENING_BALANCE}
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=365)
+    times = sorted(start + timedelta(seconds=rng.randrange(365 * 24 * 3600)) for _ in range(transfers))
+    rows = []
+    for index, transfer_time in enumerate(times):
+        source, destination = rng.sample(sorted(balances), 2)
+        amount = Decimal(rng.randint(1, 5000)) / 100
+        balances[source] -= amount
+        balances[destination] += amount
+        rows.append((f"T{index:09d}", source, destination, utc_timestamp(transfer_time), adapt_money(amount),
+                     adapt_money(balances[source]), adapt_money(balances[destination])))
+    with con:
+        con.execute("INSERT INTO UserCredentials (UserId, Password) VALUES ('bench', 'password')")
+        con.executemany("INSERT INTO Accounts (AccountNumber, UserId, AccountName, Balance, CurrencyCode) "
+                        "VALUES (?, 'bench', 'Chequing', ?, 'CAD')",
+                        [(number, adapt_money(OPENING_BALANCE)) for number in balances])
+        con.executemany(
+            "INSERT INTO Transfers (TransactionNumber, FromAccountNumber, ToAccountNumber, TransferDateTime, "
+            "Amount, FromAccountBalance, ToAccountBalance) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        con.executemany("UPDATE Accounts SET Balance=? WHERE AccountNumber=?",
+                        [(adapt_money(balance), number) for number, balance in balances.items()])
+    con.execute("ANALYZE")
+    return start, end
+
+
+def full_scan_balance(con: sqlite3.Connection, account_number: str, as_of: str) -> Decimal:
+    balance = OPENING_BALANCE
+    for row in con.execute(FULL_SCAN_SQL, {"account_number": account_number, "as_of": as_of}):
+        balance += row[0]
+    return balance
+
+
+def run(transfers: int, args, directory: str) -> dict:
+    db_file = str(Path(directory) / f"bench-{transfers}.db")
+    con = sqlite3.connect(db_file, isolation_level=None)
+    apply_migrations(con)
+    start, end = seed(con, transfers, args.seed)
+    con.close()
+
+    # The tools' connection setup, so the timings match what they see
+    provider = ConnectionProvider(db_file)
+    con = provider.connection()
+    rng = random.Random(args.seed)
+    moments = [utc_timestamp(start + (end - start) * rng.random()) for _ in range(args.repeat)]
+    accounts = ["1000000001", "1000000002"]
+
+    started = time.perf_counter()
+    checkpointed = [load_balance_as_of(accounts[index % 2], as_of, con) for index, as_of in enumerate(moments)]
+    checkpoint_ms = (time.perf_counter() - started) / len(moments) * 1e3
+
+    started = time.perf_counter()
+    scanned = [full_scan_balance(con, accounts[index % 2], as_of) for index, as_of in enumerate(moments)]
+    scan_ms = (time.perf_counter() - started) / len(moments) * 1e3
+
+    params = {"account_number": accounts[0], "as_of": moments[0], "since_sequence": 0, "until_sequence": 1}
+    result = {
+        "checkpoints": con.execute("SELECT COUNT(*) FROM BalanceCheckpoints").fetchone()[0],
+        "checkpoint_ms": round(checkpoint_ms, 3),
+        "full_scan_ms": round(scan_ms, 3),
+        "speedup": round(scan_ms / checkpoint_ms, 1),
+        "mismatches": sum(a != b for a, b in zip(checkpointed, scanned)),
+        "cutoff_plan": explain_query_plan(BALANCE_CUTOFF_SQL, params, con),
+        "checkpoint_plan": explain_query_plan(BALANCE_CHECKPOINT_SQL, params, con),
+        "delta_plan": explain_query_plan(BALANCE_DELTA_SQL, params, con),
+    }
+    provider.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transfers", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="history lengths to measure")
+    parser.add_argument("--repeat", type=int, default=200, help="lookups timed per history length")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = {str(transfers): run(transfers, args, directory) for transfers in args.transfers}
+
+    print(json.dumps(results, indent=2))
+    if any(result["mismatches"] for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
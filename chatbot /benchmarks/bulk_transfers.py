@@ -0,0 +1,92 @@
+"""
+Transfers per second applied one at a time versus in ``transfer_many`` batches.
+
+Seeds a scratch database with ``--users`` owners, then moves money between
+their accounts ``--transfers`` times: once with one transaction per transfer
+(``transfer_fund_between_accounts``) and once with ``transfer_many`` in batches
+of ``--batch-size``, every transfer carrying an idempotency key.  Finally it
+replays the first batch to confirm that the retry applies nothing.
+
+Example::
+
+    python -m chatbot.benchmarks.bulk_transfers --transfers 20000 --batch-size 500
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--transfers", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="chatbot-bulk-")
+    # The data-access functions use the database named in the environment when first imported
+    os.environ["CHATBOT_DB_FILE"] = str(Path(workdir) / "bench.db")
+    from chatbot.database import init_db, transfer_fund_between_accounts, transfer_many
+    from chatbot.loadtest.run import seed_users
+    from chatbot.loadtest.stub_gemini import loadtest_account_number, loadtest_user_id
+    from chatbot.models import Transfer
+
+    init_db()
+    seed_users(os.environ["CHATBOT_DB_FILE"], args.users)
+
+    rng = random.Random(args.seed)
+    kinds = ("chequing", "savings", "credit")
+    requests = []
+    for index in range(args.transfers):
+        owner = rng.randint(1, args.users)
+        source, destination = rng.sample(kinds, 2)
+        requests.append((loadtest_user_id(owner), Transfer(
+            loadtest_account_number(owner, source), loadtest_account_number(owner, destination),
+            Decimal(rng.randint(1, 5000)) / 100, f"bench-{index}")))
+
+    single = requests[:max(1, args.transfers // 10)]
+    started = time.perf_counter()
+    for user_id, transfer in single:
+        transfer_fund_between_accounts(user_id, transfer.from_account, transfer.to_account, transfer.amount)
+    single_rate = len(single) / (time.perf_counter() - started)
+
+    # A batch belongs to one owner, like a sweep between one tenant's accounts
+    by_user = {}
+    for user_id, transfer in requests:
+        by_user.setdefault(user_id, []).append(transfer)
+    batches = [(user_id, transfers[start:start + args.batch_size])
+               for user_id, transfers in by_user.items()
+               for start in range(0, len(transfers), args.batch_size)]
+    started = time.perf_counter()
+    for user_id, batch in batches:
+        transfer_many(user_id, batch)
+    batch_rate = len(requests) / (time.perf_counter() - started)
+
+    retried = transfer_many(*batches[0])
+    con = sqlite3.connect(os.environ["CHATBOT_DB_FILE"])
+    stored = con.execute("SELECT COUNT(*) FROM Transfers").fetchone()[0]
+    con.close()
+
+    print(json.dumps({
+        "transfers": args.transfers,
+        "batch_size": args.batch_size,
+        "batches": len(batches),
+        "single_transfers_per_s": round(single_rate),
+        "batched_transfers_per_s": round(batch_rate),
+        "speedup": round(batch_rate / single_rate, 1),
+        "retry_duplicates": sum(outcome.duplicate for outcome in retried),
+        "retry_batch_size": len(retried),
+        "transfers_stored": stored,
+        "expected_stored": len(single) + len(requests),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
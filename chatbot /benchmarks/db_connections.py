@@ -0,0 +1,90 @@
+"""
+Connect-per-call versus per-thread persistent SQLite connections.
+
+Seeds a scratch copy of the schema, then has each of ``--threads`` threads run
+the balance lookup the tools make most often, once opening and closing a
+connection around every query (the previous behaviour) and once through a
+``ConnectionProvider``, and reports queries per second and the mean latency.
+
+Example::
+
+    python -m chatbot.benchmarks.db_connections --threads 8 --queries 2000
+"""
+import argparse
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from chatbot.database import apply_migrations
+from chatbot.db_connection import ConnectionProvider
+
+QUERY = "SELECT AccountNumber, AccountName, Balance FROM Accounts WHERE UserId=:user_id"
+
+
+def connect_per_call(db_file: str):
+    def query():
+        con = sqlite3.connect(db_file)
+        con.row_factory = sqlite3.Row
+        con.execute(QUERY, {"user_id": "test1"}).fetchall()
+        con.close()
+    return query
+
+
+def persistent(provider: ConnectionProvider):
+    def query():
+        provider.connection().execute(QUERY, {"user_id": "test1"}).fetchall()
+    return query
+
+
+def measure(query, threads: int, queries: int) -> dict:
+    """Run ``queries`` calls of ``query`` on each of ``threads`` threads at once."""
+    start = threading.Barrier(threads + 1)
+
+    def worker():
+        start.wait()
+        for _ in range(queries):
+            query()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    total = threads * queries
+    return {"queries_per_s": round(total / elapsed), "mean_us": round(elapsed * threads / total * 1e6, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=2000, help="queries per thread")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_file = str(Path(directory) / "bench.db")
+        con = sqlite3.connect(db_file, isolation_level=None)
+        apply_migrations(con)
+        con.close()
+
+        provider = ConnectionProvider(db_file)
+        measure(connect_per_call(db_file), 1, 50)
+        per_call = measure(connect_per_call(db_file), args.threads, args.queries)
+        reused = measure(persistent(provider), args.threads, args.queries)
+        print(json.dumps({
+            "threads": args.threads,
+            "queries_per_thread": args.queries,
+            "connect_per_call": per_call,
+            "persistent": reused,
+            "speedup": round(reused["queries_per_s"] / per_call["queries_per_s"], 2),
+            "provider": provider.stats(),
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
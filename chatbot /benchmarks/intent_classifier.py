@@ -0,0 +1,99 @@
+"""
+Accuracy and latency of the local intent classifier.
+
+Accuracy is measured by k-fold cross-validation over the labeled utterance
+file; latency is the time per message of ``predict`` on one message at a time
+and on a batch.
+
+Example::
+
+    python -m chatbot.benchmarks.intent_classifier --folds 5 --repeat 2000
+"""
+import argparse
+import json
+import random
+import time
+from collections import Counter
+from pathlib import Path
+
+from chatbot.config import INTENT_UTTERANCES_FILE
+from chatbot.intent_classifier import IntentClassifier
+
+SAMPLE_MESSAGES = [
+    "What's my savings account balance?",
+    "Show me my chequing transactions for the last 2 weeks",
+    "Transfer $250 from chequing to savings please",
+    "What is the annual fee on the RBC Avion credit card?",
+    "thanks so much",
+    "Who won the game last night?",
+    "Can you write me a haiku about autumn?",
+    "hey there",
+]
+
+
+def load_utterances(path):
+    pairs = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        if line.strip() and not line.startswith("#"):
+            label, text = line.split("\t", 1)
+            pairs.append((label.strip(), text.strip()))
+    return pairs
+
+
+def cross_validate(pairs, folds: int, seed: int) -> dict:
+    """Accuracy of models trained on all but one fold and tested on that fold."""
+    shuffled = list(pairs)
+    random.Random(seed).shuffle(shuffled)
+    correct = 0
+    errors = Counter()
+    for fold in range(folds):
+        test = shuffled[fold::folds]
+        train = [pair for i, pair in enumerate(shuffled) if i % folds != fold]
+        model = IntentClassifier().fit([text for _, text in train], [label for label, _ in train])
+        for (label, _), prediction in zip(test, model.predict([text for _, text in test])):
+            if prediction.label == label:
+                correct += 1
+            else:
+                errors[f"{label} -> {prediction.label}"] += 1
+    return {"accuracy": round(correct / len(shuffled), 3), "confusions": dict(errors.most_common(10))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", default=str(INTENT_UTTERANCES_FILE), help="labeled utterance file")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=2000, help="passes over the sample messages")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    pairs = load_utterances(args.file)
+    started = time.perf_counter()
+    model = IntentClassifier.from_file(args.file)
+    train_ms = (time.perf_counter() - started) * 1e3
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        for message in SAMPLE_MESSAGES:
+            model.predict([message])
+    single_us = (time.perf_counter() - started) / (args.repeat * len(SAMPLE_MESSAGES)) * 1e6
+
+    batch = SAMPLE_MESSAGES * 16
+    started = time.perf_counter()
+    for _ in range(max(1, args.repeat // 16)):
+        model.predict(batch)
+    batch_us = (time.perf_counter() - started) / (max(1, args.repeat // 16) * len(batch)) * 1e6
+
+    print(json.dumps({
+        "utterances": len(pairs),
+        "intents": model.labels,
+        "train_ms": round(train_ms, 2),
+        "single_us_per_message": round(single_us, 2),
+        "batch_us_per_message": round(batch_us, 2),
+        "cross_validation": cross_validate(pairs, args.folds, args.seed),
+        "samples": {message: [prediction.label, round(prediction.confidence, 3)]
+                    for message, prediction in zip(SAMPLE_MESSAGES, model.predict(SAMPLE_MESSAGES))},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Micro-benchmark of IntentDetector's keyword matching.
+
+Runs every intent check the assistant makes on a message (command, greeting,
+farewell, banking, transfer and account lookup) over a set of typical chat
+messages, once with the previous per-table substring scans and once with the
+compiled single-pass matcher, and reports the time per message.
+
+Example::
+
+    python -m chatbot.benchmarks.intent_matching --repeat 2000
+"""
+import argparse
+import json
+import time
+
+from chatbot.config import ACCOUNT_MAPPINGS
+from chatbot.config_client import BANKING_DOMAINS, COMMANDS, FAREWELL_PATTERNS, GREETING_PATTERNS
+from chatbot.intent_detector import KeywordMatcher
+
+MESSAGES = [
+    "What's my savings account balance?",
+    "Show me my chequing transactions for the last 2 weeks",
+    "Transfer $250 from chequing to savings please",
+    "hello",
+    "Hi there, can you tell me about RRSP contribution limits?",
+    "What is the annual fee on the RBC Avion credit card?",
+    "Please discard my last message",
+    "How do I set up online banking on my phone?",
+    "What's the weather like in Toronto today?",
+    "bye",
+    "clear history",
+    "Can I move money between my TFSA and my chequing account without penalties?",
+]
+
+TRANSFER_KEYWORDS = ["transfer", "send", "move money", "move funds"]
+
+
+def legacy_checks(text: str) -> tuple:
+    """The checks as they were written before the matcher: one lower-case and list scan each."""
+    text_lower = text.strip().lower()
+    command = None
+    if any(text_lower == cmd for cmd in COMMANDS["exit"]):
+        command = "exit"
+    elif any(text_lower == cmd for cmd in COMMANDS["clear"]):
+        command = "clear"
+    greeting = (text_lower in GREETING_PATTERNS or text_lower + "!" in GREETING_PATTERNS or
+                text_lower.startswith("hello") or text_lower.startswith("hi "))
+    farewell = any(text_lower == pattern or text_lower.startswith(pattern + " ") for pattern in FAREWELL_PATTERNS)
+    banking = any(domain in text.lower() for domain in BANKING_DOMAINS)
+    transfer = any(keyword in text.lower() for keyword in TRANSFER_KEYWORDS)
+    account = None
+    for key, value in ACCOUNT_MAPPINGS.items():
+        if key in text.lower():
+            account = value
+            break
+    return command, greeting, farewell, banking, transfer, account
+
+
+def matcher_checks(matcher: KeywordMatcher, text: str) -> tuple:
+    """The same checks answered from one scan."""
+    matches = matcher.scan(text)
+    command = "exit" if "command:exit" in matches.whole else "clear" if "command:clear" in matches.whole else None
+    return (command,
+            "greeting" in matches.whole or "leading_greeting" in matches.leading,
+            "farewell" in matches.leading,
+            "banking" in matches.categories,
+            "transfer" in matches.categories,
+            matches.accounts[0] if matches.accounts else None)
+
+
+def measure(check, repeat: int) -> float:
+    """Microseconds per message for ``check`` over MESSAGES."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for message in MESSAGES:
+            check(message)
+    return (time.perf_counter() - started) / (repeat * len(MESSAGES)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="passes over the message set")
+    args = parser.parse_args()
+
+    matcher = KeywordMatcher()
+    measure(legacy_checks, 50)
+    measure(lambda text: matcher_checks(matcher, text), 50)
+
+    legacy_us = measure(legacy_checks, args.repeat)
+    matcher_us = measure(lambda text: matcher_checks(matcher, text), args.repeat)
+    differences = [
+        {"message": message, "legacy": legacy_checks(message), "matcher": matcher_checks(matcher, message)}
+        for message in MESSAGES if legacy_checks(message) != matcher_checks(matcher, message)
+    ]
+    print(json.dumps({
+        "messages": len(MESSAGES),
+        "repeat": args.repeat,
+        "legacy_us_per_message": round(legacy_us, 2),
+        "matcher_us_per_message": round(matcher_us, 2),
+        "speedup": round(legacy_us / matcher_us, 2),
+        "differences": differences,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Throughput of the MCP server's banking tools with blocking and async database access.
+
+Starts the load-test MCP server twice against a fresh seeded database, once
+with ``DB_ASYNC_ENABLED=0`` (queries run on the event loop, as the tools used
+to) and once with the read and write executors, and has ``--clients``
+concurrent MCP sessions call a mix of balance, history, account-list and
+transfer tools for ``--duration`` seconds.  Meanwhile a background writer in
+this process holds the database write lock for ``--lock-hold-ms`` every
+``--lock-interval-ms``, standing in for a slow transaction elsewhere; transfers
+that hit it wait for the lock, and with blocking access so does every client.
+
+Reports tool calls per second and latency percentiles for each mode.
+
+Example::
+
+    python -m chatbot.benchmarks.mcp_db_throughput --clients 8 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+from chatbot.database import apply_migrations
+from chatbot.loadtest.run import percentile, seed_users, wait_for_port
+from chatbot.loadtest.stub_gemini import loadtest_account_number, loadtest_user_id
+
+MIX = {"get_account_balance": 4, "get_transaction_history": 3, "list_user_accounts": 2, "transfer_funds": 1}
+
+
+def tool_args(tool: str, index: int) -> dict:
+    user_id = loadtest_user_id(index)
+    if tool == "transfer_funds":
+        return {"user_id": user_id, "from_account": loadtest_account_number(index, "chequing"),
+                "to_account": loadtest_account_number(index, "savings"), "amount": "1.00"}
+    if tool == "list_user_accounts":
+        return {"user_id": user_id}
+    return {"user_id": user_id, "account_number": loadtest_account_number(index, "chequing")}
+
+
+def hold_write_lock(db_file: str, hold_ms: float, interval_ms: float, stop: threading.Event):
+    """Periodically take and hold the database write lock, like a slow writer in another process."""
+    con = sqlite3.connect(db_file, isolation_level=None)
+    while not stop.wait(interval_ms / 1000):
+        con.execute("BEGIN IMMEDIATE")
+        time.sleep(hold_ms / 1000)
+        con.execute("COMMIT")
+    con.close()
+
+
+async def client(url: str, index: int, deadline: float, latencies: dict, errors: Counter, seed: int):
+    rng = random.Random(seed + index)
+    tools, weights = list(MIX), list(MIX.values())
+    async with sse_client(url) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            while time.monotonic() < deadline:
+                tool = rng.choices(tools, weights)[0]
+                started = time.perf_counter()
+                result = await session.call_tool(tool, tool_args(tool, index))
+                latencies[tool].append(time.perf_counter() - started)
+                if result.isError or (result.structuredContent or {}).get("success") is False:
+                    errors[tool] += 1
+
+
+async def drive(url: str, clients: int, users: int, duration: float, seed: int):
+    latencies, errors = defaultdict(list), Counter()
+    deadline = time.monotonic() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(client(url, 1 + index % users, deadline, latencies, errors, seed)
+                           for index in range(clients)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "calls": len(values),
+        "errors": errors,
+        "calls_per_s": round(len(values) / elapsed, 1),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+    }
+
+
+def run_mode(async_enabled: bool, args, workdir: str) -> dict:
+    db_file = os.path.join(workdir, f"bench-{'async' if async_enabled else 'sync'}.db")
+    con = sqlite3.connect(db_file, isolation_level=None)
+    apply_migrations(con)
+    con.close()
+    seed_users(db_file, args.users)
+
+    env = dict(os.environ, CHATBOT_DB_FILE=db_file, MCP_PORT=str(args.mcp_port),
+               DB_ASYNC_ENABLED="1" if async_enabled else "0", LOG_LEVEL="WARNING")
+    log = open(os.path.join(workdir, "server.log"), "a")
+    server = subprocess.Popen([sys.executable, "-m", "chatbot.loadtest.serve_mcp"],
+                              env=env, stdout=log, stderr=subprocess.STDOUT)
+    stop = threading.Event()
+    try:
+        wait_for_port("127.0.0.1", args.mcp_port, 60)
+        if args.lock_hold_ms > 0:
+            threading.Thread(target=hold_write_lock, daemon=True,
+                             args=(db_file, args.lock_hold_ms, args.lock_interval_ms, stop)).start()
+        latencies, errors, elapsed = asyncio.run(drive(f"http://127.0.0.1:{args.mcp_port}/sse", args.clients,
+                                                       args.users, args.duration, args.seed))
+    finally:
+        stop.set()
+        server.terminate()
+        server.wait()
+        log.close()
+
+    return {
+        "overall": summarize([value for values in latencies.values() for value in values],
+                             sum(errors.values()), elapsed),
+        "by_tool": {tool: summarize(values, errors[tool], elapsed) for tool, values in sorted(latencies.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=8, help="concurrent MCP sessions")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10, help="seconds per mode")
+    parser.add_argument("--lock-hold-ms", type=float, default=200, help="0 disables the background writer")
+    parser.add_argument("--lock-interval-ms", type=float, default=300)
+    parser.add_argument("--mcp-port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="chatbot-mcp-db-")
+    blocking = run_mode(False, args, workdir)
+    executor = run_mode(True, args, workdir)
+    print(json.dumps({
+        "clients": args.clients,
+        "duration_s": args.duration,
+        "lock_hold_ms": args.lock_hold_ms,
+        "lock_interval_ms": args.lock_interval_ms,
+        "blocking": blocking,
+        "async": executor,
+        "throughput_ratio": round(executor["overall"]["calls_per_s"] / blocking["overall"]["calls_per_s"], 2),
+        "server_log": str(Path(workdir) / "server.log"),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
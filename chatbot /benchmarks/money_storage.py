@@ -0,0 +1,74 @@
+"""
+Reading and summing money stored as NUMERIC versus as integer cents.
+
+Fills two scratch tables with the same ``--rows`` random amounts: one with a
+NUMERIC column read back with ``Decimal(str(value))`` per row, as the
+data-access functions used to, and one with a ``CENTS INTEGER`` column read
+back through the registered converter, with amounts bound as cents by
+``adapt_money``.  Times fetching every row as Decimal
+and a SQL ``SUM`` over the column, and compares each sum with the exact total.
+
+Example::
+
+    python -m chatbot.benchmarks.money_storage --rows 200000
+"""
+import argparse
+import json
+import random
+import sqlite3
+import time
+from decimal import Decimal
+
+# Importing it also registers the CENTS converter
+from chatbot.db_connection import adapt_money
+
+
+def best_of(repeat: int, function) -> float:
+    """Fastest of ``repeat`` runs, in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per timing; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    amounts = [Decimal(rng.randint(1, 500000)) / 100 for _ in range(args.rows)]
+    exact = sum(amounts)
+
+    con = sqlite3.connect(":memory:", detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
+    con.execute("CREATE TABLE Numeric (Amount NUMERIC NOT NULL)")
+    con.execute("CREATE TABLE Cents (Amount CENTS INTEGER NOT NULL)")
+    with con:
+        con.executemany("INSERT INTO Numeric (Amount) VALUES (?)", [(str(amount),) for amount in amounts])
+        con.executemany("INSERT INTO Cents (Amount) VALUES (?)", [(adapt_money(amount),) for amount in amounts])
+
+    numeric_sum = con.execute("SELECT SUM(Amount) FROM Numeric").fetchone()[0]
+    cents_sum = con.execute('SELECT SUM(Amount) AS "total [CENTS]" FROM Cents').fetchone()[0]
+    print(json.dumps({
+        "rows": args.rows,
+        "numeric_fetch_ms": round(best_of(args.repeat, lambda: [
+            Decimal(str(row[0])) for row in con.execute("SELECT Amount FROM Numeric")]), 1),
+        "cents_fetch_ms": round(best_of(args.repeat, lambda: con.execute("SELECT Amount FROM Cents").fetchall()), 1),
+        "numeric_sum_ms": round(best_of(args.repeat, lambda: con.execute(
+            "SELECT SUM(Amount) FROM Numeric").fetchone()), 2),
+        "cents_sum_ms": round(best_of(args.repeat, lambda: con.execute(
+            "SELECT SUM(Amount) FROM Cents").fetchone()), 2),
+        "exact_sum": str(exact),
+        "numeric_sum": repr(numeric_sum),
+        "numeric_sum_error": str(Decimal(str(numeric_sum)) - exact),
+        "cents_sum": str(cents_sum),
+        "cents_sum_error": str(cents_sum - exact),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
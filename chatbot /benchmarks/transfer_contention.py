@@ -0,0 +1,153 @@
+"""
+Transfer throughput and SQLITE_BUSY rate as the number of concurrent writers grows.
+
+Seeds a scratch database with ``--users`` owners and, for each writer count in
+``--writers``, has that many threads move money between random accounts for
+``--duration`` seconds in three ways:
+
+* ``legacy``: the old transfer, a deferred transaction running two updates, two
+  balance lookups and the insert;
+* ``immediate``: ``apply_transfer`` in its own ``BEGIN IMMEDIATE`` transaction
+  per thread, with the conditional ``UPDATE ... RETURNING`` statements;
+* ``group``: ``apply_transfer`` queued on a ``WriteQueue``, which commits the
+  transfers waiting at the same time in one transaction.
+
+Every thread uses its own connection with ``--busy-timeout-ms`` and
+``--synchronous``; a transfer that fails with SQLITE_BUSY is counted and not
+retried.  The default ``synchronous=FULL`` syncs every WAL commit, as the app
+does, which is what group commit saves on; ``--synchronous NORMAL`` skips the
+syncs.
+
+Example::
+
+    python -m chatbot.benchmarks.transfer_contention --writers 1 2 4 8 16 32 64 --duration 3
+"""
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+import uuid
+from decimal import Decimal
+from pathlib import Path
+
+from chatbot.database import TRANSFER_INSERT_SQL, apply_migrations, apply_transfer, utc_timestamp
+from chatbot.db_connection import ConnectionProvider, adapt_money, is_busy_error
+from chatbot.loadtest.run import seed_users
+from chatbot.loadtest.stub_gemini import loadtest_account_number, loadtest_user_id
+from chatbot.write_queue import WriteQueue
+
+MODES = ("legacy", "immediate", "group")
+
+
+def legacy_transfer(provider: ConnectionProvider, user_id: str, from_account: str, to_account: str,
+                    amount: Decimal):
+    """The transfer as it was before the conditional updates, for comparison."""
+    cents = adapt_money(amount)
+    with provider.transaction() as con:
+        con.execute("UPDATE Accounts SET Balance = Balance - ? WHERE UserId=? AND AccountNumber=?",
+                    (cents, user_id, from_account))
+        con.execute("UPDATE Accounts SET Balance = Balance + ? WHERE UserId=? AND AccountNumber=?",
+                    (cents, user_id, to_account))
+        from_balance = con.execute("SELECT Balance FROM Accounts WHERE UserId=? AND AccountNumber=?",
+                                   (user_id, from_account)).fetchone()[0]
+        to_balance = con.execute("SELECT Balance FROM Accounts WHERE UserId=? AND AccountNumber=?",
+                                 (user_id, to_account)).fetchone()[0]
+        con.execute(TRANSFER_INSERT_SQL, (str(uuid.uuid4()), from_account, to_account, utc_timestamp(),
+                                          cents, adapt_money(from_balance), adapt_money(to_balance)))
+
+
+def immediate_transfer(provider: ConnectionProvider, *args):
+    with provider.transaction("IMMEDIATE") as con:
+        apply_transfer(con, *args)
+
+
+def writer(transfer, users: int, seed: int, deadline: float, counts: dict, lock: threading.Lock):
+    rng = random.Random(seed)
+    kinds = ("chequing", "savings", "credit")
+    done = busy = failed = 0
+    while time.monotonic() < deadline:
+        owner = rng.randint(1, users)
+        source, destination = rng.sample(kinds, 2)
+        try:
+            transfer(loadtest_user_id(owner), loadtest_account_number(owner, source),
+                     loadtest_account_number(owner, destination), Decimal(rng.randint(1, 5000)) / 100)
+            done += 1
+        except Exception as e:
+            if is_busy_error(e):
+                busy += 1
+            else:
+                failed += 1
+    with lock:
+        counts["transfers"] += done
+        counts["busy"] += busy
+        counts["failed"] += failed
+
+
+def run_mode(mode: str, writers: int, args, db_file: str) -> dict:
+    provider = ConnectionProvider(db_file, busy_timeout_ms=args.busy_timeout_ms, synchronous=args.synchronous)
+    if mode == "legacy":
+        def transfer(*transfer_args):
+            legacy_transfer(provider, *transfer_args)
+    elif mode == "immediate":
+        def transfer(*transfer_args):
+            immediate_transfer(provider, *transfer_args)
+    else:
+        queue = WriteQueue(provider, max_batch=args.max_batch)
+
+        def transfer(*transfer_args):
+            queue.run(apply_transfer, *transfer_args)
+
+    counts, lock = {"transfers": 0, "busy": 0, "failed": 0}, threading.Lock()
+    deadline = time.monotonic() + args.duration
+    started = time.perf_counter()
+    threads = [threading.Thread(target=writer, args=(transfer, args.users, args.seed + index, deadline, counts, lock))
+               for index in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    attempts = counts["transfers"] + counts["busy"] + counts["failed"]
+    return {
+        "transfers_per_s": round(counts["transfers"] / elapsed),
+        "busy_rate": round(counts["busy"] / attempts, 4) if attempts else 0.0,
+        "failed": counts["failed"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=3, help="seconds per mode and writer count")
+    parser.add_argument("--busy-timeout-ms", type=int, default=100)
+    parser.add_argument("--synchronous", default="FULL")
+    parser.add_argument("--max-batch", type=int, default=64, help="most transfers per group commit")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in args.modes:
+            # A fresh database per mode, so one mode's transfers don't slow the next
+            db_file = str(Path(directory) / f"{mode}.db")
+            con = ConnectionProvider(db_file).connection()
+            apply_migrations(con)
+            con.close()
+            seed_users(db_file, args.users)
+            results[mode] = {str(writers): run_mode(mode, writers, args, db_file) for writers in args.writers}
+
+    print(json.dumps({
+        "duration_s": args.duration,
+        "busy_timeout_ms": args.busy_timeout_ms,
+        "synchronous": args.synchronous,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
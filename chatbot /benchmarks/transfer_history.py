@@ -0,0 +1,129 @@
+"""
+Query plans and latency of the transaction-history and account lookups.
+
+Builds a scratch database from the schema migrations, fills ``Transfers`` with
+``--transfers`` rows spread over ``--accounts`` accounts, and times a first and
+a follow-up page of transaction history, the history count and the account
+listing with the migration indexes and again after dropping them.  Prints the
+``EXPLAIN QUERY PLAN`` of each, and exits with status 1 if the indexed plans
+don't use the indexes, so it doubles as a check that a schema change hasn't
+made history lookups scan the table.
+
+Example::
+
+    python -m chatbot.benchmarks.transfer_history --transfers 200000 --days 365 --limit 5
+"""
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from chatbot.database import (TRANSACTION_COUNT_SQL, apply_migrations, explain_query_plan, history_page_sql,
+                              utc_timestamp)
+
+ACCOUNTS_SQL = "SELECT AccountNumber, AccountName, Balance FROM Accounts WHERE UserId=:user_id"
+
+INDEXES = {
+    "IX_Transfers_From_DateTime_Number": "Transfers (FromAccountNumber, TransferDateTime, TransactionNumber)",
+    "IX_Transfers_To_DateTime_Number": "Transfers (ToAccountNumber, TransferDateTime, TransactionNumber)",
+    "IX_Accounts_UserId": "Accounts (UserId)",
+}
+# The point-in-time balance indexes, dropped too so the unindexed lookups can't fall back on them
+OTHER_INDEXES = ("IX_Transfers_From_Sequence", "IX_Transfers_To_Sequence")
+
+
+def seed(con: sqlite3.Connection, accounts: int, transfers: int, seed: int):
+    """Add users with three accounts each and random transfers over the past year."""
+    rng = random.Random(seed)
+    numbers = [f"{index:010d}" for index in range(100, 100 + accounts)]
+    now = datetime.now(timezone.utc)
+    with con:
+        con.executemany("INSERT INTO UserCredentials (UserId, Password) VALUES (?, 'password')",
+                        [(f"bench{index // 3}",) for index in range(0, accounts, 3)])
+        con.executemany("INSERT INTO Accounts (AccountNumber, UserId, AccountName, Balance, CurrencyCode) "
+                        "VALUES (?, ?, 'Chequing', 1000, 'CAD')",
+                        [(number, f"bench{index // 3}") for index, number in enumerate(numbers)])
+        con.executemany(
+            "INSERT INTO Transfers (TransactionNumber, FromAccountNumber, ToAccountNumber, TransferDateTime, "
+            "Amount, FromAccountBalance, ToAccountBalance) VALUES (?, ?, ?, ?, 10, 990, 1010)",
+            [(f"T{index:09d}", *rng.sample(numbers, 2),
+              utc_timestamp(now - timedelta(seconds=rng.randrange(365 * 24 * 3600))))
+             for index in range(transfers)])
+    con.execute("ANALYZE")
+    return numbers
+
+
+def measure(con: sqlite3.Connection, sql: str, params_list: list, repeat: int) -> float:
+    """Mean milliseconds per query, cycling through the parameter sets."""
+    started = time.perf_counter()
+    for index in range(repeat):
+        con.execute(sql, params_list[index % len(params_list)]).fetchall()
+    return (time.perf_counter() - started) / repeat * 1e3
+
+
+def report(con: sqlite3.Connection, history_params: list, accounts_params: list, repeat: int) -> dict:
+    first_page, next_page = history_page_sql(False), history_page_sql(True)
+    return {
+        "history_plan": explain_query_plan(next_page, history_params[0], con),
+        "first_page_ms": round(measure(con, first_page, history_params, repeat), 3),
+        "next_page_ms": round(measure(con, next_page, history_params, repeat), 3),
+        "count_plan": explain_query_plan(TRANSACTION_COUNT_SQL, history_params[0], con),
+        "count_ms": round(measure(con, TRANSACTION_COUNT_SQL, history_params, repeat), 3),
+        "accounts_plan": explain_query_plan(ACCOUNTS_SQL, accounts_params[0], con),
+        "accounts_ms": round(measure(con, ACCOUNTS_SQL, accounts_params, repeat), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=3000)
+    parser.add_argument("--transfers", type=int, default=200000)
+    parser.add_argument("--days", type=int, default=30, help="history window of the timed query")
+    parser.add_argument("--limit", type=int, default=5, help="transactions per history page")
+    parser.add_argument("--repeat", type=int, default=200, help="queries timed per measurement")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        con = sqlite3.connect(str(Path(directory) / "bench.db"), isolation_level=None)
+        apply_migrations(con)
+        numbers = seed(con, args.accounts, args.transfers, args.seed)
+
+        now = datetime.now(timezone.utc)
+        start_date = utc_timestamp(now - timedelta(days=args.days))
+        rng = random.Random(args.seed)
+        # Follow-up pages start from the middle of the window
+        middle = utc_timestamp(now - timedelta(days=args.days / 2))
+        history_params = [{"account_number": number, "start_date": start_date, "limit": args.limit + 1,
+                           "before_time": middle, "before_number": ""}
+                          for number in rng.sample(numbers, min(50, len(numbers)))]
+        accounts_params = [{"user_id": f"bench{index}"} for index in range(min(50, len(numbers) // 3))]
+
+        indexed = report(con, history_params, accounts_params, args.repeat)
+        for name in (*INDEXES, *OTHER_INDEXES):
+            con.execute(f"DROP INDEX {name}")
+        con.execute("ANALYZE")
+        unindexed = report(con, history_params, accounts_params, args.repeat)
+        con.close()
+
+    plan = " ".join(indexed["history_plan"] + indexed["count_plan"] + indexed["accounts_plan"])
+    missing = [name for name in INDEXES if name not in plan]
+    print(json.dumps({
+        "accounts": args.accounts,
+        "transfers": args.transfers,
+        "indexed": indexed,
+        "unindexed": unindexed,
+        "first_page_speedup": round(unindexed["first_page_ms"] / indexed["first_page_ms"], 1),
+        "indexes_not_used": missing,
+    }, indent=2))
+    if missing:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
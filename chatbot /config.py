@@ -4,7 +4,25 @@ from pathlib import Path
 
 # Database settings
 DB_FILE = os.environ.get("CHATBOT_DB_FILE", "bank.db")
-DB_INIT_SQL = Path(__file__).parent / "init.sql"
+# Numbered schema migrations (NNNN_name.sql); PRAGMA user_version records the last one applied
+DB_MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+# Per-thread connections: WAL journal, fsync level, lock wait, memory-mapped I/O and page cache
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))
+# FULL syncs the WAL on every commit, so an acknowledged transfer survives a power failure.
+# NORMAL skips that sync and is faster, but the last commits can be lost on power failure
+# (never corrupted); set DB_SYNCHRONOUS=NORMAL only where that loss is acceptable.
+DB_SYNCHRONOUS = os.environ.get("DB_SYNCHRONOUS", "FULL")
+DB_MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", "16384"))
+DB_STATEMENT_CACHE = int(os.environ.get("DB_STATEMENT_CACHE", "256"))
+# Async tools run queries on dedicated threads: reads in parallel, writes one at a time (SQLite has one writer)
+DB_ASYNC_ENABLED = os.environ.get("DB_ASYNC_ENABLED", "1") == "1"
+DB_READ_WORKERS = int(os.environ.get("DB_READ_WORKERS", "4"))
+DB_WRITE_WORKERS = int(os.environ.get("DB_WRITE_WORKERS", "1"))
+# Transfers go through one writer thread that commits whatever has queued up in one transaction
+DB_GROUP_COMMIT_ENABLED = os.environ.get("DB_GROUP_COMMIT_ENABLED", "1") == "1"
+DB_GROUP_COMMIT_MAX_BATCH = int(os.environ.get("DB_GROUP_COMMIT_MAX_BATCH", "64"))
+DB_GROUP_COMMIT_WINDOW_MS = float(os.environ.get("DB_GROUP_COMMIT_WINDOW_MS", "0"))
 
 # Account number mappings (for client-side account name resolution)
 ACCOUNT_MAPPINGS = {
@@ -24,7 +42,81 @@ DEFAULT_USER_ID = "test1"
 VECTOR_DB_DIR = os.environ.get("VECTOR_DB_DIR", "./chroma_db")
 DOCS_DIRECTORY = os.environ.get("DOCS_DIRECTORY", "./rbc_documents")
 
+# Logging: level for the chatbot loggers, and "json" lines or plain "text"
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+
+# LLM backend: "gemini", or "record"/"replay" to capture and replay responses offline
+LLM_PROVIDER = os.environ.get("LLM_PROVIDER", "gemini")
+LLM_RECORDINGS_DIR = os.environ.get("LLM_RECORDINGS_DIR", "./llm_recordings")
+LLM_REPLAY_LATENCY = os.environ.get("LLM_REPLAY_LATENCY", "")  # empty: replay the recorded latency
+LLM_REPLAY_JITTER = float(os.environ.get("LLM_REPLAY_JITTER", "0"))
+
+# Semantic cache of RAG answers, cleared whenever the vector store is rebuilt
+RAG_CACHE_ENABLED = os.environ.get("RAG_CACHE_ENABLED", "1") == "1"
+RAG_CACHE_MAX_ENTRIES = int(os.environ.get("RAG_CACHE_MAX_ENTRIES", "512"))
+RAG_CACHE_TTL = float(os.environ.get("RAG_CACHE_TTL", "21600"))
+RAG_CACHE_SIMILARITY = float(os.environ.get("RAG_CACHE_SIMILARITY", "0.92"))
+
 # API settings
 MCP_HOST = os.environ.get("MCP_HOST", "127.0.0.1")
 MCP_PORT = int(os.environ.get("MCP_PORT", "8050"))
 MCP_NAME = os.environ.get("MCP_NAME", "RBC-RAG-MCP")
+
+# MCP client connection pool: comma-separated SSE URLs of the server replicas
+MCP_SERVER_URLS = [url.strip() for url in
+                   os.environ.get("MCP_SERVER_URLS", f"http://{MCP_HOST}:{MCP_PORT}/sse").split(",")
+                   if url.strip()]
+MCP_POOL_SIZE = int(os.environ.get("MCP_POOL_SIZE", "4"))
+MCP_HEALTH_CHECK_INTERVAL = float(os.environ.get("MCP_HEALTH_CHECK_INTERVAL", "15"))
+MCP_CONNECT_TIMEOUT = float(os.environ.get("MCP_CONNECT_TIMEOUT", "10"))
+MCP_RECONNECT_BACKOFF_MAX = float(os.environ.get("MCP_RECONNECT_BACKOFF_MAX", "30"))
+
+# Assistant session pool settings
+SESSION_MAX_COUNT = int(os.environ.get("SESSION_MAX_COUNT", "200"))
+SESSION_IDLE_TIMEOUT = float(os.environ.get("SESSION_IDLE_TIMEOUT", "900"))
+
+# Conversation memory: recent messages verbatim, older ones folded into a summary
+MAX_HISTORY_MESSAGES = int(os.environ.get("MAX_HISTORY_MESSAGES", "12"))
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", "1500"))
+HISTORY_SUMMARY_TOKENS = int(os.environ.get("HISTORY_SUMMARY_TOKENS", "300"))
+HISTORY_SUMMARY_MODEL = os.environ.get("HISTORY_SUMMARY_MODEL", "gemini-1.5-flash")
+
+# Admission control for the background event loop
+ADMISSION_MAX_CONCURRENCY = int(os.environ.get("ADMISSION_MAX_CONCURRENCY", "32"))
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_MAX_PER_USER = int(os.environ.get("ADMISSION_MAX_PER_USER", "2"))
+ADMISSION_RETRY_AFTER = int(os.environ.get("ADMISSION_RETRY_AFTER", "2"))
+CHAT_TIMEOUT = float(os.environ.get("CHAT_TIMEOUT", "30"))
+
+# Rule-based fast path that skips the LLM for unambiguous account queries
+FAST_PATH_ENABLED = os.environ.get("FAST_PATH_ENABLED", "1") == "1"
+FAST_PATH_CONFIDENCE_THRESHOLD = float(os.environ.get("FAST_PATH_CONFIDENCE_THRESHOLD", "0.8"))
+
+# Local intent classifier: greetings, small talk and off-topic messages it is sure about skip the LLM
+INTENT_GATE_ENABLED = os.environ.get("INTENT_GATE_ENABLED", "1") == "1"
+INTENT_GATE_THRESHOLD = float(os.environ.get("INTENT_GATE_THRESHOLD", "0.85"))
+INTENT_UTTERANCES_FILE = Path(os.environ.get("INTENT_UTTERANCES_FILE", Path(__file__).parent / "intent_utterances.tsv"))
+
+# Tool calls from one model response: read-only tools run concurrently, others in order
+READ_ONLY_TOOLS = frozenset({
+    "get_account_balance",
+    "get_balance_as_of",
+    "list_user_accounts",
+    "get_transaction_history",
+    "answer_banking_question",
+})
+TOOL_CALL_CONCURRENCY = int(os.environ.get("TOOL_CALL_CONCURRENCY", "4"))
+
+# Transaction history pages: transactions the assistant shows, and the most one tool call returns
+TRANSACTION_HISTORY_PAGE_SIZE = int(os.environ.get("TRANSACTION_HISTORY_PAGE_SIZE", "5"))
+TRANSACTION_HISTORY_MAX_LIMIT = int(os.environ.get("TRANSACTION_HISTORY_MAX_LIMIT", "100"))
+
+# Gemini calls: overall deadline, per-attempt timeout, retries and hedged requests
+LLM_DEADLINE = float(os.environ.get("LLM_DEADLINE", "20"))
+LLM_ATTEMPT_TIMEOUT = float(os.environ.get("LLM_ATTEMPT_TIMEOUT", "10"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF = float(os.environ.get("LLM_RETRY_BACKOFF", "0.5"))
+# Hedging is opt-in: every hedged call is a second billed request against the Gemini quota
+LLM_HEDGE_ENABLED = os.environ.get("LLM_HEDGE_ENABLED", "0") == "1"
+LLM_HEDGE_MIN_DELAY = float(os.environ.get("LLM_HEDGE_MIN_DELAY", "0.5"))
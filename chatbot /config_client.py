@@ -40,6 +40,10 @@ RESPONSE_TEMPLATES = {
         "It was a pleasure assisting you. Goodbye!",
         "Have a wonderful day! Goodbye!"
     ],
+    "small_talk": [
+        "I'm the RBC Banking Assistant, happy to help! Ask me about your balances, transactions, transfers or RBC products.",
+        "Glad to help! Let me know if there's anything you need with your RBC accounts or services."
+    ],
     "non_banking": [
         "I can only help with RBC banking-related questions.",
         "I'm specialized in RBC banking services. I can't help with that topic.",
@@ -65,6 +69,7 @@ IMPORTANT INSTRUCTIONS:
 
 2. For account information and operations:
    - For checking balances: use get_account_balance with account_number="2345678901" for savings or "1234567890" for checking
+   - For a balance at a past date: use get_balance_as_of with the account number and the date as "YYYY-MM-DD"
    - For listing accounts: use list_user_accounts ONLY when explicitly asked to see accounts
    - For transfers: use transfer_funds with exact account numbers and amount as a string
    - For transaction history: use get_transaction_history with the exact account number
@@ -192,6 +197,28 @@ TOOL_DEFINITIONS = [
             "required": ["user_id", "account_number"]
         }
     },
+    {
+        "name": "get_balance_as_of",
+        "description": "Get the balance a specific account had at a past date or time.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "user_id": {
+                    "type": "string",
+                    "description": "The ID of the user"
+                },
+                "account_number": {
+                    "type": "string",
+                    "description": "The account number"
+                },
+                "timestamp": {
+                    "type": "string",
+                    "description": "ISO date or date-time, e.g. 2025-03-01; a date alone means the end of that day"
+                }
+            },
+            "required": ["user_id", "account_number", "timestamp"]
+        }
+    },
     {
         "name": "get_transaction_history",
         "description": "Get the transaction history for a specific account.",
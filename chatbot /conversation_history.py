@@ -0,0 +1,154 @@
+"""Bounded conversation memory for the banking assistant."""
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from chatbot.config import MAX_HISTORY_MESSAGES, HISTORY_TOKEN_BUDGET, HISTORY_SUMMARY_TOKENS
+from chatbot.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Summarizer signature: (previous summary, messages to fold in, token budget) -> new summary
+Summarizer = Callable[[str, List[Dict[str, str]], int], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for Gemini models (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def extractive_summary(summary: str, messages: List[Dict[str, str]], token_budget: int) -> str:
+    """
+    Fold messages into the summary without an LLM by keeping a clipped line per message.
+
+    The oldest lines are dropped first once the summary exceeds its token budget.
+    """
+    lines = summary.splitlines() if summary else []
+    for message in messages:
+        speaker = "User" if message["role"] == "user" else "Assistant"
+        content = " ".join(message["content"].split())
+        if len(content) > 160:
+            content = content[:157] + "..."
+        lines.append(f"{speaker}: {content}")
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > token_budget:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class ConversationHistory:
+    """
+    Conversation memory whose size stays constant however long a customer chats.
+
+    The most recent messages are kept verbatim, up to ``max_messages`` and
+    ``token_budget`` tokens.  Older messages are folded into a running summary of
+    at most ``summary_token_budget`` tokens.  When a summarizer is given, folding
+    runs as a background task so it never delays a reply; until it finishes, the
+    messages being folded are still sent verbatim.
+    """
+
+    def __init__(self, max_messages: int = MAX_HISTORY_MESSAGES,
+                 token_budget: int = HISTORY_TOKEN_BUDGET,
+                 summary_token_budget: int = HISTORY_SUMMARY_TOKENS,
+                 summarizer: Optional[Summarizer] = None):
+        self.max_messages = max_messages
+        self.token_budget = token_budget
+        self.summary_token_budget = summary_token_budget
+        self.summary = ""
+        self._summarizer = summarizer
+        self._recent: Deque[Dict[str, str]] = deque()
+        self._recent_tokens = 0
+        self._compacting: List[Dict[str, str]] = []
+        self._summary_task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._recent)
+
+    def __getitem__(self, index):
+        return self._recent[index]
+
+    def __iter__(self):
+        return iter(self._recent)
+
+    def append(self, role: str, content: str):
+        """Record a message, compacting older ones if the verbatim window is full."""
+        self._recent.append({"role": role, "content": content})
+        self._recent_tokens += estimate_tokens(content)
+        overflow = []
+        # Always keep the newest message, even if it alone exceeds the budget
+        while len(self._recent) > 1 and (len(self._recent) > self.max_messages or
+                                         self._recent_tokens > self.token_budget):
+            message = self._recent.popleft()
+            self._recent_tokens -= estimate_tokens(message["content"])
+            overflow.append(message)
+        if overflow:
+            self._compact(overflow)
+
+    def clear(self):
+        """Forget everything, including the summary."""
+        if self._summary_task is not None:
+            self._summary_task.cancel()
+            self._summary_task = None
+        self._recent.clear()
+        self._recent_tokens = 0
+        self._compacting = []
+        self.summary = ""
+
+    def _compact(self, messages: List[Dict[str, str]]):
+        self._compacting.extend(messages)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop to run the summarizer on; fold them in right away
+            self.summary = extractive_summary(self.summary, self._compacting, self.summary_token_budget)
+            self._compacting = []
+            return
+        if self._summarizer is None:
+            self.summary = extractive_summary(self.summary, self._compacting, self.summary_token_budget)
+            self._compacting = []
+        elif self._summary_task is None:
+            self._summary_task = asyncio.ensure_future(self._summarize())
+
+    async def _summarize(self):
+        """Fold pending messages into the summary until none are left."""
+        try:
+            while self._compacting:
+                batch = list(self._compacting)
+                try:
+                    summary = await self._summarizer(self.summary, batch, self.summary_token_budget)
+                except Exception as e:
+                    logger.warning("History summarization failed, using extractive summary: %s", e)
+                    summary = ""
+                if not summary.strip():
+                    summary = extractive_summary(self.summary, batch, self.summary_token_budget)
+                self.summary = summary.strip()
+                del self._compacting[:len(batch)]
+                # Keep memory bounded even if a bad summarizer ignores its budget
+                if self._compacting and len(self._compacting) > self.max_messages:
+                    self.summary = extractive_summary(self.summary, self._compacting, self.summary_token_budget)
+                    self._compacting = []
+        finally:
+            self._summary_task = None
+
+    def context_messages(self) -> List[Dict[str, str]]:
+        """Messages to send verbatim: any still being summarized, then the recent window."""
+        return self._compacting + list(self._recent)
+
+    def as_contents(self, preamble: str) -> List[Dict]:
+        """
+        Build Gemini ``contents`` from the preamble, summary and recent messages.
+
+        The preamble (system instructions) and the summary open the first user
+        turn.  Consecutive messages from the same role are merged, because
+        Gemini expects user and model turns to alternate.
+        """
+        opening = preamble
+        if self.summary:
+            opening += f"\n\nSummary of the earlier conversation:\n{self.summary}"
+        contents = [{"role": "user", "parts": [opening]}]
+        for message in self.context_messages():
+            role = "user" if message["role"] == "user" else "model"
+            if contents[-1]["role"] == role:
+                contents[-1]["parts"].append(message["content"])
+            else:
+                contents.append({"role": role, "parts": [message["content"]]})
+        return contents
@@ -1,14 +1,136 @@
+import base64
+import hashlib
+import json
+import re
 import sqlite3
 import uuid
 from datetime import date
 from datetime import datetime
 from datetime import timedelta
+from datetime import timezone
 from decimal import Decimal
 from pathlib import Path
-from chatbot.models import Account
-from chatbot.config import DB_FILE, DB_INIT_SQL
+from typing import Callable, Optional, TypeVar
+from chatbot.models import Account, Transfer, TransferOutcome
+from chatbot.config import DB_FILE, DB_GROUP_COMMIT_ENABLED, DB_MIGRATIONS_DIR
+from chatbot.db_connection import adapt_money, db, get_connection, is_busy_error
+from chatbot.logger import get_logger
+from chatbot.metrics import DB_BUSY_ERRORS, time_db
+from chatbot.write_queue import WriteQueue
 
+logger = get_logger(__name__)
 
+T = TypeVar("T")
+
+TRANSFER_INSERT_SQL = """
+    INSERT INTO Transfers (
+        TransactionNumber, FromAccountNumber, ToAccountNumber, 
+        TransferDateTime, Amount, FromAccountBalance, ToAccountBalance
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+MIGRATION_FILE = re.compile(r"^(\d{4})_\w+\.sql$")
+
+# Keyset pagination: each side of the transfer is read newest first from its own
+# (account, TransferDateTime, TransactionNumber) index, starting below the cursor,
+# so a page touches at most 2 * (limit + 1) rows however long the history is.
+# Transfers from an account to itself are listed once, as debits.
+TRANSACTION_HISTORY_SQL = """
+    SELECT * FROM (
+        SELECT * FROM (
+            SELECT TransactionNumber, TransferDateTime, 'debit' AS transaction_type, -Amount AS "amount [CENTS]",
+                   'Transfer to ' || ToAccountNumber AS description, FromAccountBalance AS "balance_after [CENTS]"
+            FROM Transfers
+            WHERE FromAccountNumber = :account_number AND TransferDateTime >= :start_date {before}
+            ORDER BY TransferDateTime DESC, TransactionNumber DESC
+            LIMIT :limit
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT TransactionNumber, TransferDateTime, 'credit' AS transaction_type, Amount AS "amount [CENTS]",
+                   'Transfer from ' || FromAccountNumber AS description, ToAccountBalance AS "balance_after [CENTS]"
+            FROM Transfers
+            WHERE ToAccountNumber = :account_number AND FromAccountNumber != :account_number
+            AND TransferDateTime >= :start_date {before}
+            ORDER BY TransferDateTime DESC, TransactionNumber DESC
+            LIMIT :limit
+        )
+    )
+    ORDER BY TransferDateTime DESC, TransactionNumber DESC
+    LIMIT :limit
+"""
+HISTORY_BEFORE_CURSOR = "AND (TransferDateTime, TransactionNumber) < (:before_time, :before_number)"
+
+TRANSACTION_COUNT_SQL = """
+    SELECT COUNT(*) FROM Transfers
+    WHERE (FromAccountNumber = :account_number OR ToAccountNumber = :account_number)
+    AND TransferDateTime >= :start_date
+"""
+
+# Transfers are numbered in commit order by TransferSequence (see migration 0008), and none is
+# stamped before the one committed ahead of it, even if the clock has gone back in between,
+# so ordering them by time and by sequence number agrees
+LATEST_TRANSFER_TIME_SQL = "SELECT TransferDateTime FROM Transfers ORDER BY TransferSequence DESC LIMIT 1"
+
+# Point-in-time balance.  The moment picks the account's latest transfer made at or before it,
+# and the balance is the one right after that transfer: the latest checkpoint up to its
+# sequence number plus the transfers since the checkpoint, added up in SQL, which is exact now
+# that amounts are integer cents.  Checkpoints are at most 64 transfers apart, so the delta
+# never covers more.  The latest transfer is looked up by time in the history indexes, which
+# INDEXED BY keeps the planner from trading for a walk back through the sequence indexes.
+BALANCE_CUTOFF_SQL = """
+    SELECT COALESCE(MAX(TransferSequence), 0) FROM (
+        SELECT MAX(TransferSequence) AS TransferSequence FROM Transfers INDEXED BY IX_Transfers_To_DateTime_Number
+        WHERE ToAccountNumber = :account_number AND TransferDateTime = (
+            SELECT MAX(TransferDateTime) FROM Transfers
+            WHERE ToAccountNumber = :account_number AND TransferDateTime <= :as_of)
+        UNION ALL
+        SELECT MAX(TransferSequence) FROM Transfers INDEXED BY IX_Transfers_From_DateTime_Number
+        WHERE FromAccountNumber = :account_number AND TransferDateTime = (
+            SELECT MAX(TransferDateTime) FROM Transfers
+            WHERE FromAccountNumber = :account_number AND TransferDateTime <= :as_of)
+    )
+"""
+
+BALANCE_CHECKPOINT_SQL = """
+    SELECT TransferSequence, Balance FROM BalanceCheckpoints
+    WHERE AccountNumber = :account_number AND TransferSequence <= :until_sequence
+    ORDER BY TransferSequence DESC
+    LIMIT 1
+"""
+
+BALANCE_DELTA_SQL = """
+    SELECT COALESCE(SUM(Amount), 0) AS "delta [CENTS]" FROM (
+        SELECT Amount FROM Transfers
+        WHERE ToAccountNumber = :account_number
+        AND TransferSequence > :since_sequence AND TransferSequence <= :until_sequence
+        UNION ALL
+        SELECT -Amount FROM Transfers
+        WHERE FromAccountNumber = :account_number
+        AND TransferSequence > :since_sequence AND TransferSequence <= :until_sequence
+    )
+"""
+
+
+def utc_timestamp(moment: Optional[datetime] = None) -> str:
+    """
+    Format a moment the way transfer times are stored: UTC, to the microsecond, with its offset.
+
+    :param moment: The moment, now by default; a naive one is taken to be in local time.
+    """
+    moment = moment or datetime.now(timezone.utc)
+    return moment.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _next_transfer_time(con: sqlite3.Connection) -> datetime:
+    """Now, or the latest transfer's time if the clock has gone back since it was made."""
+    now = datetime.now(timezone.utc)
+    latest = con.execute(LATEST_TRANSFER_TIME_SQL).fetchone()
+    return max(now, datetime.fromisoformat(latest[0])) if latest else now
+
+
+@time_db("auth_user")
 def auth_user(user_id: str, password: str) -> bool:
     """
     Ensure the user id and password are match to pair stored in database.  This is a just a part of a simple demo, you should never store clear text passwords in production.
@@ -18,14 +140,11 @@ def auth_user(user_id: str, password: str) -> bool:
     :return: True if user ID and password are matched, False otherwise.
     """
     sql = "SELECT UserId FROM UserCredentials WHERE UserId=:user_id AND Password=:password"
-    con = sqlite3.connect(DB_FILE)
-    cur = con.cursor()
-    cur.execute(sql, {"user_id": user_id, "password": password})
-    authenticated = cur.fetchone() is not None
-    con.close()
-    return authenticated
+    cur = get_connection().execute(sql, {"user_id": user_id, "password": password})
+    return cur.fetchone() is not None
 
 
+@time_db("load_accounts")
 def load_accounts(user_id: str) -> list[Account]:
     """
     Query accounts that belong to the speicfied user.
@@ -34,22 +153,18 @@ def load_accounts(user_id: str) -> list[Account]:
     :return: All the accounts that belong the the user
     """
     sql = "SELECT AccountNumber, AccountName, Balance FROM Accounts WHERE UserId=:user_id"
-    con = sqlite3.connect(DB_FILE)
-    con.row_factory = sqlite3.Row
-    cur = con.cursor()
-    cur.execute(sql, {"user_id": user_id})
-    rows = cur.fetchall()
+    rows = get_connection().execute(sql, {"user_id": user_id}).fetchall()
     accounts = []
     for row in rows:
         account = Account()
         account.account_number = row['AccountNumber']
         account.account_name = row['AccountName']
-        account.balance = Decimal(str(row['Balance']))
+        account.balance = row['Balance']
         accounts.append(account)
-    con.close()
     return accounts
 
 
+@time_db("load_transfer_target_accounts")
 def load_transfer_target_accounts(user_id: str, from_account: str) -> list[Account]:
     """
     Query accounts that the specified account can trasfer fund to.
@@ -63,25 +178,107 @@ def load_transfer_target_accounts(user_id: str, from_account: str) -> list[Accou
     FROM Accounts 
     WHERE UserId=:user_id AND AccountNumber!=:from_account
     """
-    con = sqlite3.connect(DB_FILE)
-    con.row_factory = sqlite3.Row
-    cur = con.cursor()
-    cur.execute(sql, {"user_id": user_id, "from_account": from_account})
-    rows = cur.fetchall()
+    rows = get_connection().execute(sql, {"user_id": user_id, "from_account": from_account}).fetchall()
     accounts = []
     for row in rows:
         account = Account()
         account.account_number = row['AccountNumber']
         account.account_name = row['AccountName']
-        account.balance = Decimal(str(row['Balance']))
+        account.balance = row['Balance']
         accounts.append(account)
-    con.close()
     return accounts
 
 
+write_queue = WriteQueue(db)
+
+
+def run_in_write_transaction(write: Callable[..., T], *args) -> T:
+    """
+    Run ``write(connection, *args)`` in a write transaction and return its result once committed.
+
+    With ``DB_GROUP_COMMIT_ENABLED`` the write is queued for the single writer thread and
+    committed together with whatever other writes are waiting; otherwise it runs on this
+    thread's connection in its own ``BEGIN IMMEDIATE`` transaction.
+    """
+    try:
+        if DB_GROUP_COMMIT_ENABLED:
+            return write_queue.run(write, *args)
+        with db.transaction("IMMEDIATE") as con:
+            return write(con, *args)
+    except sqlite3.OperationalError as e:
+        if is_busy_error(e):
+            DB_BUSY_ERRORS.labels(write.__name__).inc()
+        raise
+
+
+class IdempotencyKeyConflict(ValueError):
+    """Raised when an idempotency key the owner already used comes with a different transfer."""
+
+
+def transfer_request_hash(transfer: Transfer) -> str:
+    """Fingerprint of what a transfer asks for, stored with its idempotency key."""
+    request = [transfer.from_account, transfer.to_account, adapt_money(Decimal(str(transfer.amount)))]
+    return hashlib.sha256(json.dumps(request).encode()).hexdigest()
+
+
+def _check_transfer(from_account: str, to_account: str, amount: Decimal):
+    if not amount.is_finite() or amount <= 0:
+        raise ValueError(f"Invalid transfer amount: {amount}")
+    # Money is stored in whole cents
+    adapt_money(amount)
+    if from_account == to_account:
+        raise ValueError(f"Cannot transfer from account {from_account} to itself.")
+
+
+def apply_transfer(con: sqlite3.Connection, user_id: str, from_account: str, to_account: str,
+                   amount: Decimal, transfer_time: Optional[datetime] = None) -> str:
+    """
+    Move an amount between two of the owner's accounts, on a connection already in a write transaction.
+
+    The debit only matches if the source account is the owner's and its balance covers the
+    amount, and both updates return the new balance, so a transfer takes three statements:
+    two conditional ``UPDATE ... RETURNING`` and the ``INSERT`` of the transfer record, plus
+    a lookup of the latest transfer's time, which the new one's is never earlier than, unless
+    the caller passes ``transfer_time``.  On error the caller must roll back, since the debit
+    may already have been applied.
+
+    :return: The TransactionNumber of the recorded transfer.
+    :raises ValueError: If the amount isn't positive, an account isn't the owner's, or the
+        source balance doesn't cover the amount.
+    """
+    _check_transfer(from_account, to_account, amount)
+    params = {"user_id": user_id, "amount": adapt_money(amount)}
+
+    debited = con.execute(
+        "UPDATE Accounts SET Balance = Balance - :amount "
+        "WHERE UserId=:user_id AND AccountNumber=:account AND Balance >= :amount RETURNING Balance",
+        {**params, "account": from_account}).fetchall()
+    if not debited:
+        exists = con.execute("SELECT 1 FROM Accounts WHERE UserId=? AND AccountNumber=?",
+                             (user_id, from_account)).fetchone()
+        raise ValueError(f"Insufficient funds in account {from_account}." if exists
+                         else f"Account {from_account} not found.")
+
+    credited = con.execute(
+        "UPDATE Accounts SET Balance = Balance + :amount "
+        "WHERE UserId=:user_id AND AccountNumber=:account RETURNING Balance",
+        {**params, "account": to_account}).fetchall()
+    if not credited:
+        raise ValueError(f"Account {to_account} not found.")
+
+    transaction_id = str(uuid.uuid4())
+    if transfer_time is None:
+        transfer_time = _next_transfer_time(con)
+    con.execute(TRANSFER_INSERT_SQL, (transaction_id, from_account, to_account, utc_timestamp(transfer_time),
+                                      adapt_money(amount), adapt_money(debited[0][0]),
+                                      adapt_money(credited[0][0])))
+    return transaction_id
+
+
+@time_db("transfer_fund_between_accounts")
 def transfer_fund_between_accounts(user_id: str,
                                    from_account: str, to_account: str,
-                                   amount: Decimal):
+                                   amount: Decimal) -> str:
     """
     Deduct fund from one account then add to the other account all under the same owner
     
@@ -89,100 +286,253 @@ def transfer_fund_between_accounts(user_id: str,
     :param from_account: The account number or account name that the fund would be transferred from.
     :param to_account: The account number or account name that the fund would be transferred to.
     :param amount: The amount that is going to be transfered.
+    :return: The TransactionNumber of the transfer.
+    :raises ValueError: If the amount isn't positive, an account isn't the owner's, or the
+        source balance doesn't cover the amount; nothing is changed.
     """
-    # Debug the parameters
-    print(f"[DEBUG] transfer_fund_between_accounts: user_id={user_id}, from={from_account}, to={to_account}, amount={amount} (type: {type(amount)})")
+    logger.debug("transfer_fund_between_accounts: user_id=%s, from=%s, to=%s, amount=%r",
+                 user_id, from_account, to_account, amount)
     
     # Ensure amount is a Decimal
     if not isinstance(amount, Decimal):
         amount = Decimal(str(amount))
     
-    con = sqlite3.connect(DB_FILE)
-    cur = con.cursor()
-    
     try:
-        # Start a transaction
-        con.execute("BEGIN TRANSACTION")
-        
-        # Convert amount to string for SQLite
-        amount_str = str(amount)
-        
-        # Deduct from source account
-        cur.execute(
-            "UPDATE Accounts SET Balance = Balance - ? WHERE UserId=? AND AccountNumber=?",
-            (amount_str, user_id, from_account)
-        )
-        
-        # Add to destination account
-        cur.execute(
-            "UPDATE Accounts SET Balance = Balance + ? WHERE UserId=? AND AccountNumber=?",
-            (amount_str, user_id, to_account)
-        )
-        
-        # Get the updated balances after the transfer
-        cur.execute("SELECT Balance FROM Accounts WHERE UserId=? AND AccountNumber=?", 
-                   (user_id, from_account))
-        from_account_balance = cur.fetchone()[0]
-        
-        cur.execute("SELECT Balance FROM Accounts WHERE UserId=? AND AccountNumber=?", 
-                   (user_id, to_account))
-        to_account_balance = cur.fetchone()[0]
-        
-        # Record the transfer with balances
-        import uuid
-        import datetime
-        transaction_id = str(uuid.uuid4())
-        current_time = datetime.datetime.now().isoformat()
-        
-        cur.execute(
-            """
-            INSERT INTO Transfers (
-                TransactionNumber, FromAccountNumber, ToAccountNumber, 
-                TransferDateTime, Amount, FromAccountBalance, ToAccountBalance
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (transaction_id, from_account, to_account, current_time, 
-             amount_str, from_account_balance, to_account_balance)
-        )
-        
-        # Commit the transaction
-        con.commit()
-        print(f"[DEBUG] Transfer successful: {amount_str} from {from_account} to {to_account}")
+        transaction_id = run_in_write_transaction(apply_transfer, user_id, from_account, to_account, amount)
+        logger.debug("Transfer successful: %s from %s to %s", amount, from_account, to_account)
+        return transaction_id
     except Exception as e:
-        # Rollback in case of error
-        con.rollback()
-        print(f"[ERROR] Database error during transfer: {str(e)}")
+        logger.error("Database error during transfer: %s", e)
         raise e
-    finally:
-        con.close()
 
 
-def init_db():
+def apply_transfers(con: sqlite3.Connection, user_id: str, transfers: list[Transfer]) -> list[TransferOutcome]:
     """
-    Create the database and add inital test data.
+    Apply a batch of transfers, on a connection already in a write transaction; see ``transfer_many``.
+
+    Each new transfer goes through ``apply_transfer``.  On error the caller must roll back,
+    since the transfers before the failing one have already been applied.
     """
-    # Check if database file already exists and has tables
-    db_exists = Path(DB_FILE).exists()
-    
-    if db_exists:
-        # Check if tables already exist
-        con = sqlite3.connect(DB_FILE)
-        cur = con.cursor()
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='UserCredentials'")
-        table_exists = cur.fetchone() is not None
-        con.close()
-        
-        if table_exists:
-            print(f"Database {DB_FILE} already initialized.")
-            return
-    
-    # Create and initialize the database
-    with open(DB_INIT_SQL) as sql_file:
-        sql = sql_file.read()
-        con = sqlite3.connect(DB_FILE)
-        cur = con.cursor()
-        cur.executescript(sql)
+    for transfer in transfers:
+        _check_transfer(transfer.from_account, transfer.to_account, Decimal(str(transfer.amount)))
+    keys = [transfer.idempotency_key for transfer in transfers if transfer.idempotency_key is not None]
+    started = _next_transfer_time(con)
+
+    # Key -> (TransactionNumber, RequestHash) of the transfer that first used it
+    used_keys = {}
+    if keys:
+        used_keys = {row['IdempotencyKey']: (row['TransactionNumber'], row['RequestHash']) for row in con.execute(
+            "SELECT IdempotencyKey, TransactionNumber, RequestHash FROM TransferIdempotencyKeys "
+            "WHERE UserId=? AND IdempotencyKey IN (SELECT value FROM json_each(?))",
+            (user_id, json.dumps(keys)))}
+
+    outcomes, key_rows, applied = [], [], 0
+    for transfer in transfers:
+        key = transfer.idempotency_key
+        request_hash = transfer_request_hash(transfer) if key is not None else None
+        if key is not None and key in used_keys:
+            transaction_id, used_hash = used_keys[key]
+            if used_hash is not None and used_hash != request_hash:
+                raise IdempotencyKeyConflict(
+                    f"Idempotency key {key!r} was already used for a different transfer.")
+            outcomes.append(TransferOutcome(transaction_id, transfer, duplicate=True))
+            continue
+
+        # Consecutive timestamps keep the batch in order in the transaction history
+        transaction_id = apply_transfer(con, user_id, transfer.from_account, transfer.to_account,
+                                        Decimal(str(transfer.amount)),
+                                        transfer_time=started + timedelta(microseconds=applied))
+        applied += 1
+        if key is not None:
+            used_keys[key] = (transaction_id, request_hash)
+            key_rows.append((user_id, key, request_hash, transaction_id))
+        outcomes.append(TransferOutcome(transaction_id, transfer))
+
+    con.executemany("INSERT INTO TransferIdempotencyKeys (UserId, IdempotencyKey, TransactionNumber, "
+                    "CreatedDateTime, RequestHash) SELECT ?, ?, TransactionNumber, TransferDateTime, ? "
+                    "FROM Transfers WHERE TransactionNumber=?", key_rows)
+
+    logger.debug("transfer_many: user_id=%s, applied=%d, duplicates=%d",
+                 user_id, applied, len(transfers) - applied)
+    return outcomes
+
+
+@time_db("transfer_many")
+def transfer_many(user_id: str, transfers: list[Transfer]) -> list[TransferOutcome]:
+    """
+    Apply a batch of transfers between accounts of the same owner in one transaction.
+
+    Either all of the batch's new transfers are applied or, if any of them is invalid, none
+    is.  Each one is a conditional debit and a credit with ``UPDATE ... RETURNING``, as in
+    ``apply_transfer``, so a balance is only ever changed relative to its stored value.  A
+    transfer whose idempotency key the owner has used before, in an earlier call or earlier
+    in the batch, is skipped and reported as a duplicate of the transfer that used it; the
+    key must come with the same accounts and amount as that transfer.
+
+    :param user_id: The user ID of the account owner.
+    :param transfers: The transfers to apply, in order.
+    :return: One outcome per requested transfer, in the same order.
+    :raises ValueError: If an amount isn't a positive number, an account isn't one of the
+        owner's or is both the source and the destination of a transfer, or a balance
+        doesn't cover the transfers out of it.
+    :raises IdempotencyKeyConflict: If a used idempotency key comes with a different transfer.
+    """
+    return run_in_write_transaction(apply_transfers, user_id, transfers)
+
+
+def history_page_sql(after_cursor: bool) -> str:
+    """The transaction history query for a first page, or for a page after a cursor."""
+    return TRANSACTION_HISTORY_SQL.format(before=HISTORY_BEFORE_CURSOR if after_cursor else "")
+
+
+def encode_history_cursor(row: sqlite3.Row) -> str:
+    """Turn the last transfer on a page into an opaque cursor for the next page."""
+    position = json.dumps([row['TransferDateTime'], row['TransactionNumber']])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_history_cursor(cursor: str) -> tuple[str, str]:
+    """
+    Recover the (TransferDateTime, TransactionNumber) position from a cursor.
+
+    :raises ValueError: If the cursor wasn't produced by ``encode_history_cursor``.
+    """
+    try:
+        transfer_time, transaction_number = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(transfer_time), str(transaction_number)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid transaction history cursor: {cursor!r}") from e
+
+
+@time_db("load_transaction_history")
+def load_transaction_history(account_number: str, start_date: str, limit: int,
+                             cursor: Optional[str] = None) -> tuple[list[sqlite3.Row], int, Optional[str]]:
+    """
+    Query one page of the transfers into or out of an account since a date, newest first.
+
+    :param account_number: The account number whose history is requested.
+    :param start_date: UTC timestamp of the earliest transfer to include, as made by ``utc_timestamp``.
+    :param limit: The most transfers to return.
+    :param cursor: The ``next_cursor`` of the previous page, or None for the first page.
+    :return: The page's rows, with each transfer's type, signed amount, description and the
+        account's balance after it; the number of transfers in the whole date range; and the
+        cursor of the next page, or None if this is the last one.
+    """
+    params = {"account_number": account_number, "start_date": start_date, "limit": limit + 1}
+    if cursor is not None:
+        params["before_time"], params["before_number"] = decode_history_cursor(cursor)
+    con = get_connection()
+    rows = con.execute(history_page_sql(cursor is not None), params).fetchall()
+    total = con.execute(TRANSACTION_COUNT_SQL, params).fetchone()[0]
+    next_cursor = encode_history_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], total, next_cursor
+
+
+@time_db("load_balance_as_of")
+def load_balance_as_of(account_number: str, as_of: str, con: sqlite3.Connection = None) -> Optional[Decimal]:
+    """
+    Query an account's balance at a moment in the past, after the transfers made up to then.
+
+    The balance is the one right after the account's latest transfer made at or before the
+    moment, which includes every transfer committed before that one.
+
+    :param account_number: The account number whose balance is requested.
+    :param as_of: UTC timestamp of the moment, as made by ``utc_timestamp``; transfers made at
+        that exact time are included.
+    :param con: The connection to use, this thread's connection by default.
+    :return: The balance, or None if there is no such account.
+    """
+    params = {"account_number": account_number, "as_of": as_of}
+    con = con or get_connection()
+    params["until_sequence"] = con.execute(BALANCE_CUTOFF_SQL, params).fetchone()[0]
+    checkpoint = con.execute(BALANCE_CHECKPOINT_SQL, params).fetchone()
+    if checkpoint is None:
+        return None
+    params["since_sequence"] = checkpoint['TransferSequence']
+    return checkpoint['Balance'] + con.execute(BALANCE_DELTA_SQL, params).fetchone()[0]
+
+
+def explain_query_plan(sql: str, params=(), con: sqlite3.Connection = None) -> list[str]:
+    """
+    Return SQLite's plan for a query, one step per line, e.g. ``SEARCH Transfers USING INDEX ...``.
+
+    :param sql: The query to explain.
+    :param params: Parameters for the query's placeholders; their values don't change the plan.
+    :param con: The connection to use, this thread's connection by default.
+    """
+    con = con or get_connection()
+    return [row[3] for row in con.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def load_migrations() -> list[tuple[int, Path]]:
+    """
+    Find the schema migrations in ``DB_MIGRATIONS_DIR``, in the order they apply.
+
+    :return: (version, path) pairs, where the version is the file's four-digit prefix.
+    """
+    migrations = []
+    for path in DB_MIGRATIONS_DIR.iterdir():
+        match = MIGRATION_FILE.match(path.name)
+        if match:
+            migrations.append((int(match.group(1)), path))
+    return sorted(migrations)
+
+
+def _split_statements(script: str) -> list[str]:
+    """Split a SQL script into statements that can be run one at a time."""
+    statements, statement = [], ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            statements.append(statement.strip())
+            statement = ""
+    return statements
+
+
+def apply_migrations(con: sqlite3.Connection) -> list[str]:
+    """
+    Apply the migrations newer than the database's ``user_version``, each in its own transaction.
+
+    The migration's statements and the new ``user_version`` commit together, so a
+    failed migration leaves the schema at the previous version.  The version is
+    read again after taking the write lock, so when several processes start at
+    once only one of them applies each migration.
+
+    :param con: A connection in autocommit mode.
+    :return: The file names of the migrations that were applied.
+    """
+    applied = []
+    for version, path in load_migrations():
+        if con.execute("PRAGMA user_version").fetchone()[0] >= version:
+            continue
+        statements = _split_statements(path.read_text())
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            if con.execute("PRAGMA user_version").fetchone()[0] >= version:
+                con.rollback()
+                continue
+            for statement in statements:
+                con.execute(statement)
+            con.execute(f"PRAGMA user_version = {version}")
+        except BaseException:
+            con.rollback()
+            raise
         con.commit()
-        con.close()
-        print(f"Database {DB_FILE} initialized successfully.")
+        applied.append(path.name)
+    return applied
+
+
+@time_db("init_db")
+def init_db():
+    """
+    Create the database or bring its schema up to date, and add inital test data.
+
+    Databases created before migrations were introduced have ``user_version`` 0;
+    the initial migration only creates missing tables and ignores existing rows,
+    so it is safe to apply to them.
+    """
+    applied = apply_migrations(get_connection())
+    if applied:
+        logger.info("Database %s migrated: %s", DB_FILE, ", ".join(applied))
+    else:
+        logger.info("Database %s already initialized.", DB_FILE)
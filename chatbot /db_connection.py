@@ -0,0 +1,158 @@
+"""Long-lived, tuned SQLite connections shared by the data-access functions."""
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Any, Dict, Iterator
+
+from chatbot.config import (DB_FILE, DB_BUSY_TIMEOUT_MS, DB_SYNCHRONOUS, DB_MMAP_SIZE, DB_CACHE_SIZE_KB,
+                            DB_STATEMENT_CACHE)
+from chatbot.metrics import DB_CONNECTION_ACQUIRES, DB_CONNECTIONS_OPEN
+
+
+def adapt_money(value: Decimal) -> int:
+    """
+    Convert a Decimal amount of money to the whole number of cents stored in a ``CENTS`` column.
+
+    Money parameters go through this explicitly where they are bound; there is no global
+    Decimal adapter, so a Decimal bound to any other column isn't silently scaled by 100.
+
+    :raises ValueError: If the amount has a fraction of a cent.
+    """
+    cents = value.scaleb(2)
+    if cents != cents.to_integral_value():
+        raise ValueError(f"Amount {value} has a fraction of a cent.")
+    return int(cents)
+
+
+CENT = Decimal("0.01")
+
+
+def convert_money(value: bytes) -> Decimal:
+    """Read a ``CENTS`` column back as a Decimal with two decimal places."""
+    return Decimal(int(value)) * CENT
+
+
+# Money columns are declared ``CENTS INTEGER`` (see migration 0006), and computed
+# money columns are named ``"name [CENTS]"``, so only those come back as Decimal values
+sqlite3.register_converter("CENTS", convert_money)
+
+
+class _Connection(sqlite3.Connection):
+    """A plain connection that, unlike ``sqlite3.Connection``, can be weakly referenced."""
+
+
+class ConnectionProvider:
+    """
+    Hands out one persistent connection per thread instead of connecting per call.
+
+    A thread keeps its connection until the thread ends, so Flask worker
+    threads and the MCP server's worker threads stop paying for a connect,
+    schema parse and close on every query.  asyncio tasks on one loop share
+    that thread's connection, which is safe because the data-access functions
+    are synchronous and never yield to the loop inside a transaction.
+
+    Every new connection switches the database to WAL, so readers no longer
+    block behind a writer, and applies the ``synchronous``, ``busy_timeout``,
+    ``mmap_size`` and ``cache_size`` pragmas from config.  Each connection
+    keeps up to ``statement_cache`` prepared statements keyed by SQL text,
+    and returns money columns as Decimal.  Connections run in autocommit
+    mode; writers open transactions explicitly with ``transaction()``.
+    """
+
+    def __init__(self, db_file: str = DB_FILE, busy_timeout_ms: int = DB_BUSY_TIMEOUT_MS,
+                 synchronous: str = DB_SYNCHRONOUS, mmap_size: int = DB_MMAP_SIZE,
+                 cache_size_kb: int = DB_CACHE_SIZE_KB, statement_cache: int = DB_STATEMENT_CACHE):
+        if synchronous.upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError(f"Invalid synchronous level: {synchronous!r}")
+        self.db_file = db_file
+        self.busy_timeout_ms = busy_timeout_ms
+        self.synchronous = synchronous
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self.statement_cache = statement_cache
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: "weakref.WeakSet" = weakref.WeakSet()
+        self._opened = 0
+        self._reused = 0
+
+    def connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        con = getattr(self._local, "connection", None)
+        if con is not None:
+            with self._lock:
+                self._reused += 1
+            DB_CONNECTION_ACQUIRES.labels("reused").inc()
+            return con
+
+        con = self._open()
+        self._local.connection = con
+        with self._lock:
+            self._opened += 1
+            self._connections.add(con)
+        DB_CONNECTION_ACQUIRES.labels("opened").inc()
+        DB_CONNECTIONS_OPEN.inc()
+        # The connection is closed when its thread's storage is released
+        weakref.finalize(con, DB_CONNECTIONS_OPEN.dec)
+        return con
+
+    def _open(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.db_file, timeout=self.busy_timeout_ms / 1000,
+                              isolation_level=None, cached_statements=self.statement_cache,
+                              detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES, factory=_Connection)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute(f"PRAGMA synchronous={self.synchronous}")
+        con.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        con.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        con.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        con.execute("PRAGMA temp_store=MEMORY")
+        return con
+
+    @contextmanager
+    def transaction(self, mode: str = "DEFERRED") -> Iterator[sqlite3.Connection]:
+        """Run the block in one transaction on this thread's connection, rolling back on error."""
+        con = self.connection()
+        con.execute(f"BEGIN {mode}")
+        try:
+            yield con
+        except BaseException:
+            con.rollback()
+            raise
+        else:
+            con.commit()
+
+    def close(self):
+        """Close the calling thread's connection; it is reopened on next use."""
+        con = getattr(self._local, "connection", None)
+        if con is not None:
+            self._local.connection = None
+            con.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Report how often connections were reused rather than opened."""
+        with self._lock:
+            acquires = self._opened + self._reused
+            return {
+                "db_file": self.db_file,
+                "open_connections": len(self._connections),
+                "opened": self._opened,
+                "reused": self._reused,
+                "reuse_rate": self._reused / acquires if acquires else 0.0,
+            }
+
+
+def is_busy_error(error: BaseException) -> bool:
+    """True if SQLite failed because another connection held a conflicting lock."""
+    return (isinstance(error, sqlite3.OperationalError) and
+            getattr(error, "sqlite_errorcode", 0) & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED))
+
+
+db = ConnectionProvider()
+
+
+def get_connection() -> sqlite3.Connection:
+    """This thread's connection to ``DB_FILE``."""
+    return db.connection()
@@ -0,0 +1,168 @@
+"""Rule-based routing of unambiguous account queries straight to MCP tools."""
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from chatbot.config import ACCOUNT_MAPPINGS, FAST_PATH_CONFIDENCE_THRESHOLD
+from chatbot.intent_classifier import IntentPrediction
+from chatbot.intent_detector import IntentDetector
+from chatbot.metrics import FAST_PATH_CONFIDENCE, FAST_PATH_DECISIONS
+
+BALANCE_KEYWORDS = re.compile(r"\bbalances?\b")
+HISTORY_KEYWORDS = re.compile(r"\b(history|transactions?|activity|statement)\b")
+# A balance at a past moment needs get_balance_as_of and a date the rules don't parse
+PAST_MOMENT = re.compile(
+    r"\b(was|were|had|as of)\b|\b\d{4}-\d{2}-\d{2}\b|"
+    r"\b(jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+\d{1,2}(st|nd|rd|th)?\b"
+)
+LIST_ACCOUNTS = re.compile(r"\b(list|show|see|view|what are)\b.*\baccounts\b|^\s*(my )?accounts\s*$")
+
+# Words that suggest a question about products or a request the rules can't read
+AMBIGUITY_MARKERS = re.compile(
+    r"\b(why|how|should|could|would|if|not|don'?t|didn'?t|wrong|and|or|after|before|"
+    r"interest|fee|fees|limit|minimum|close|open|dispute)\b"
+)
+
+DAY_PATTERNS = [
+    (re.compile(r"\b(\d{1,3})\s*days?\b"), 1),
+    (re.compile(r"\b(\d{1,2})\s*weeks?\b"), 7),
+    (re.compile(r"\b(\d{1,2})\s*months?\b"), 30),
+]
+DAY_PHRASES = {"today": 1, "yesterday": 2, "this week": 7, "last week": 7, "past week": 7,
+               "this month": 30, "last month": 30, "past month": 30}
+DEFAULT_HISTORY_DAYS = 30
+
+# Tool each classifier intent corresponds to; agreement raises a rule's confidence, disagreement lowers it
+INTENT_TOOLS = {
+    "balance": "get_account_balance",
+    "history": "get_transaction_history",
+    "accounts": "list_user_accounts",
+}
+INTENT_AGREEMENT_BONUS = 0.1
+INTENT_DISAGREEMENT_PENALTY = 0.4
+
+
+@dataclass
+class RouteDecision:
+    """A tool call the router is prepared to make instead of asking the LLM."""
+
+    function_name: str
+    """The MCP tool to call."""
+
+    args: Dict[str, Any] = field(default_factory=dict)
+    """Tool arguments; ``user_id`` is added by the assistant."""
+
+    confidence: float = 0.0
+    """How sure the rules are that this is what the user meant, from 0 to 1."""
+
+    reason: str = ""
+    """Short explanation of the rule that matched."""
+
+
+class FastPathRouter:
+    """
+    Maps high-confidence balance, history and account-list requests directly to tools.
+
+    Transfers and product questions are never routed; they always go to the LLM.
+    ``route`` returns a decision only when its confidence reaches the threshold,
+    so callers fall back to Gemini otherwise.
+    """
+
+    def __init__(self, threshold: float = FAST_PATH_CONFIDENCE_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._considered = 0
+        self._routed = 0
+
+    def classify(self, text: str, account_mappings: Dict[str, str] = ACCOUNT_MAPPINGS,
+                 intent: Optional[IntentPrediction] = None) -> Optional[RouteDecision]:
+        """Return the best rule-based decision for the text, whatever its confidence."""
+        decision = self._classify_rules(text, account_mappings)
+        if decision is None or intent is None:
+            return decision
+
+        # Weigh the rules against the classifier's reading of the same message
+        if INTENT_TOOLS.get(intent.label) == decision.function_name:
+            adjustment = INTENT_AGREEMENT_BONUS * intent.confidence
+        else:
+            adjustment = -INTENT_DISAGREEMENT_PENALTY * intent.confidence
+        decision.confidence = round(min(0.99, max(0.0, decision.confidence + adjustment)), 2)
+        decision.reason += f"; classifier says {intent.label} ({intent.confidence:.2f})"
+        return decision
+
+    def _classify_rules(self, text: str, account_mappings: Dict[str, str]) -> Optional[RouteDecision]:
+        """Decision from the keyword rules alone."""
+        matches = IntentDetector.scan(text, account_mappings)
+        text_lower = matches.text
+        if not text_lower or "transfer" in matches.categories:
+            return None
+
+        accounts = matches.accounts
+        confidence = 0.95
+        if AMBIGUITY_MARKERS.search(text_lower):
+            confidence -= 0.4
+        if len(text_lower.split()) > 12:
+            confidence -= 0.2
+        confidence = round(confidence, 2)
+
+        if BALANCE_KEYWORDS.search(text_lower):
+            if PAST_MOMENT.search(text_lower):
+                return None
+            if len(accounts) != 1:
+                return RouteDecision("get_account_balance", {}, 0.3,
+                                     f"balance request naming {len(accounts)} accounts")
+            return RouteDecision("get_account_balance", {"account_number": accounts[0]},
+                                 confidence, "balance request for one account")
+
+        if HISTORY_KEYWORDS.search(text_lower):
+            if len(accounts) != 1:
+                return RouteDecision("get_transaction_history", {}, 0.3,
+                                     f"history request naming {len(accounts)} accounts")
+            return RouteDecision("get_transaction_history",
+                                 {"account_number": accounts[0], "days": self._days(text_lower)},
+                                 round(confidence - 0.05, 2), "history request for one account")
+
+        if LIST_ACCOUNTS.search(text_lower) and not accounts:
+            return RouteDecision("list_user_accounts", {}, round(confidence - 0.05, 2), "account list request")
+
+        return None
+
+    def route(self, text: str, account_mappings: Dict[str, str] = ACCOUNT_MAPPINGS,
+              intent: Optional[IntentPrediction] = None) -> Optional[RouteDecision]:
+        """Return a decision if it is confident enough to skip the LLM, else None."""
+        decision = self.classify(text, account_mappings, intent)
+        routed = decision is not None and decision.confidence >= self.threshold
+        with self._lock:
+            self._considered += 1
+            if routed:
+                self._routed += 1
+        if decision is not None:
+            FAST_PATH_CONFIDENCE.observe(decision.confidence)
+        FAST_PATH_DECISIONS.labels("routed" if routed else "fallback").inc()
+        return decision if routed else None
+
+    @staticmethod
+    def _days(text_lower: str) -> int:
+        """Number of days of history asked for, defaulting to 30."""
+        for pattern, multiplier in DAY_PATTERNS:
+            match = pattern.search(text_lower)
+            if match:
+                return max(1, int(match.group(1)) * multiplier)
+        for phrase, days in DAY_PHRASES.items():
+            if phrase in text_lower:
+                return days
+        return DEFAULT_HISTORY_DAYS
+
+    def stats(self) -> Dict[str, Any]:
+        """Report how many messages were routed without the LLM."""
+        with self._lock:
+            return {
+                "threshold": self.threshold,
+                "considered": self._considered,
+                "routed": self._routed,
+                "hit_rate": self._routed / self._considered if self._considered else 0.0,
+            }
+
+
+fast_path_router = FastPathRouter()
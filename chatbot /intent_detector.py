@@ -1,41 +1,194 @@
 """Intent detection for the banking assistant."""
 import re
-from typing import Dict, List, Any, Optional, Tuple
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+from chatbot.config import ACCOUNT_MAPPINGS
 from chatbot.config_client import BANKING_DOMAINS, GREETING_PATTERNS, FAREWELL_PATTERNS, COMMANDS
 
+TRANSFER_KEYWORDS = ["transfer", "send", "move money", "move funds"]
+
+# Endings a keyword may carry and still match, so "card" matches "cards" but not "discard"
+INFLECTIONS = ["s", "es", "ed", "ing", "red", "ring", "al", "als", "ment", "ments"]
+
+# Greetings that may open a longer message, e.g. "hello, what's my balance?"
+LEADING_GREETINGS = {"hello", "hi"}
+
+# Punctuation allowed after a whole-message greeting, e.g. "hi!"
+TRAILING_PUNCTUATION = " !.?,"
+
+
+@dataclass(frozen=True)
+class TextMatches:
+    """Everything the keyword tables found in one message."""
+
+    text: str
+    """The message, stripped and lower-cased."""
+
+    categories: FrozenSet[str] = frozenset()
+    """Tables with a keyword anywhere in the text: ``banking`` and ``transfer``."""
+
+    accounts: Tuple[str, ...] = ()
+    """Distinct account numbers named in the text, in order of mention."""
+
+    whole: FrozenSet[str] = frozenset()
+    """Tags of a keyword that is the entire message, e.g. ``greeting`` or ``command:exit``."""
+
+    leading: FrozenSet[str] = frozenset()
+    """Tags of a keyword that opens the message as a whole word, plus ``leading_greeting``."""
+
+
+def _trie_pattern(phrases) -> str:
+    """
+    Regex matching any of the phrases, with shared prefixes factored out.
+
+    Python's ``re`` tries alternatives one by one, so ``card|credit|credit card``
+    re-reads the same characters; a prefix tree lets each position be decided
+    in one walk.  Optional tails are greedy, so the longest phrase wins.
+    """
+    root: Dict[str, dict] = {}
+    for phrase in phrases:
+        node = root
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        alternatives = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ""
+        body = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+
+    return build(root)
+
+
+class KeywordMatcher:
+    """
+    Finds every keyword of the intent tables in one regex pass over the text.
+
+    All phrases are compiled into a single prefix-tree regex anchored on word
+    boundaries, and the longest phrase wins, so "credit card" beats "credit".
+    A phrase also carries the tags of any shorter phrase inside it, with or
+    without an inflection, so that match still counts as "credit" and "card"
+    for the banking check, and the account name "savings" still counts as
+    the banking keyword "saving".
+    """
+
+    def __init__(self, account_mappings: Dict[str, str] = ACCOUNT_MAPPINGS):
+        tags: Dict[str, Set[Tuple[str, str]]] = {}
+
+        def add(phrases, category, value=""):
+            for phrase in phrases:
+                tags.setdefault(phrase.lower(), set()).add((category, value))
+
+        add(BANKING_DOMAINS, "banking")
+        add(TRANSFER_KEYWORDS, "transfer")
+        add(GREETING_PATTERNS, "greeting")
+        add(FAREWELL_PATTERNS, "farewell")
+        for command, patterns in COMMANDS.items():
+            add(patterns, f"command:{command}")
+        for name, number in account_mappings.items():
+            add([name], "account", number)
+
+        inflections = _trie_pattern(INFLECTIONS)
+
+        # Per phrase: (categories found anywhere, accounts named, its own tags when it opens the message)
+        self._phrases: Dict[str, Tuple[FrozenSet[str], Tuple[str, ...], FrozenSet[str]]] = {}
+        for phrase, own in tags.items():
+            inner = set()
+            for other, other_tags in tags.items():
+                if re.search(r"\b" + re.escape(other) + r"(?:" + inflections + r")?\b", phrase):
+                    inner |= other_tags
+            self._phrases[phrase] = (
+                frozenset(category for category, _ in inner if category in ("banking", "transfer")),
+                tuple(dict.fromkeys(number for category, number in sorted(inner) if category == "account")),
+                frozenset(category for category, _ in own),
+            )
+
+        self._pattern = re.compile(r"\b(" + _trie_pattern(tags) + r")(" + inflections + r")?\b")
+
+    def scan(self, text: str) -> TextMatches:
+        """Lower-case the text once and collect every category and account it mentions."""
+        text_lower = text.strip().lower()
+        categories: Set[str] = set()
+        accounts: List[str] = []
+        whole: Set[str] = set()
+        leading: Set[str] = set()
+        for match in self._pattern.finditer(text_lower):
+            phrase, suffix = match.groups()
+            phrase_categories, phrase_accounts, own = self._phrases[phrase]
+            categories |= phrase_categories
+            for account in phrase_accounts:
+                if account not in accounts:
+                    accounts.append(account)
+            if match.start() == 0 and not suffix:
+                rest = text_lower[match.end():]
+                if not rest:
+                    whole |= own
+                elif "greeting" in own and not rest.strip(TRAILING_PUNCTUATION):
+                    whole.add("greeting")
+                if not rest or rest[0] == " ":
+                    leading |= own
+                if phrase.split(" ", 1)[0] in LEADING_GREETINGS:
+                    leading.add("leading_greeting")
+        return TextMatches(text_lower, frozenset(categories), tuple(accounts), frozenset(whole), frozenset(leading))
+
+
+_default_matcher = KeywordMatcher()
+
+
+@lru_cache(maxsize=16)
+def _matcher_for(mapping_items: FrozenSet[Tuple[str, str]]) -> KeywordMatcher:
+    return KeywordMatcher(dict(mapping_items))
+
+
+@lru_cache(maxsize=256)
+def _scan_default(text: str) -> TextMatches:
+    return _default_matcher.scan(text)
+
+
+def scan_text(text: str, account_mappings: Optional[Dict[str, str]] = None) -> TextMatches:
+    """
+    Scan the text with the matcher for these account mappings (compiled once per mapping).
+
+    Scans with the default mappings are cached, so the several checks run on
+    one incoming message share a single pass; the result is immutable.
+    """
+    if account_mappings is None or account_mappings is ACCOUNT_MAPPINGS:
+        return _scan_default(text)
+    return _matcher_for(frozenset(account_mappings.items())).scan(text)
+
+
 class IntentDetector:
     """Detects user intents from input text."""
     
+    @staticmethod
+    def scan(text: str, account_mappings: Optional[Dict[str, str]] = None) -> TextMatches:
+        """Find every intent keyword and account name in the text in a single pass."""
+        return scan_text(text, account_mappings)
+    
     @staticmethod
     def is_banking_related(text: str) -> bool:
         """Check if the text is related to banking."""
-        text_lower = text.lower()
-        return any(domain in text_lower for domain in BANKING_DOMAINS)
+        return "banking" in scan_text(text).categories
     
     @staticmethod
     def get_account_number_from_text(text: str, account_mappings: dict) -> str:
         """Extract account number from text based on account name mentions."""
-        text_lower = text.lower()
-        for key, value in account_mappings.items():
-            if key in text_lower:
-                return value
-        return None
+        accounts = scan_text(text, account_mappings).accounts
+        return accounts[0] if accounts else None
     
     @staticmethod
     def is_greeting(text: str) -> bool:
         """Check if the text is a greeting."""
-        text_lower = text.strip().lower()
-        return (text_lower in GREETING_PATTERNS or 
-                text_lower + "!" in GREETING_PATTERNS or
-                text_lower.startswith("hello") or
-                text_lower.startswith("hi "))
+        matches = scan_text(text)
+        return "greeting" in matches.whole or "leading_greeting" in matches.leading
     
     @staticmethod
     def is_farewell(text: str) -> bool:
         """Check if the text is a farewell."""
-        text_lower = text.strip().lower()
-        return any(text_lower == pattern or text_lower.startswith(pattern + " ")
-                  for pattern in FAREWELL_PATTERNS)
+        return "farewell" in scan_text(text).leading
     
     @staticmethod
     def is_short_response(text: str) -> bool:
@@ -48,8 +201,7 @@ class IntentDetector:
     @staticmethod
     def is_transfer_request(text: str) -> bool:
         """Check if this is a transfer request."""
-        transfer_keywords = ["transfer", "send", "move money", "move funds"]
-        return any(keyword in text.lower() for keyword in transfer_keywords)
+        return "transfer" in scan_text(text).categories
     
     @staticmethod
     def detect_command(text: str) -> Tuple[Optional[str], Optional[str]]:
@@ -59,19 +211,19 @@ class IntentDetector:
         Returns:
             Tuple of (command_type, command_arg) or (None, None) if no command detected
         """
-        text_lower = text.strip().lower()
+        matches = scan_text(text)
         
         # Check for exit command
-        if any(text_lower == cmd for cmd in COMMANDS["exit"]):
+        if "command:exit" in matches.whole:
             return ("exit", None)
             
         # Check for clear command
-        if any(text_lower == cmd for cmd in COMMANDS["clear"]):
+        if "command:clear" in matches.whole:
             return ("clear", None)
             
         # Check for user command
-        if text_lower.startswith("user "):
-            return ("user", text[5:].strip())
+        if matches.text.startswith("user "):
+            return ("user", text.strip()[5:].strip())
             
         return (None, None)
     
@@ -0,0 +1,185 @@
+"""Gemini calls with deadlines, retries and hedged requests."""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Optional
+
+from google.api_core import exceptions as google_exceptions
+
+from chatbot.config import (LLM_DEADLINE, LLM_ATTEMPT_TIMEOUT, LLM_MAX_RETRIES, LLM_RETRY_BACKOFF,
+                            LLM_HEDGE_ENABLED, LLM_HEDGE_MIN_DELAY)
+from chatbot.metrics import LLM_HEDGES, LLM_RETRIES, LLM_TIMEOUTS
+
+# Errors worth retrying: rate limits, overload and transient server faults
+RETRYABLE_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+)
+
+# Latencies of whole ``generate`` calls kept for the hedge delay, and how many are needed before hedging starts
+LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+
+class LLMTimeout(Exception):
+    """Raised when a Gemini call does not finish within its overall deadline."""
+
+
+class ResilientLLM:
+    """
+    Runs Gemini requests through ``generate_content_async`` so deadlines really cancel them.
+
+    Each call gets an overall ``deadline``; every attempt within it is limited to
+    ``attempt_timeout``.  Timeouts and retryable API errors are retried up to
+    ``max_retries`` times with jittered exponential backoff.  When hedging is on,
+    an attempt still running after the recent p95 latency is raced against a
+    second identical request and whichever answers first is used.  Generating
+    content has no side effects, so a duplicate request is safe; tool calls are
+    only run on the response that wins.
+    """
+
+    def __init__(self, deadline: float = LLM_DEADLINE, attempt_timeout: float = LLM_ATTEMPT_TIMEOUT,
+                 max_retries: int = LLM_MAX_RETRIES, retry_backoff: float = LLM_RETRY_BACKOFF,
+                 hedge: bool = LLM_HEDGE_ENABLED, hedge_min_delay: float = LLM_HEDGE_MIN_DELAY):
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging: the recent p95 latency, or None if hedging is off."""
+        if not self.hedge or len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return max(self.hedge_min_delay, p95)
+
+    async def generate(self, model, contents, **kwargs) -> Any:
+        """Return ``model.generate_content_async(contents)``, retried and hedged within the deadline."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        attempt = 0
+        while True:
+            timeout = min(self.attempt_timeout, deadline - loop.time())
+            try:
+                return await self._hedged(model, contents, timeout, kwargs)
+            except asyncio.TimeoutError:
+                reason = "timeout"
+                error = None
+            except RETRYABLE_ERRORS as e:
+                reason = type(e).__name__
+                error = e
+
+            backoff = random.uniform(0, self.retry_backoff * 2 ** attempt)
+            if attempt >= self.max_retries or loop.time() + backoff >= deadline:
+                if error is not None:
+                    raise error
+                LLM_TIMEOUTS.inc()
+                raise LLMTimeout(f"Gemini did not respond within {self.deadline:g}s")
+            attempt += 1
+            LLM_RETRIES.labels(reason).inc()
+            await asyncio.sleep(backoff)
+
+    async def stream(self, model, contents, **kwargs):
+        """
+        Yield chunks of a streamed response within the deadline.
+
+        Failures before the first chunk are retried like ``generate``; once text
+        has been yielded the request cannot be replayed, so later failures raise.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        attempt = 0
+        while True:
+            timeout = min(self.attempt_timeout, deadline - loop.time())
+            chunks = None
+            try:
+                started = time.perf_counter()
+                response = await asyncio.wait_for(
+                    model.generate_content_async(contents, stream=True, **kwargs), timeout)
+                chunks = response.__aiter__()
+                # Time to the first chunk is much shorter than a whole response, so it is
+                # left out of the latencies the hedge delay for ``generate`` is taken from
+                first = await asyncio.wait_for(chunks.__anext__(), timeout - (time.perf_counter() - started))
+                break
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                reason = "timeout"
+                error = None
+            except RETRYABLE_ERRORS as e:
+                reason = type(e).__name__
+                error = e
+            if chunks is not None and hasattr(chunks, "aclose"):
+                await chunks.aclose()
+
+            backoff = random.uniform(0, self.retry_backoff * 2 ** attempt)
+            if attempt >= self.max_retries or loop.time() + backoff >= deadline:
+                if error is not None:
+                    raise error
+                LLM_TIMEOUTS.inc()
+                raise LLMTimeout(f"Gemini did not start responding within {self.deadline:g}s")
+            attempt += 1
+            LLM_RETRIES.labels(reason).inc()
+            await asyncio.sleep(backoff)
+
+        try:
+            yield first
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, deadline - loop.time()))
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    LLM_TIMEOUTS.inc()
+                    raise LLMTimeout(f"Gemini did not finish responding within {self.deadline:g}s")
+                yield chunk
+        finally:
+            if hasattr(chunks, "aclose"):
+                await chunks.aclose()
+
+    async def _attempt(self, model, contents, timeout: float, kwargs) -> Any:
+        started = time.perf_counter()
+        response = await asyncio.wait_for(model.generate_content_async(contents, **kwargs), timeout)
+        self._latencies.append(time.perf_counter() - started)
+        return response
+
+    async def _hedged(self, model, contents, timeout: float, kwargs) -> Any:
+        """Run one attempt, racing it against a second request if it runs past the hedge delay."""
+        delay = self.hedge_delay()
+        if delay is None or delay >= timeout:
+            return await self._attempt(model, contents, timeout, kwargs)
+
+        primary = asyncio.ensure_future(self._attempt(model, contents, timeout, kwargs))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+            LLM_HEDGES.labels("sent").inc()
+            hedge = asyncio.ensure_future(self._attempt(model, contents, timeout - delay, kwargs))
+            tasks.append(hedge)
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            LLM_HEDGES.labels("won").inc()
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+llm_client = ResilientLLM()
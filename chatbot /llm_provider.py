@@ -0,0 +1,394 @@
+"""
+LLM backends for chat, function calling and embeddings.
+
+Everything that talks to a language model gets it from ``get_provider()``:
+``generative_model`` for Gemini-style chat with function calling,
+``chat_model`` for LangChain chains and ``embeddings`` for the vector store.
+``LLM_PROVIDER`` picks the backend:
+
+- ``gemini``: the Google Gemini API (the default).
+- ``record``: Gemini, with every response also written to ``LLM_RECORDINGS_DIR``.
+- ``replay``: answers from ``LLM_RECORDINGS_DIR`` only, with no network access,
+  after the recorded latency (or ``LLM_REPLAY_LATENCY`` seconds).
+"""
+import abc
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from chatbot.config import LLM_PROVIDER, LLM_RECORDINGS_DIR, LLM_REPLAY_LATENCY, LLM_REPLAY_JITTER
+
+
+class FunctionCall:
+    """A function call with the ``name``/``args`` shape of Gemini's FunctionCall."""
+
+    def __init__(self, name: str, args: Dict[str, Any]):
+        self.name = name
+        self.args = args
+
+
+class TextPart:
+    """A response part holding text."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FunctionCallPart:
+    """A response part holding a function call."""
+
+    def __init__(self, function_call: FunctionCall):
+        self.function_call = function_call
+
+
+class ScriptedResponse:
+    """A generate_content response, or one chunk of a streamed response, built from plain parts."""
+
+    def __init__(self, parts: List[Any]):
+        self.parts = parts
+
+    @property
+    def text(self) -> str:
+        return "".join(part.text for part in self.parts if hasattr(part, "text"))
+
+
+class ScriptedStreamResponse:
+    """Async iterator over streamed chunks, delayed like a real stream."""
+
+    def __init__(self, chunks: List[ScriptedResponse], first_chunk_delay: float, chunk_delay: float):
+        self._chunks = chunks
+        self._first_chunk_delay = first_chunk_delay
+        self._chunk_delay = chunk_delay
+
+    async def __aiter__(self):
+        for i, chunk in enumerate(self._chunks):
+            await asyncio.sleep(self._first_chunk_delay if i == 0 else self._chunk_delay)
+            yield chunk
+
+
+class LLMProvider(abc.ABC):
+    """Interface every LLM backend implements."""
+
+    name = "base"
+
+    @abc.abstractmethod
+    def generative_model(self, model_name: str, temperature: float,
+                         tools: Optional[List[dict]] = None, tool_config: Optional[dict] = None):
+        """Return an object with ``generate_content`` and ``generate_content_async(stream=...)``."""
+
+    @abc.abstractmethod
+    def chat_model(self, model_name: str, temperature: float) -> BaseChatModel:
+        """Return a LangChain chat model."""
+
+    @abc.abstractmethod
+    def embeddings(self, model_name: str) -> Embeddings:
+        """Return a LangChain embeddings model."""
+
+
+class GeminiProvider(LLMProvider):
+    """The Google Gemini API, configured from ``GEMINI_API_KEY`` on first use."""
+
+    name = "gemini"
+
+    def __init__(self):
+        self._configured = False
+        self._lock = threading.Lock()
+
+    def _api_key(self) -> str:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not found in environment variables")
+        with self._lock:
+            if not self._configured:
+                import google.generativeai as genai
+                genai.configure(api_key=api_key)
+                self._configured = True
+        return api_key
+
+    def generative_model(self, model_name, temperature, tools=None, tool_config=None):
+        import google.generativeai as genai
+        self._api_key()
+        tool_kwargs = {"tools": tools, "tool_config": tool_config} if tools else {}
+        return genai.GenerativeModel(
+            model_name=model_name,
+            generation_config=genai.GenerationConfig(temperature=temperature),
+            **tool_kwargs
+        )
+
+    def chat_model(self, model_name, temperature):
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(model=model_name, temperature=temperature, google_api_key=self._api_key())
+
+    def embeddings(self, model_name):
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        return GoogleGenerativeAIEmbeddings(model=model_name, google_api_key=self._api_key())
+
+
+class ReplayMiss(KeyError):
+    """Raised in replay mode when no recording matches a request."""
+
+
+def _plain(value: Any) -> Any:
+    """Convert proto maps and lists (e.g. function call args) into JSON-friendly values."""
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if hasattr(value, "items"):
+        return {key: _plain(item) for key, item in value.items()}
+    if hasattr(value, "__iter__"):
+        return [_plain(item) for item in value]
+    return str(value)
+
+
+def _dump_parts(parts) -> List[Dict[str, Any]]:
+    dumped = []
+    for part in parts:
+        func_call = getattr(part, "function_call", None)
+        if func_call and getattr(func_call, "name", None):
+            dumped.append({"function_call": {"name": func_call.name, "args": _plain(func_call.args)}})
+        elif getattr(part, "text", None):
+            dumped.append({"text": part.text})
+    return dumped
+
+
+def _load_parts(parts: List[Dict[str, Any]]) -> List[Any]:
+    return [FunctionCallPart(FunctionCall(part["function_call"]["name"], dict(part["function_call"]["args"])))
+            if "function_call" in part else TextPart(part["text"])
+            for part in parts]
+
+
+class RecordingStore:
+    """
+    Recordings on disk, one JSON file per distinct request.
+
+    A request's key hashes everything that determines the answer: the kind of
+    call, the model, its settings and the exact input.
+    """
+
+    def __init__(self, directory: str, latency: Optional[float] = None, jitter: float = 0.0):
+        self.directory = directory
+        self.latency = latency
+        self.jitter = jitter
+
+    @staticmethod
+    def key(kind: str, **request) -> str:
+        canonical = json.dumps({"kind": kind, **request}, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def save(self, key: str, kind: str, data: Any, latency: float):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, with a temporary name of our own in case another thread records the same request
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"kind": kind, "latency": latency, "data": data}, f)
+        os.replace(tmp_path, path)
+
+    def load(self, key: str, kind: str) -> Dict[str, Any]:
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ReplayMiss(f"No recorded {kind} response for request {key[:12]} in {self.directory}; "
+                             f"run once with LLM_PROVIDER=record to capture it")
+
+    def delay(self, key: str, recorded: float) -> float:
+        """Replay delay: the recorded latency unless overridden, with jitter seeded by the request."""
+        latency = recorded if self.latency is None else self.latency
+        if self.jitter:
+            latency += random.Random(key).uniform(-self.jitter, self.jitter)
+        return max(0.0, latency)
+
+
+class _RecordingStream:
+    """Passes a real streamed response through while recording its chunks."""
+
+    def __init__(self, response, store: RecordingStore, key: str, started: float):
+        self._response = response
+        self._store = store
+        self._key = key
+        self._started = started
+
+    async def __aiter__(self):
+        chunks = []
+        first_chunk_latency = None
+        async for chunk in self._response:
+            if first_chunk_latency is None:
+                first_chunk_latency = time.perf_counter() - self._started
+            chunks.append(_dump_parts(chunk.parts))
+            yield chunk
+        self._store.save(self._key, "stream", chunks, first_chunk_latency or 0.0)
+
+
+class _RecordReplayModel:
+    """A generative model that records the inner model's responses, or replays them."""
+
+    def __init__(self, provider: "RecordReplayProvider", model_name: str, temperature: float,
+                 tools: Optional[List[dict]], tool_config: Optional[dict]):
+        self._provider = provider
+        self._request = {"model": model_name, "temperature": temperature,
+                         "tools": tools, "tool_config": tool_config}
+        self._inner = None
+        if provider.mode == "record":
+            self._inner = provider.inner.generative_model(model_name, temperature, tools, tool_config)
+
+    def _key(self, kind: str, contents) -> str:
+        return self._provider.store.key(kind, contents=contents, **self._request)
+
+    def generate_content(self, contents, **kwargs):
+        store = self._provider.store
+        key = self._key("generate", contents)
+        if self._inner is not None:
+            started = time.perf_counter()
+            response = self._inner.generate_content(contents, **kwargs)
+            store.save(key, "generate", _dump_parts(response.parts), time.perf_counter() - started)
+            return response
+        recording = store.load(key, "generate")
+        time.sleep(store.delay(key, recording["latency"]))
+        return ScriptedResponse(_load_parts(recording["data"]))
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        store = self._provider.store
+        kind = "stream" if stream else "generate"
+        key = self._key(kind, contents)
+        if self._inner is not None:
+            started = time.perf_counter()
+            response = await self._inner.generate_content_async(contents, stream=stream, **kwargs)
+            if stream:
+                return _RecordingStream(response, store, key, started)
+            store.save(key, kind, _dump_parts(response.parts), time.perf_counter() - started)
+            return response
+        recording = store.load(key, kind)
+        delay = store.delay(key, recording["latency"])
+        if stream:
+            chunks = [ScriptedResponse(_load_parts(parts)) for parts in recording["data"]]
+            return ScriptedStreamResponse(chunks, delay, 0.0)
+        await asyncio.sleep(delay)
+        return ScriptedResponse(_load_parts(recording["data"]))
+
+
+class _RecordReplayChatModel(BaseChatModel):
+    """A LangChain chat model that records the inner model's replies, or replays them."""
+
+    provider: Any
+    inner: Any = None
+    model_name: str
+    temperature: float
+
+    @property
+    def _llm_type(self) -> str:
+        return f"{self.provider.mode}-{self.model_name}"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        store = self.provider.store
+        key = store.key("chat", model=self.model_name, temperature=self.temperature, stop=stop,
+                        messages=[(message.type, message.content) for message in messages])
+        if self.inner is not None:
+            started = time.perf_counter()
+            reply = self.inner.invoke(messages, stop=stop, **kwargs)
+            store.save(key, "chat", reply.content, time.perf_counter() - started)
+            content = reply.content
+        else:
+            recording = store.load(key, "chat")
+            time.sleep(store.delay(key, recording["latency"]))
+            content = recording["data"]
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+
+class _RecordReplayEmbeddings(Embeddings):
+    """LangChain embeddings that record the inner model's vectors, or replay them."""
+
+    def __init__(self, provider: "RecordReplayProvider", model_name: str):
+        self._provider = provider
+        self._model_name = model_name
+        self._inner = provider.inner.embeddings(model_name) if provider.mode == "record" else None
+
+    def _embed(self, kind: str, texts: List[str]) -> List[List[float]]:
+        store = self._provider.store
+        key = store.key(kind, model=self._model_name, texts=texts)
+        if self._inner is not None:
+            started = time.perf_counter()
+            if kind == "embed_query":
+                vectors = [self._inner.embed_query(texts[0])]
+            else:
+                vectors = self._inner.embed_documents(texts)
+            store.save(key, kind, [list(vector) for vector in vectors], time.perf_counter() - started)
+            return vectors
+        recording = store.load(key, kind)
+        time.sleep(store.delay(key, recording["latency"]))
+        return recording["data"]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed("embed_documents", list(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed("embed_query", [text])[0]
+
+
+class RecordReplayProvider(LLMProvider):
+    """
+    Records another provider's responses to disk, or replays them without it.
+
+    In ``record`` mode every request goes to ``inner`` and its response and
+    latency are saved.  In ``replay`` mode identical requests are answered from
+    the recordings, after the recorded latency or a fixed ``latency``, so whole
+    pipeline runs are repeatable and need no network access.
+    """
+
+    def __init__(self, mode: str, directory: str = LLM_RECORDINGS_DIR, inner: Optional[LLMProvider] = None,
+                 latency: Optional[float] = None, jitter: float = 0.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown record/replay mode: {mode}")
+        self.mode = mode
+        self.name = mode
+        self.inner = inner or (GeminiProvider() if mode == "record" else None)
+        self.store = RecordingStore(directory, latency, jitter)
+
+    def generative_model(self, model_name, temperature, tools=None, tool_config=None):
+        return _RecordReplayModel(self, model_name, temperature, tools, tool_config)
+
+    def chat_model(self, model_name, temperature):
+        inner = self.inner.chat_model(model_name, temperature) if self.mode == "record" else None
+        return _RecordReplayChatModel(provider=self, inner=inner, model_name=model_name, temperature=temperature)
+
+    def embeddings(self, model_name):
+        return _RecordReplayEmbeddings(self, model_name)
+
+
+_provider: Optional[LLMProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> LLMProvider:
+    """Return the process-wide provider selected by LLM_PROVIDER."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            if LLM_PROVIDER == "gemini":
+                _provider = GeminiProvider()
+            elif LLM_PROVIDER in ("record", "replay"):
+                latency = float(LLM_REPLAY_LATENCY) if LLM_REPLAY_LATENCY else None
+                _provider = RecordReplayProvider(LLM_PROVIDER, LLM_RECORDINGS_DIR,
+                                                 latency=latency, jitter=LLM_REPLAY_JITTER)
+            else:
+                raise ValueError(f"Unknown LLM_PROVIDER: {LLM_PROVIDER}")
+        return _provider
+
+
+def set_provider(provider: LLMProvider):
+    """Use a different provider for the rest of the process (e.g. a stub in load tests)."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
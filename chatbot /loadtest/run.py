@@ -0,0 +1,307 @@
+"""
+Open-loop load generator for /auth/login and /chat.
+
+By default it starts a throwaway stack: the MCP server with a stub RAG chatbot
+(``serve_mcp``) and the Flask app with a stub Gemini model (``serve_app``), both
+pointed at a fresh SQLite database seeded with load-test users.  Use
+``--base-url`` to target an already running app instead.
+
+Example::
+
+    python -m chatbot.loadtest.run --rate 20 --duration 60 \\
+        --mix balance=4,history=2,transfer=1,rag=3 --output report.json
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+import requests
+
+from chatbot.db_connection import adapt_money
+from chatbot.loadtest.stub_gemini import loadtest_account_number, loadtest_user_id
+
+LOADTEST_PASSWORD = "loadtest"
+LOADTEST_OPENING_BALANCE = Decimal(100000)
+
+MESSAGES = {
+    "balance": [
+        "What's my savings account balance?",
+        "Show me my chequing balance",
+        "What is the balance on my credit card?",
+    ],
+    "history": [
+        "Show me recent transactions in my checking account",
+        "Show savings history for 7 days",
+        "List my chequing transactions for the last 30 days",
+    ],
+    "transfer": [
+        "Transfer $1 from my savings to checking account",
+        "Transfer $2.50 from my chequing to savings",
+    ],
+    "rag": [
+        "What are the benefits of an RBC TFSA?",
+        "What is the RRSP contribution limit at RBC?",
+        "How does RBC mortgage pre-approval work?",
+    ],
+}
+
+
+def parse_mix(mix: str) -> List[Tuple[str, float]]:
+    """Parse ``kind=weight,...`` into (kind, weight) pairs."""
+    weights = []
+    for item in mix.split(","):
+        kind, _, weight = item.partition("=")
+        kind = kind.strip()
+        if kind not in MESSAGES:
+            raise ValueError(f"Unknown message kind {kind!r}; choose from {sorted(MESSAGES)}")
+        weights.append((kind, float(weight or 1)))
+    return weights
+
+
+def seed_users(db_file: str, count: int):
+    """Create load-test users, each with chequing, savings and credit card accounts."""
+    con = sqlite3.connect(db_file)
+    with con:
+        for index in range(1, count + 1):
+            user_id = loadtest_user_id(index)
+            con.execute("INSERT OR IGNORE INTO UserCredentials (UserId, Password) VALUES (?, ?)",
+                        (user_id, LOADTEST_PASSWORD))
+            for kind, name in (("chequing", "Chequing"), ("savings", "Saving"), ("credit", "Credit Card")):
+                con.execute(
+                    "INSERT OR IGNORE INTO Accounts (AccountNumber, UserId, AccountName, Balance, CurrencyCode) "
+                    "VALUES (?, ?, ?, ?, 'CAD')",
+                    (loadtest_account_number(index, kind), user_id, name, adapt_money(LOADTEST_OPENING_BALANCE))
+                )
+    con.close()
+
+
+def wait_for_port(host: str, port: int, timeout: float):
+    """Block until something is listening on host:port."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"Nothing listening on {host}:{port} after {timeout}s")
+
+
+def start_stack(args) -> Tuple[List[subprocess.Popen], str]:
+    """Start the stub MCP server and app against a fresh database; return the processes and app URL."""
+    workdir = tempfile.mkdtemp(prefix="chatbot-loadtest-")
+    env = dict(os.environ)
+    env["CHATBOT_DB_FILE"] = os.path.join(workdir, "bank.db")
+    env["MCP_PORT"] = str(args.mcp_port)
+    env.setdefault("ADMISSION_MAX_PER_USER", "4")
+
+    # Build the schema with the app's own init_db, then add the load-test users
+    subprocess.run([sys.executable, "-c", "from chatbot.database import init_db; init_db()"],
+                   env=env, check=True, stdout=subprocess.DEVNULL)
+    seed_users(env["CHATBOT_DB_FILE"], args.users)
+
+    log = open(os.path.join(workdir, "servers.log"), "w")
+    processes = [
+        subprocess.Popen([sys.executable, "-m", "chatbot.loadtest.serve_mcp",
+                          "--rag-latency", str(args.rag_latency)],
+                         env=env, stdout=log, stderr=subprocess.STDOUT),
+    ]
+    wait_for_port("127.0.0.1", args.mcp_port, 60)
+    processes.append(
+        subprocess.Popen([sys.executable, "-m", "chatbot.loadtest.serve_app",
+                          "--port", str(args.app_port),
+                          "--llm-latency", str(args.llm_latency),
+                          "--llm-jitter", str(args.llm_jitter),
+                          "--llm-tail-rate", str(args.llm_tail_rate),
+                          "--llm-tail-latency", str(args.llm_tail_latency),
+                          "--llm-error-rate", str(args.llm_error_rate)],
+                         env=env, stdout=log, stderr=subprocess.STDOUT)
+    )
+    wait_for_port("127.0.0.1", args.app_port, 60)
+    print(f"Load-test stack running from {workdir}", file=sys.stderr)
+    return processes, f"http://127.0.0.1:{args.app_port}"
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    """Latency percentiles (ms), throughput and error rate for one group of requests."""
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": errors / count if count else 0.0,
+        "throughput_rps": count / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "mean_ms": sum(values) / count * 1000 if count else 0.0,
+        "max_ms": values[-1] * 1000 if values else 0.0,
+    }
+
+
+class LoadGenerator:
+    """Logs users in, then fires /chat requests at a fixed arrival rate."""
+
+    def __init__(self, base_url: str, users: List[Tuple[str, str]], mix: List[Tuple[str, float]],
+                 timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.users = users
+        self.kinds = [kind for kind, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.timeout = timeout
+        self.tokens: Dict[str, str] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.status_codes: Counter = Counter()
+
+    def _http(self) -> requests.Session:
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _record(self, kind: str, started: float, ok: bool, status):
+        with self._lock:
+            self.latencies[kind].append(time.perf_counter() - started)
+            self.status_codes[str(status)] += 1
+            if not ok:
+                self.errors[kind] += 1
+
+    def login_all(self):
+        for user_id, password in self.users:
+            started = time.perf_counter()
+            try:
+                res = self._http().post(f"{self.base_url}/auth/login",
+                                        json={"username": user_id, "password": password},
+                                        timeout=self.timeout)
+                ok = res.status_code == 200
+                if ok:
+                    self.tokens[user_id] = res.json()["access_token"]
+                self._record("login", started, ok, res.status_code)
+            except requests.RequestException as e:
+                self._record("login", started, False, type(e).__name__)
+        if not self.tokens:
+            raise RuntimeError("No load-test user could log in")
+
+    def _chat(self, kind: str, user_id: str, message: str):
+        started = time.perf_counter()
+        try:
+            res = self._http().post(f"{self.base_url}/chat",
+                                    json={"message": message},
+                                    headers={"Authorization": f"Bearer {self.tokens[user_id]}"},
+                                    timeout=self.timeout)
+            self._record(kind, started, res.status_code == 200, res.status_code)
+        except requests.RequestException as e:
+            self._record(kind, started, False, type(e).__name__)
+
+    def run(self, rate: float, duration: float, workers: int) -> float:
+        """Issue requests open-loop at ``rate`` per second for ``duration`` seconds."""
+        user_ids = list(self.tokens)
+        total = int(rate * duration)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for i in range(total):
+                # Keep to the schedule even if responses are slow, so queueing shows up as latency
+                delay = started + i / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                kind = random.choices(self.kinds, weights=self.weights)[0]
+                pool.submit(self._chat, kind, random.choice(user_ids), random.choice(MESSAGES[kind]))
+        return time.perf_counter() - started
+
+    def report(self, elapsed: float) -> Dict:
+        chat_kinds = [kind for kind in self.latencies if kind != "login"]
+        all_chat = [value for kind in chat_kinds for value in self.latencies[kind]]
+        return {
+            "overall": summarize(all_chat, sum(self.errors[k] for k in chat_kinds), elapsed),
+            "by_kind": {kind: summarize(self.latencies[kind], self.errors[kind], elapsed)
+                        for kind in sorted(self.latencies)},
+            "status_codes": dict(self.status_codes),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=10.0, help="Target /chat requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load for")
+    parser.add_argument("--mix", default="balance=4,history=2,transfer=1,rag=3",
+                        help="Relative weights of each message kind")
+    parser.add_argument("--users", type=int, default=20, help="Number of load-test users")
+    parser.add_argument("--workers", type=int, default=256, help="Maximum concurrent client requests")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Client-side request timeout")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Stub Gemini mean latency (s)")
+    parser.add_argument("--llm-jitter", type=float, default=0.1, help="Stub Gemini latency jitter (s)")
+    parser.add_argument("--llm-tail-rate", type=float, default=0.0,
+                        help="Fraction of stub Gemini calls that are slow")
+    parser.add_argument("--llm-tail-latency", type=float, default=5.0, help="Latency of slow stub Gemini calls (s)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0,
+                        help="Fraction of stub Gemini calls failing with a retryable error")
+    parser.add_argument("--rag-latency", type=float, default=1.0, help="Stub RAG mean latency (s)")
+    parser.add_argument("--app-port", type=int, default=3100)
+    parser.add_argument("--mcp-port", type=int, default=8150)
+    parser.add_argument("--base-url", help="Target a running app instead of starting the stub stack")
+    parser.add_argument("--seed", type=int, help="Random seed for a repeatable request sequence")
+    parser.add_argument("--output", help="Write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    mix = parse_mix(args.mix)
+
+    processes = []
+    try:
+        if args.base_url:
+            base_url = args.base_url
+        else:
+            processes, base_url = start_stack(args)
+        users = [(loadtest_user_id(i), LOADTEST_PASSWORD) for i in range(1, args.users + 1)]
+
+        generator = LoadGenerator(base_url, users, mix, args.timeout)
+        generator.login_all()
+        elapsed = generator.run(args.rate, args.duration, args.workers)
+
+        report = {
+            "config": {
+                "rate": args.rate, "duration": args.duration, "mix": dict(mix),
+                "users": args.users, "llm_latency": args.llm_latency,
+                "llm_tail_rate": args.llm_tail_rate, "llm_error_rate": args.llm_error_rate,
+                "rag_latency": args.rag_latency, "base_url": base_url,
+            },
+            "elapsed_seconds": elapsed,
+            **generator.report(elapsed),
+        }
+        output = json.dumps(report, indent=2)
+        print(output)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(output)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""Run the Flask app with the stub Gemini model patched in (used by the load-test harness)."""
+import argparse
+
+from chatbot.loadtest import stub_gemini
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=3100)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-jitter", type=float, default=0.1)
+    parser.add_argument("--llm-tail-rate", type=float, default=0.0)
+    parser.add_argument("--llm-tail-latency", type=float, default=5.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub_gemini.install(latency=args.llm_latency, jitter=args.llm_jitter, tail_rate=args.llm_tail_rate,
+                        tail_latency=args.llm_tail_latency, error_rate=args.llm_error_rate)
+
+    import app
+    app.app.run(host="127.0.0.1", port=args.port, threaded=True, use_reloader=False)
+
+
+if __name__ == "__main__":
+    main()
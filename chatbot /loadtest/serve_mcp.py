@@ -0,0 +1,40 @@
+"""
+Run the real MCP server with a stub RAG chatbot (used by the load-test harness).
+
+All banking tools hit the SQLite database named by CHATBOT_DB_FILE as usual;
+only answer_banking_question is replaced, so no embeddings or LLM calls are made.
+"""
+import argparse
+import random
+import time
+
+
+class StubRAGChatbot:
+    """Answers every question with a canned reply after a configurable delay."""
+
+    def __init__(self, latency: float, jitter: float):
+        self.latency = latency
+        self.jitter = jitter
+
+    def answer_question(self, question):
+        time.sleep(max(0.0, random.uniform(self.latency - self.jitter, self.latency + self.jitter)))
+        return {
+            "answer": f"This is a load-test answer about: {question}",
+            "sources": ["loadtest/stub_document.txt"]
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rag-latency", type=float, default=1.0)
+    parser.add_argument("--rag-jitter", type=float, default=0.2)
+    args = parser.parse_args()
+
+
+    from chatbot.mcp import server_sse
+    server_sse.chatbot = StubRAGChatbot(args.rag_latency, args.rag_jitter)
+    server_sse.mcp.run(transport="sse")
+
+
+if __name__ == "__main__":
+    main()
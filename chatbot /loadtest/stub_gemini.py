@@ -0,0 +1,189 @@
+"""
+Scripted stand-in for the Gemini API used by the load-test harness.
+
+``StubGenerativeModel`` answers ``generate_content`` and
+``generate_content_async`` with function calls picked by a small keyword
+script, after a configurable delay, so the whole /chat pipeline can be driven
+without network access or API spend.  ``install`` makes ``StubProvider`` the
+process-wide LLM provider.
+"""
+import asyncio
+import random
+import re
+import time
+from typing import Any, List, Optional, Tuple
+
+from chatbot.config import ACCOUNT_MAPPINGS
+from chatbot.llm_provider import (FunctionCall, FunctionCallPart, LLMProvider, ScriptedResponse,
+                                  ScriptedStreamResponse, TextPart, set_provider)
+
+# Load-test users are named lt0001, lt0002, ... and own accounts numbered by this scheme
+LOADTEST_USER_PREFIX = "lt"
+LOADTEST_ACCOUNT_KINDS = {"chequing": 1, "savings": 2, "credit": 3}
+
+
+def loadtest_user_id(index: int) -> str:
+    """Return the user ID of the index-th load-test user."""
+    return f"{LOADTEST_USER_PREFIX}{index:04d}"
+
+
+def loadtest_account_number(index: int, kind: str) -> str:
+    """Return the account number of a load-test user's chequing, savings or credit account."""
+    return f"9{index:05d}{LOADTEST_ACCOUNT_KINDS[kind]:04d}"
+
+
+class StubGenerativeModel:
+    """
+    Drop-in replacement for ``genai.GenerativeModel`` returning scripted function calls.
+
+    The class attributes below configure latency for every instance; ``install``
+    sets them.
+    """
+
+    latency = 0.5
+    """Mean seconds before a full response is returned."""
+
+    jitter = 0.1
+    """Latency is drawn uniformly from latency ± jitter."""
+
+    stream_chunk_delay = 0.02
+    """Seconds between streamed text chunks after the first."""
+
+    tail_rate = 0.0
+    """Fraction of requests that take ``tail_latency`` seconds instead."""
+
+    tail_latency = 5.0
+    """Latency of the slow tail of requests."""
+
+    error_rate = 0.0
+    """Fraction of requests that fail with a retryable ServiceUnavailable error."""
+
+    def __init__(self, model_name: str = "stub", **kwargs):
+        self.model_name = model_name
+
+    @classmethod
+    def _delay(cls) -> float:
+        if random.random() < cls.tail_rate:
+            return cls.tail_latency
+        return max(0.0, random.uniform(cls.latency - cls.jitter, cls.latency + cls.jitter))
+
+    @classmethod
+    def _maybe_fail(cls):
+        if random.random() < cls.error_rate:
+            from google.api_core.exceptions import ServiceUnavailable
+            raise ServiceUnavailable("Stub model is overloaded")
+
+    def generate_content(self, contents, stream: bool = False, **kwargs) -> ScriptedResponse:
+        time.sleep(self._delay())
+        self._maybe_fail()
+        return ScriptedResponse(self._script(contents))
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        parts = self._script(contents)
+        if not stream:
+            await asyncio.sleep(self._delay())
+            self._maybe_fail()
+            return ScriptedResponse(parts)
+        self._maybe_fail()
+        # Text is streamed a few words at a time; a function call arrives as one chunk
+        chunks = []
+        for part in parts:
+            if isinstance(part, TextPart):
+                words = part.text.split(" ")
+                for i in range(0, len(words), 3):
+                    prefix = " " if i else ""
+                    chunks.append(ScriptedResponse([TextPart(prefix + " ".join(words[i:i + 3]))]))
+            else:
+                chunks.append(ScriptedResponse([part]))
+        return ScriptedStreamResponse(chunks, self._delay(), self.stream_chunk_delay)
+
+    @staticmethod
+    def _split_contents(contents) -> Tuple[str, str]:
+        """Return the system instructions and the latest user message from the request."""
+        if isinstance(contents, str):
+            return "", contents
+        texts = []
+        for content in contents:
+            if isinstance(content, dict):
+                texts.append([str(part) for part in content.get("parts", [])])
+            else:
+                texts.append([str(content)])
+        # With structured history the instructions open the first turn and the
+        # latest message is the last part of the last turn
+        has_instructions = len(texts) > 1 or len(texts[0]) > 1
+        return (texts[0][0] if has_instructions else ""), texts[-1][-1]
+
+    @classmethod
+    def _script(cls, contents) -> List[Any]:
+        """Pick a response for the latest user message."""
+        system, message = cls._split_contents(contents)
+        text = message.lower()
+        user_match = re.search(r"helping user (\S+)\.", system)
+        user_id = user_match.group(1) if user_match else None
+
+        if "transfer" in text or "send" in text:
+            accounts = [cls._account(user_id, name) for name in re.findall(
+                r"(chequing|checking|savings?|credit)", text)]
+            amount = re.search(r"\$?(\d+(?:\.\d{1,2})?)", text)
+            return [FunctionCallPart(FunctionCall("transfer_funds", {
+                "from_account": accounts[0] if accounts else "",
+                "to_account": accounts[1] if len(accounts) > 1 else "",
+                "amount": amount.group(1) if amount else "1.00",
+            }))]
+        if "balance" in text:
+            return [FunctionCallPart(FunctionCall("get_account_balance", {
+                "account_number": cls._account_in(user_id, text),
+            }))]
+        if "transaction" in text or "history" in text:
+            days = re.search(r"(\d+)\s+days?", text)
+            return [FunctionCallPart(FunctionCall("get_transaction_history", {
+                "account_number": cls._account_in(user_id, text),
+                "days": int(days.group(1)) if days else 30,
+            }))]
+        if "accounts" in text:
+            return [FunctionCallPart(FunctionCall("list_user_accounts", {}))]
+        if any(word in text for word in ("rbc", "tfsa", "rrsp", "mortgage", "card", "invest")):
+            return [FunctionCallPart(FunctionCall("answer_banking_question", {
+                "question": message,
+            }))]
+        return [TextPart("I can help you with your RBC accounts, transfers and banking questions.")]
+
+    @classmethod
+    def _account_in(cls, user_id: Optional[str], text: str) -> str:
+        match = re.search(r"(chequing|checking|savings?|credit)", text)
+        return cls._account(user_id, match.group(1)) if match else ""
+
+    @staticmethod
+    def _account(user_id: Optional[str], name: str) -> str:
+        """Resolve an account name the way the real model would for this user."""
+        if user_id and user_id.startswith(LOADTEST_USER_PREFIX) and user_id[len(LOADTEST_USER_PREFIX):].isdigit():
+            kind = {"checking": "chequing", "saving": "savings"}.get(name, name)
+            return loadtest_account_number(int(user_id[len(LOADTEST_USER_PREFIX):]), kind)
+        return ACCOUNT_MAPPINGS.get(name, "")
+
+
+class StubProvider(LLMProvider):
+    """LLM provider whose generative models are ``StubGenerativeModel``; it has no chat or embeddings models."""
+
+    name = "stub"
+
+    def generative_model(self, model_name, temperature, tools=None, tool_config=None):
+        return StubGenerativeModel(model_name)
+
+    def chat_model(self, model_name, temperature):
+        raise NotImplementedError("the load-test stub only scripts the /chat function-calling model")
+
+    def embeddings(self, model_name):
+        raise NotImplementedError("the load-test stub only scripts the /chat function-calling model")
+
+
+def install(latency: float = 0.5, jitter: float = 0.1, stream_chunk_delay: float = 0.02,
+            tail_rate: float = 0.0, tail_latency: float = 5.0, error_rate: float = 0.0):
+    """Configure the stub and make it the LLM provider for this process."""
+    StubGenerativeModel.latency = latency
+    StubGenerativeModel.jitter = jitter
+    StubGenerativeModel.stream_chunk_delay = stream_chunk_delay
+    StubGenerativeModel.tail_rate = tail_rate
+    StubGenerativeModel.tail_latency = tail_latency
+    StubGenerativeModel.error_rate = error_rate
+    set_provider(StubProvider())
@@ -0,0 +1,128 @@
+"""
+Leveled, structured logging that keeps I/O off the request path.
+
+Modules log through ``get_logger(__name__)`` with %-style arguments, so
+messages below ``LOG_LEVEL`` are never formatted.  Records are handed to a
+``QueueHandler`` and written by a background ``QueueListener`` thread, as JSON
+lines (or plain text with ``LOG_FORMAT=text``) tagged with the current
+request ID.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
+from chatbot.config import LOG_LEVEL, LOG_FORMAT
+
+# ID of the chat request being handled, set per request or task
+request_id_var: contextvars.ContextVar = contextvars.ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_configure_lock = threading.Lock()
+_listener = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the request ID in the emitting thread, before they are queued."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT):
+    """Route the ``chatbot`` loggers through a queue to a background writer; safe to call repeatedly."""
+    global _listener
+    with _configure_lock:
+        root = logging.getLogger("chatbot")
+        root.setLevel(level.upper())
+        if _listener is not None:
+            return
+
+        stream_handler = logging.StreamHandler(sys.stdout)
+        if fmt == "json":
+            stream_handler.setFormatter(JSONFormatter())
+        else:
+            stream_handler.setFormatter(logging.Formatter(
+                "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(RequestIdFilter())
+        root.addHandler(queue_handler)
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        # Flush whatever is still queued when the process exits
+        atexit.register(_listener.stop)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return a logger under the ``chatbot`` hierarchy, configuring logging on first use."""
+    if _listener is None:
+        configure_logging()
+    if not name.startswith("chatbot"):
+        name = f"chatbot.{name}"
+    return logging.getLogger(name)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+# What a client-supplied request ID may look like; it ends up in log lines and idempotency keys
+_REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+
+def request_id_from_header(value: Optional[str]) -> str:
+    """Return the client's ``X-Request-ID`` if it is well formed, or a new request ID in its place."""
+    if value and _REQUEST_ID_PATTERN.fullmatch(value):
+        return value
+    return new_request_id()
+
+
+@contextmanager
+def request_id_context(request_id: str):
+    """Tag every record logged inside the block with this request ID."""
+    token = request_id_var.set(request_id)
+    try:
+        yield request_id
+    finally:
+        request_id_var.reset(token)
+
+
+async def with_request_id(request_id: str, awaitable):
+    """Await ``awaitable`` with the request ID set, e.g. in a task on another thread's loop."""
+    with request_id_context(request_id):
+        return await awaitable
@@ -4,118 +4,122 @@ import asyncio
 import sys
 import json
 import random
+import logging
+import time
 from typing import Dict, List, Any, Optional, Tuple
 
 # Add the parent directory to the Python path to import from src and chatbot
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from mcp import ClientSession
-from mcp.client.sse import sse_client
-import google.generativeai as genai
 from dotenv import load_dotenv
 
 # Import custom modules
-from chatbot.config import DEFAULT_USER_ID, ACCOUNT_MAPPINGS
-from chatbot.config_client import (
-    RESPONSE_TEMPLATES, SYSTEM_INSTRUCTIONS, 
-    TOOL_DEFINITIONS, MODEL_CONFIG
-)
+from chatbot.config import (DEFAULT_USER_ID, ACCOUNT_MAPPINGS, FAST_PATH_ENABLED, HISTORY_SUMMARY_MODEL,
+                            INTENT_GATE_THRESHOLD, READ_ONLY_TOOLS, TOOL_CALL_CONCURRENCY,
+                            TRANSACTION_HISTORY_PAGE_SIZE)
+from chatbot.config_client import RESPONSE_TEMPLATES
+from chatbot.conversation_history import ConversationHistory
+from chatbot.llm_client import llm_client
+from chatbot.logger import configure_logging, get_logger, request_id_var
+from chatbot.mcp.connection_pool import MCPConnectionPool
+from chatbot.model_registry import model_registry, system_instructions_for
 from chatbot.response_formatter import ResponseFormatter
+from chatbot.tool_results import BankingAnswer, ToolError, decode_tool_result
 from chatbot.intent_detector import IntentDetector
+from chatbot.intent_classifier import classify_intent
+from chatbot.fast_path_router import fast_path_router
+from chatbot.metrics import INTENT_GATED, observe_stage, time_stage, time_tool_call
 
 # Load environment variables
 load_dotenv("../../.env")
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+
+logger = get_logger(__name__)
+
+# Predicted intents answered from a template, and the template used
+LOCAL_INTENT_TEMPLATES = {
+    "greeting": "greeting",
+    "small_talk": "small_talk",
+    "off_topic": "non_banking",
+}
 
 class InteractiveBankingAssistant:
     """Interactive banking assistant using Gemini and MCP."""
     
-    def __init__(self):
-        """Initialize the banking assistant."""
-        self.conversation_history = []
-        self.user_id = DEFAULT_USER_ID
-        self.session = None
-        self.read_stream = None
-        self.write_stream = None
+    def __init__(self, user_id: str = DEFAULT_USER_ID, pool: Optional[MCPConnectionPool] = None,
+                 allow_user_switch: bool = True):
+        """
+        Initialize the banking assistant.
+
+        Assistants in the web app share one MCP connection pool; without a pool
+        the assistant opens a single-connection pool of its own.  Web sessions
+        belong to the logged-in user and pass ``allow_user_switch=False``, so the
+        "user <id>" command is ignored and every tool call runs as ``user_id``.
+        """
+        self.conversation_history = ConversationHistory(summarizer=self._summarize_history)
+        self.user_id = user_id
+        self.allow_user_switch = allow_user_switch
         self.account_mappings = ACCOUNT_MAPPINGS
+        self._owns_pool = pool is None
+        self.pool = pool if pool is not None else MCPConnectionPool(size=1)
     
     async def initialize_session(self):
         """Initialize the MCP session."""
-        from chatbot.config import MCP_HOST, MCP_PORT
-        
-        mcp_url = f"http://{MCP_HOST}:{MCP_PORT}/sse"
-        self.sse_client = sse_client(mcp_url)
-        self.read_stream, self.write_stream = await self.sse_client.__aenter__()
-        self.session = ClientSession(self.read_stream, self.write_stream)
-        await self.session.__aenter__()
-        await self.session.initialize()
-        print("\n🔄 Connected to RBC Banking Assistant")
+        await self.pool.start()
+        logger.info("Connected to RBC Banking Assistant for %s", self.user_id)
     
     async def close_session(self):
-        """Close the MCP session."""
-        if self.session:
-            await self.session.__aexit__(None, None, None)
-        if hasattr(self, 'sse_client'):
-            await self.sse_client.__aexit__(None, None, None)
+        """Close the MCP session (a shared pool is left open for other assistants)."""
+        if self._owns_pool:
+            await self.pool.close()
+    
+    def _append_history(self, role, content):
+        """Record a message; older messages are folded into the history summary."""
+        self.conversation_history.append(role, content)
+    
+    async def _summarize_history(self, summary, messages, token_budget):
+        """Fold older messages into the running conversation summary with a small model."""
+        transcript = "\n".join(f"{'User' if msg['role'] == 'user' else 'Assistant'}: {msg['content']}"
+                               for msg in messages)
+        prompt = (
+            f"Update the summary of a banking conversation with the new messages below. "
+            f"Keep account names, amounts, dates and anything the customer still wants done. "
+            f"Reply with the summary only, in under {token_budget * 3} characters.\n\n"
+            f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"
+        )
+        model = model_registry.get_model(HISTORY_SUMMARY_MODEL, 0.0, tool_set=None)
+        with time_stage("history_summary"):
+            response = await llm_client.generate(model, prompt)
+        try:
+            return response.text
+        except ValueError:
+            # Blocked or empty candidates; the history falls back to an extractive summary
+            return ""
     
     async def _process_response(self, response):
         """Process the response from Gemini, handling function calls."""
         try:
             # Check if the response has parts (structured response)
             if hasattr(response, 'parts'):
-                result = []
-                has_function_call = False
+                # Text is kept in place; each function call leaves a slot for its result
+                pieces = []
+                function_calls = []
                 
                 for part in response.parts:
                     # Handle text parts
                     if hasattr(part, 'text') and part.text:
-                        # Clean up the text
-                        text = part.text
-                        # Remove any function call syntax that might be in the text
-                        text = text.replace('[Function Call:', '').replace(']', '')
-                        # Remove "Assistant:" prefix
-                        text = text.replace('Assistant:', '')
-                        if text.strip():  # Only add non-empty text
-                            result.append(text.strip())
-                    
-                    # Check if there's a function call
-                    if hasattr(part, 'function_call'):
-                        has_function_call = True
+                        text = self._clean_text_part(part.text)
+                        if text:  # Only add non-empty text
+                            pieces.append(text)
                     
                     # Handle function calls
                     if hasattr(part, 'function_call'):
-                        func_call = part.function_call
-                        function_name = func_call.name
-                        
-                        # Auto-fill account numbers for common account types
-                        if function_name in ["get_account_balance", "get_transaction_history"]:
-                            args = func_call.args
-                            if "account_number" not in args or not args["account_number"]:
-                                # Try to infer from the conversation history
-                                last_user_msg = self.conversation_history[-1]["content"].lower()
-                                if "savings" in last_user_msg or "saving" in last_user_msg:
-                                    args["account_number"] = "2345678901"
-                                elif "checking" in last_user_msg or "chequing" in last_user_msg:
-                                    args["account_number"] = "1234567890"
-                                elif "credit" in last_user_msg:
-                                    args["account_number"] = "3456789012"
-                        
-                        # Execute the function call through MCP and wait for result
-                        try:
-                            # Call the function through the MCP session and await the result
-                            function_result = await self._execute_function_call(function_name, func_call.args)
-                            
-                            # Parse the function result to extract actual data
-                            parsed_result = self._parse_function_result(function_result)
-                            
-                            # Format the result using the ResponseFormatter
-                            formatted_result = ResponseFormatter.format_response(function_name, parsed_result)
-                            if formatted_result:
-                                result.append(formatted_result)
-                                
-                        except Exception as e:
-                            error_msg = random.choice(RESPONSE_TEMPLATES["error"]).format(error=str(e))
-                            result.append(error_msg)
+                        pieces.append(len(function_calls))
+                        function_calls.append(part.function_call)
+                
+                has_function_call = bool(function_calls)
+                call_results = await self._run_function_calls(function_calls)
+                result = [call_results[piece] if isinstance(piece, int) else piece for piece in pieces]
+                result = [piece for piece in result if piece]
                 
                 # For simple greetings with no function calls, provide a friendly response
                 if not has_function_call and not result:
@@ -132,70 +136,78 @@ class InteractiveBankingAssistant:
         except Exception as e:
             return f"Error processing response: {str(e)}"
     
-    def _parse_function_result(self, result):
-        """Parse the function result to extract the actual data."""
+    async def _run_function_calls(self, func_calls):
+        """
+        Execute the function calls from one model response and return their results in order.
+
+        Consecutive read-only calls run concurrently, at most TOOL_CALL_CONCURRENCY at
+        a time.  Any other call (such as a transfer) waits for the calls before it to
+        finish, and the calls after it wait for it.
+        """
+        results = [None] * len(func_calls)
+        semaphore = asyncio.Semaphore(TOOL_CALL_CONCURRENCY)
+        
+        async def run(index):
+            async with semaphore:
+                results[index] = await self._run_function_call(func_calls[index], index)
+        
+        batch = []
+        for index, func_call in enumerate(func_calls):
+            if func_call.name in READ_ONLY_TOOLS:
+                batch.append(index)
+                continue
+            if batch:
+                await asyncio.gather(*(run(i) for i in batch))
+                batch = []
+            results[index] = await self._run_function_call(func_call, index)
+        if batch:
+            await asyncio.gather(*(run(i) for i in batch))
+        return results
+    
+    def _clean_text_part(self, text):
+        """Strip function call syntax and role prefixes from model text."""
+        # Remove any function call syntax that might be in the text
+        text = text.replace('[Function Call:', '').replace(']', '')
+        # Remove "Assistant:" prefix
+        text = text.replace('Assistant:', '')
+        return text.strip()
+    
+    async def _run_function_call(self, func_call, call_index=0):
+        """Execute the ``call_index``-th function call of the model's response and format its result."""
+        function_name = func_call.name
+        
+        # Auto-fill account numbers for common account types
+        if function_name in ["get_account_balance", "get_balance_as_of", "get_transaction_history"]:
+            args = func_call.args
+            if "account_number" not in args or not args["account_number"]:
+                # Try to infer from the conversation history
+                account_number = IntentDetector.get_account_number_from_text(
+                    self.conversation_history[-1]["content"], self.account_mappings)
+                if account_number:
+                    args["account_number"] = account_number
+        
+        # Execute the function call through MCP and wait for result
         try:
-            # Check if result has content attribute (MCP response format)
-            if hasattr(result, 'content') and result.content:
-                # Extract text content
-                text_contents = []
-                for content in result.content:
-                    if hasattr(content, 'text'):
-                        text_contents.append(content.text)
-                
-                # Try to parse each text content as JSON
-                parsed_contents = []
-                for text in text_contents:
-                    try:
-                        parsed_contents.append(json.loads(text))
-                    except:
-                        parsed_contents.append(text)
-                
-                # Special handling for get_transaction_history
-                # If we have a single transaction object, wrap it in a list
-                if len(parsed_contents) == 1:
-                    content = parsed_contents[0]
-                    # Check if this looks like a transaction object
-                    if isinstance(content, dict) and all(key in content for key in ['transaction_id', 'date', 'description']):
-                        return [content]
-                    return content
-                
-                return parsed_contents
+            # Call the function through the MCP session and await its typed result
+            function_result = await self._execute_function_call(function_name, func_call.args, call_index)
             
-            # If it's a dictionary or list, return as is
-            if isinstance(result, (dict, list)):
-                return result
-            
-            # If it's a string that looks like JSON, parse it
-            if isinstance(result, str):
-                try:
-                    if result.strip().startswith('{') or result.strip().startswith('['):
-                        parsed = json.loads(result)
-                        # Special handling for transaction objects
-                        if isinstance(parsed, dict) and all(key in parsed for key in ['transaction_id', 'date', 'description']):
-                            return [parsed]
-                        return parsed
-                except:
-                    pass
-            
-            # Return as is if we couldn't parse it
-            return result
+            # Format the result using the ResponseFormatter
+            return ResponseFormatter.format_response(function_name, function_result)
         except Exception as e:
-            print(f"Error parsing function result: {e}")
-            return result
+            return random.choice(RESPONSE_TEMPLATES["error"]).format(error=str(e))
     
-    async def _execute_function_call(self, function_name, args):
-        """Execute a function call through the MCP session."""
+    async def _execute_function_call(self, function_name, args, call_index=0):
+        """
+        Execute a function call through the MCP session and return its decoded result.
+
+        ``call_index`` is the call's position among the function calls of this turn.
+        """
         try:
             # Check if function name is empty or invalid
             if not function_name or function_name.strip() == "":
-                print(f"\n⚠️ Warning: Empty function name received")
+                logger.warning("Empty function name received")
                 # Return a response that won't trigger "I've completed that action for you"
-                return {
-                    "content": "No valid function specified",
-                    "skip_response": True,
-                    "error": True
-                }
+                return ToolError("No valid function specified", skip_response=True)
             
             # Check for non-banking queries using the intent detector
             if function_name == "answer_banking_question" and args and "question" in args:
@@ -203,17 +215,11 @@ class InteractiveBankingAssistant:
                 
                 # Check if the question is banking-related
                 if not IntentDetector.is_banking_related(question):
-                    return {
-                        "answer": random.choice(RESPONSE_TEMPLATES["non_banking"]),
-                        "skip_function_call": True
-                    }
+                    return BankingAnswer(random.choice(RESPONSE_TEMPLATES["non_banking"]))
                 
                 # Check for ambiguous inputs that shouldn't trigger function calls
                 if IntentDetector.is_greeting(question) or len(question.strip()) <= 3:
-                    return {
-                        "answer": random.choice(RESPONSE_TEMPLATES["greeting"]),
-                        "skip_function_call": True
-                    }
+                    return BankingAnswer(random.choice(RESPONSE_TEMPLATES["greeting"]))
                 
             # Convert args from Gemini format to what MCP expects
             mcp_args = {}
@@ -233,165 +239,162 @@ class InteractiveBankingAssistant:
                     else:
                         mcp_args[key] = value
             
-            # Add user_id automatically if not provided
-            if function_name != "answer_banking_question" and "user_id" not in mcp_args:
+            # Tools always run as the session's user, whatever user_id the model supplied
+            if function_name != "answer_banking_question":
                 mcp_args["user_id"] = self.user_id
             
-            # Map account names to account numbers for transfer_funds
-            if function_name == "transfer_funds":
-                # Map from_account if it's a name
-                if "from_account" in mcp_args:
-                    from_acc = str(mcp_args["from_account"]).lower()
-                    for key, value in self.account_mappings.items():
-                        if key in from_acc:
-                            mcp_args["from_account"] = value
-                            break
-                
-                # Map to_account if it's a name
-                if "to_account" in mcp_args:
-                    to_acc = str(mcp_args["to_account"]).lower()
-                    for key, value in self.account_mappings.items():
-                        if key in to_acc:
-                            mcp_args["to_account"] = value
-                            break
+            # Only fetch the transactions the response will show; the total covers the rest
+            if function_name == "get_transaction_history":
+                mcp_args["limit"] = TRANSACTION_HISTORY_PAGE_SIZE
             
-            # Map account names for get_transaction_history and get_account_balance
-            if function_name in ["get_transaction_history", "get_account_balance"] and "account_number" in mcp_args:
-                acc = str(mcp_args["account_number"]).lower()
-                for key, value in self.account_mappings.items():
-                    if key in acc:
-                        mcp_args["account_number"] = value
-                        break
+            # Map account names to account numbers
+            account_args = {
+                "transfer_funds": ["from_account", "to_account"],
+                "get_transaction_history": ["account_number"],
+                "get_account_balance": ["account_number"],
+                "get_balance_as_of": ["account_number"],
+            }.get(function_name, [])
+            for key in account_args:
+                if key in mcp_args:
+                    account_number = IntentDetector.get_account_number_from_text(
+                        str(mcp_args[key]), self.account_mappings)
+                    if account_number:
+                        mcp_args[key] = account_number
             
-            print(f"\n🔧 Executing function: {function_name} with args: {mcp_args}")
+            # A /chat request retried with the same X-Request-ID must not move the money twice.
+            # The key names the call, not its arguments: however the model writes the amount
+            # on the retry, the call maps to the same key, and the server rejects a key that
+            # comes back with a different transfer.
+            if function_name == "transfer_funds" and request_id_var.get() != "-":
+                mcp_args.setdefault("idempotency_key", f"chat:{request_id_var.get()}:{call_index}")
+            
+            logger.debug("Executing function %s with args %s", function_name, mcp_args)
             
             # Check if we should skip the function call
             if "skip_function_call" in mcp_args and mcp_args["skip_function_call"]:
-                return {"answer": random.choice(RESPONSE_TEMPLATES["non_banking"]), "sources": []}
+                return BankingAnswer(random.choice(RESPONSE_TEMPLATES["non_banking"]))
                 
             # Call the function through MCP
-            result = await self.session.call_tool(function_name, mcp_args)
-            
-            # Format the result for logging
-            result_str = self._format_result_for_logging(result)
+            with time_tool_call(function_name):
+                result = await self.pool.call_tool(function_name, mcp_args)
             
-            # Print the result for debugging
-            print(f"\n🔧 Function Result ({function_name}):")
-            print(result_str)
+            # Pretty-printing a large result is only worth it when someone will read it
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Function result (%s):\n%s", function_name, self._format_result_for_logging(result))
             
-            return result
+            return decode_tool_result(function_name, result)
         except Exception as e:
             error_msg = f"Error executing function {function_name}: {str(e)}"
-            print(f"\n❌ {error_msg}")
-            return {"error": error_msg}
+            logger.error(error_msg)
+            return ToolError(error_msg)
     
     def _format_result_for_logging(self, result):
-        """Format a result object for logging."""
+        """Format an MCP tool result for logging."""
         try:
-            if isinstance(result, dict):
-                # Try to pretty print if it's a dict
-                return json.dumps(result, indent=2)
-            elif isinstance(result, list):
-                # For lists of objects (like accounts)
-                if result and hasattr(result[0], '__dict__'):
-                    # Convert dataclass objects to dicts for better display
-                    return json.dumps([item.__dict__ for item in result], indent=2)
-                else:
-                    return "\n".join(str(item) for item in result)
-            else:
-                # Handle string results that might be JSON
-                try:
-                    if isinstance(result, str) and (result.startswith('{') or result.startswith('[')):
-                        parsed = json.loads(result)
-                        return json.dumps(parsed, indent=2)
-                    else:
-                        return str(result)
-                except:
-                    return str(result)
+            structured = getattr(result, "structuredContent", None)
+            if structured is not None:
+                return json.dumps(structured, indent=2)
+            return "\n".join(getattr(block, "text", str(block)) for block in getattr(result, "content", None) or [])
         except Exception as e:
-            print(f"Error formatting result for logging: {e}")
+            logger.warning("Error formatting result for logging: %s", e)
             return str(result)
     
     def build_prompt(self, user_input):
         """Build the prompt with conversation history."""
         # Get system instructions from config and format with user_id
-        system_prompt = SYSTEM_INSTRUCTIONS.format(user_id=self.user_id)
+        system_prompt = system_instructions_for(self.user_id)
         
-        # Add conversation history
+        # Add the summary of older messages and the recent conversation history
         history = "\n\n".join([f"User: {msg['content']}" 
                               if msg['role'] == 'user' else f"Assistant: {msg['content']}" 
-                              for msg in self.conversation_history])
+                              for msg in self.conversation_history.context_messages()])
+        if self.conversation_history.summary:
+            history = f"Summary of the earlier conversation:\n{self.conversation_history.summary}\n\n{history}"
         
         # Add current user input
         full_prompt = f"{system_prompt}\n\n{history}\n\nUser: {user_input}\n\nAssistant:"
         return full_prompt
     
-    async def send_message(self, user_input):
-        """Send a message to the assistant and get a response."""
-        # Add user message to history
-        self.conversation_history.append({"role": "user", "content": user_input})
-        
+    def _local_reply(self, user_input, intent=None):
+        """
+        Answer commands, greetings, small talk and off-topic inputs without calling the model.
+
+        Returns the reply text, or None if the message needs the model.
+        """
         # Check for commands first
         command, arg = IntentDetector.detect_command(user_input)
         if command:
             if command == "exit":
                 return random.choice(RESPONSE_TEMPLATES["farewell"])
             elif command == "clear":
-                self.conversation_history = []
+                self.conversation_history.clear()
                 return "Conversation history cleared."
-            elif command == "user" and arg:
+            elif command == "user" and arg and self.allow_user_switch:
                 self.user_id = arg
                 return f"User ID changed to: {self.user_id}"
         
-        # Check if this is a simple greeting
-        if IntentDetector.is_greeting(user_input):
+        # Check if this is a simple greeting, or a very short, ambiguous input
+        if (IntentDetector.is_greeting(user_input) or
+                (len(user_input.strip()) <= 3 and not user_input.strip().isdigit())):
             response_text = random.choice(RESPONSE_TEMPLATES["greeting"])
-            print("\n🔁 Assistant:")
-            print(response_text)
-            self.conversation_history.append({"role": "assistant", "content": response_text})
+            logger.debug("Assistant reply: %s", response_text)
+            self._append_history("assistant", response_text)
             return response_text
         
-        # For non-greetings, build the prompt with history
+        # Let the classifier answer chit-chat and off-topic text, unless it names anything banking
+        if (intent is not None and intent.label in LOCAL_INTENT_TEMPLATES
+                and intent.confidence >= INTENT_GATE_THRESHOLD):
+            matches = IntentDetector.scan(user_input, self.account_mappings)
+            if "banking" not in matches.categories and not matches.accounts:
+                INTENT_GATED.labels(intent.label).inc()
+                response_text = random.choice(RESPONSE_TEMPLATES[LOCAL_INTENT_TEMPLATES[intent.label]])
+                logger.debug("Intent %s (%.2f) answered locally: %s", intent.label, intent.confidence, response_text)
+                self._append_history("assistant", response_text)
+                return response_text
+        
+        return None
+    
+    async def _run_fast_path(self, decision):
+        """Answer with the tool the fast-path router picked, without calling the model."""
+        logger.debug("Fast path (%.2f, %s): %s", decision.confidence, decision.reason, decision.function_name)
         try:
-            # Create a model with the tools from config
-            tool_config = [{
-                "function_declarations": TOOL_DEFINITIONS
-            }]
-            
-            # Create a model with the tools
-            model = genai.GenerativeModel(
-                model_name=MODEL_CONFIG["model_name"],
-                generation_config=genai.GenerationConfig(
-                    temperature=MODEL_CONFIG["temperature"]
-                ),
-                tools=tool_config,
-                tool_config={"function_calling_config": MODEL_CONFIG["tool_calling_config"]}
+            function_result = await self._execute_function_call(decision.function_name, dict(decision.args))
+            response_text = self._clean_response(
+                ResponseFormatter.format_response(decision.function_name, function_result)
             )
+        except Exception as e:
+            response_text = random.choice(RESPONSE_TEMPLATES["error"]).format(error=str(e))
+        
+        logger.debug("Assistant reply: %s", response_text)
+        self._append_history("assistant", response_text)
+        return response_text
+    
+    async def send_message(self, user_input):
+        """Send a message to the assistant and get a response."""
+        # Add user message to history
+        self._append_history("user", user_input)
+        
+        with time_stage("intent_detection"):
+            intent = classify_intent(user_input)
+            local_reply = self._local_reply(user_input, intent)
+            decision = None
+            if local_reply is None and FAST_PATH_ENABLED:
+                decision = fast_path_router.route(user_input, self.account_mappings, intent)
+        if local_reply is not None:
+            return local_reply
+        if decision is not None:
+            return await self._run_fast_path(decision)
+        
+        try:
+            model = model_registry.get_model()
             
-            # For very short, ambiguous inputs, respond conversationally without calling functions
-            if len(user_input.strip()) <= 3 and not user_input.strip().isdigit():
-                response_text = random.choice(RESPONSE_TEMPLATES["greeting"])
-                print("\n🔁 Assistant:")
-                print(response_text)
-                self.conversation_history.append({"role": "assistant", "content": response_text})
-                return response_text
-            
-            # Handle direct account queries
-            if "balance" in user_input.lower() or "transaction" in user_input.lower() or "history" in user_input.lower():
-                account_number = None
-                if "savings" in user_input.lower() or "saving" in user_input.lower():
-                    account_number = "2345678901"
-                elif "checking" in user_input.lower() or "chequing" in user_input.lower():
-                    account_number = "1234567890"
-                elif "credit" in user_input.lower():
-                    account_number = "3456789012"
-            
-            # Generate content with system instructions from config
-            system_instructions = SYSTEM_INSTRUCTIONS.format(user_id=self.user_id)
-            response = await asyncio.to_thread(
-                model.generate_content,
-                [system_instructions, user_input]
-            )
+            # Generate content with system instructions from config and the bounded history
+            system_instructions = system_instructions_for(self.user_id)
+            with time_stage("llm_generate"):
+                response = await llm_client.generate(
+                    model,
+                    self.conversation_history.as_contents(system_instructions)
+                )
                     
             # Process and print response
             assistant_response = await self._process_response(response)
@@ -399,19 +402,90 @@ class InteractiveBankingAssistant:
             # Clean up the response by removing generic messages
             assistant_response = self._clean_response(assistant_response)
             
-            print("\n🔁 Assistant:")
-            print(assistant_response)
+            logger.debug("Assistant reply: %s", assistant_response)
             
             # Add assistant response to history
-            self.conversation_history.append({"role": "assistant", "content": assistant_response})
+            self._append_history("assistant", assistant_response)
             
             return assistant_response
             
         except Exception as e:
             error_msg = random.choice(RESPONSE_TEMPLATES["error"]).format(error=str(e))
-            print(f"\n❌ {error_msg}")
+            logger.error(error_msg)
             return error_msg
     
+    async def send_message_stream(self, user_input):
+        """
+        Send a message and yield the reply in pieces as they become available.
+
+        Model text is forwarded as Gemini streams it; function calls are run once
+        the model has finished and their formatted results are yielded last.
+        """
+        self._append_history("user", user_input)
+        
+        with time_stage("intent_detection"):
+            intent = classify_intent(user_input)
+            local_reply = self._local_reply(user_input, intent)
+            decision = None
+            if local_reply is None and FAST_PATH_ENABLED:
+                decision = fast_path_router.route(user_input, self.account_mappings, intent)
+        if local_reply is not None:
+            yield local_reply
+            return
+        if decision is not None:
+            yield await self._run_fast_path(decision)
+            return
+        
+        pieces = []
+        try:
+            model = model_registry.get_model()
+            system_instructions = system_instructions_for(self.user_id)
+            started = time.perf_counter()
+            response = llm_client.stream(
+                model,
+                self.conversation_history.as_contents(system_instructions)
+            )
+            
+            function_calls = []
+            first_chunk = True
+            async for chunk in response:
+                if first_chunk:
+                    observe_stage("llm_first_chunk", time.perf_counter() - started)
+                    first_chunk = False
+                for part in chunk.parts:
+                    func_call = getattr(part, 'function_call', None)
+                    if func_call and func_call.name:
+                        function_calls.append(func_call)
+                    elif getattr(part, 'text', None):
+                        # Deltas are forwarded unstripped so word spacing survives
+                        text = part.text.replace('[Function Call:', '').replace('Assistant:', '')
+                        if text.strip():
+                            pieces.append(text)
+                            yield text
+            observe_stage("llm_generate", time.perf_counter() - started)
+            
+            for formatted_result in await self._run_function_calls(function_calls):
+                formatted_result = self._clean_response(formatted_result or "")
+                if formatted_result:
+                    text = ("\n" if pieces else "") + formatted_result
+                    pieces.append(text)
+                    yield text
+            
+            if not pieces:
+                text = (random.choice(RESPONSE_TEMPLATES["greeting"]) if not function_calls
+                        else "How can I help you with your banking needs today?")
+                pieces.append(text)
+                yield text
+        except Exception as e:
+            error_msg = random.choice(RESPONSE_TEMPLATES["error"]).format(error=str(e))
+            logger.error(error_msg)
+            pieces.append(error_msg)
+            yield error_msg
+        finally:
+            assistant_response = "".join(pieces)
+            logger.debug("Assistant reply: %s", assistant_response)
+            self._append_history("assistant", assistant_response)
+    
     def _clean_response(self, response):
         """Clean up the response by removing generic messages."""
         # List of generic phrases to remove
@@ -452,6 +526,8 @@ class InteractiveBankingAssistant:
                     
                     # Process the message
                     response = await self.send_message(user_input)
+                    print("\n🔁 Assistant:")
+                    print(response)
                     
                     # If the response indicates exit, break the loop
                     if command == "exit":
@@ -469,6 +545,7 @@ class InteractiveBankingAssistant:
 
 async def main():
     """Main entry point for the interactive banking assistant."""
+    configure_logging()
     try:
         assistant = InteractiveBankingAssistant()
         await assistant.run_interactive()
@@ -0,0 +1,217 @@
+"""Shared, self-healing pool of MCP client sessions."""
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+from chatbot.config import (MCP_SERVER_URLS, MCP_POOL_SIZE, MCP_HEALTH_CHECK_INTERVAL, MCP_CONNECT_TIMEOUT,
+                            MCP_RECONNECT_BACKOFF_MAX, READ_ONLY_TOOLS)
+from chatbot.logger import get_logger
+from chatbot.metrics import (MCP_CONNECTION_HEALTHY, MCP_CONNECTION_OUTSTANDING, MCP_CONNECTION_RECONNECTS,
+                             MCP_CONNECTION_REQUESTS)
+
+logger = get_logger(__name__)
+
+# First reconnect waits up to this long; the cap doubles with each failed attempt
+RECONNECT_BACKOFF_BASE = 0.5
+
+
+class MCPUnavailable(ConnectionError):
+    """Raised when no pooled MCP connection became healthy in time."""
+
+
+class _PooledConnection:
+    """
+    One SSE connection to an MCP server, kept alive by its own task.
+
+    The SSE client and session are entered and exited inside that task, so the
+    connection can be reconnected or closed without anyio cancel-scope errors.
+    """
+
+    def __init__(self, pool: "MCPConnectionPool", url: str, index: int):
+        self.pool = pool
+        self.url = url
+        self.name = f"{url}#{index}"
+        self.session: Optional[ClientSession] = None
+        self.outstanding = 0
+        self.connected_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.reconnects = 0
+        self._closing = False
+        self._wake = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    @property
+    def healthy(self) -> bool:
+        return self.session is not None
+
+    def report_failure(self):
+        """Ask for an immediate health check after a request on this connection failed."""
+        self._wake.set()
+
+    async def close(self):
+        """Leave the session cleanly from its own task, cancelling only if that hangs."""
+        self._closing = True
+        self._wake.set()
+        try:
+            await asyncio.wait_for(self._task, MCP_CONNECT_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+
+    def _set_session(self, session: Optional[ClientSession]):
+        self.session = session
+        self.connected_at = time.monotonic() if session is not None else None
+        MCP_CONNECTION_HEALTHY.labels(self.name).set(1 if session is not None else 0)
+        if session is not None:
+            self.pool._connection_ready()
+
+    async def _run(self):
+        """Connect, health-check until the connection fails, then reconnect with jittered backoff."""
+        attempt = 0
+        while not self._closing:
+            try:
+                async with sse_client(self.url, timeout=MCP_CONNECT_TIMEOUT) as (read_stream, write_stream):
+                    async with ClientSession(read_stream, write_stream) as session:
+                        await asyncio.wait_for(session.initialize(), MCP_CONNECT_TIMEOUT)
+                        self._set_session(session)
+                        attempt = 0
+                        await self._health_check(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Report the underlying error rather than anyio's exception group
+                while getattr(e, "exceptions", None):
+                    e = e.exceptions[0]
+                self.last_error = str(e) or type(e).__name__
+                logger.warning("MCP connection %s lost: %s", self.name, self.last_error)
+            finally:
+                self._set_session(None)
+            if self._closing:
+                return
+
+            attempt += 1
+            self.reconnects += 1
+            MCP_CONNECTION_RECONNECTS.labels(self.name).inc()
+            # Full jitter keeps replicas that restart together from being hit in lockstep
+            cap = min(MCP_RECONNECT_BACKOFF_MAX, RECONNECT_BACKOFF_BASE * 2 ** attempt)
+            try:
+                await asyncio.wait_for(self._wake.wait(), random.uniform(0, cap))
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _health_check(self, session: ClientSession):
+        """Ping the server every interval, or straight away after a failed request."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.pool.health_check_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._closing:
+                return
+            try:
+                await asyncio.wait_for(session.send_ping(), MCP_CONNECT_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise ConnectionError("health check timed out")
+
+
+class MCPConnectionPool:
+    """
+    A fixed set of MCP sessions shared by every assistant, spread across server URLs.
+
+    Each request goes to the healthy connection with the fewest requests in
+    flight.  Connections ping their server every ``health_check_interval``
+    seconds and reconnect on their own when a ping or the stream fails.  Calls
+    to read-only tools that fail on a broken connection are retried once on
+    another; other tools are never retried, so a transfer cannot run twice.
+    """
+
+    def __init__(self, urls: List[str] = None, size: int = MCP_POOL_SIZE,
+                 health_check_interval: float = MCP_HEALTH_CHECK_INTERVAL,
+                 acquire_timeout: float = MCP_CONNECT_TIMEOUT):
+        self.urls = list(urls or MCP_SERVER_URLS)
+        self.size = max(size, len(self.urls))
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self._connections: List[_PooledConnection] = []
+        self._available: Optional[asyncio.Event] = None
+
+    async def start(self):
+        """Open the pool's connections; safe to call more than once."""
+        if not self._connections:
+            # Created here rather than in __init__ so the pool binds to the running loop
+            self._available = asyncio.Event()
+            self._connections = [_PooledConnection(self, self.urls[i % len(self.urls)], i)
+                                 for i in range(self.size)]
+        await self._acquire()
+
+    async def close(self):
+        """Close every connection in the pool."""
+        connections, self._connections = self._connections, []
+        await asyncio.gather(*(connection.close() for connection in connections))
+
+    def _connection_ready(self):
+        self._available.set()
+
+    async def _acquire(self) -> _PooledConnection:
+        """Return the healthy connection with the fewest outstanding requests, waiting for one if needed."""
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            healthy = [connection for connection in self._connections if connection.healthy]
+            if healthy:
+                return min(healthy, key=lambda connection: connection.outstanding)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                errors = {connection.name: connection.last_error for connection in self._connections}
+                raise MCPUnavailable(f"No healthy MCP connection: {errors}")
+            self._available.clear()
+            try:
+                await asyncio.wait_for(self._available.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any], retry: Optional[bool] = None):
+        """Call an MCP tool on the least-loaded healthy connection."""
+        if retry is None:
+            retry = name in READ_ONLY_TOOLS
+        attempts = 2 if retry else 1
+        for attempt in range(attempts):
+            connection = await self._acquire()
+            connection.outstanding += 1
+            MCP_CONNECTION_OUTSTANDING.labels(connection.name).inc()
+            try:
+                result = await connection.session.call_tool(name, arguments)
+                MCP_CONNECTION_REQUESTS.labels(connection.name, "ok").inc()
+                return result
+            except Exception:
+                # Tool errors come back as results, so an exception means the transport is suspect
+                MCP_CONNECTION_REQUESTS.labels(connection.name, "error").inc()
+                connection.report_failure()
+                if attempt + 1 == attempts:
+                    raise
+            finally:
+                connection.outstanding -= 1
+                MCP_CONNECTION_OUTSTANDING.labels(connection.name).dec()
+
+    def stats(self) -> Dict[str, Any]:
+        """Report the state of each pooled connection."""
+        now = time.monotonic()
+        return {
+            "size": len(self._connections),
+            "healthy": sum(1 for connection in self._connections if connection.healthy),
+            "connections": [
+                {
+                    "name": connection.name,
+                    "healthy": connection.healthy,
+                    "outstanding": connection.outstanding,
+                    "reconnects": connection.reconnects,
+                    "connected_for": now - connection.connected_at if connection.connected_at else 0.0,
+                    "last_error": connection.last_error,
+                }
+                for connection in self._connections
+            ],
+        }
@@ -4,19 +4,29 @@ from decimal import Decimal
 import os
 import sys
 import datetime
+from typing import List, Optional
 
 # Add the parent directory to the Python path to import from src and chatbot
 parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
 sys.path.append(parent_dir)
-print(f"Added to Python path: {parent_dir}")
 
 # Import RAG components
 from chatbot.rag.rag_chatbot import RBCChatbot
 
 # Import the actual database functions
-from chatbot.account import list_accounts, list_transfer_target_accounts, transfer_between_accounts
-from chatbot.database import init_db
-from chatbot.models import Account
+from chatbot import async_database
+from chatbot.database import init_db, utc_timestamp
+from chatbot.db_connection import db
+from chatbot.logger import get_logger
+from chatbot.metrics import render_metrics
+from chatbot.models import Transfer
+from chatbot.tool_results import (AccountBalance, AccountList, AccountSummary, BalanceAsOf, BankingAnswer,
+                                  BulkTransferResult, Transaction, TransactionHistory, TransferResult, TransferSummary)
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+logger = get_logger("chatbot.mcp.server_sse")
+logger.debug("Added to Python path: %s", parent_dir)
 
 # Load environment variables from .env file
 load_dotenv("../../.env")
@@ -24,157 +34,219 @@ load_dotenv("../../.env")
 # Initialize the database if it doesn't exist (will check internally)
 init_db()
 
-# Initialize the RAG chatbot
-chatbot = RBCChatbot()
+# The RAG chatbot is created at startup (see __main__) or on first use, so the
+# tools can be imported and served without building the vector store
+chatbot = None
+
+def get_rag_chatbot():
+    """Return the RAG chatbot, creating it on first use."""
+    global chatbot
+    if chatbot is None:
+        chatbot = RBCChatbot()
+    return chatbot
 
 # Import configuration
-from chatbot.config import MCP_NAME, MCP_HOST, MCP_PORT, DEFAULT_USER_ID
+from chatbot.config import MCP_NAME, MCP_HOST, MCP_PORT, DEFAULT_USER_ID, TRANSACTION_HISTORY_MAX_LIMIT
 
 # Create the MCP server
 mcp = FastMCP(name=MCP_NAME, host=MCP_HOST, port=MCP_PORT)
 
 # RAG Tool: Answer questions using the RAG system
 @mcp.tool()
-def answer_banking_question(question: str) -> dict:
+def answer_banking_question(question: str) -> BankingAnswer:
     """
     Answer a banking question using the RAG system with RBC documentation.
     Returns the answer and sources.
     """
-    print(f"[RAG] Processing question: {question}")
-    result = chatbot.answer_question(question)
-    print(f"[RAG] Found answer with {len(result['sources'])} sources")
-    return {
-        "answer": result["answer"],
-        "sources": result["sources"]
-    }
+    logger.debug("RAG processing question: %s", question)
+    result = get_rag_chatbot().answer_question(question)
+    logger.debug("RAG found answer with %d sources", len(result['sources']))
+    return BankingAnswer(answer=result["answer"], sources=result["sources"])
 
 # Tool 1: List all accounts belonging to a user
 @mcp.tool()
-def list_user_accounts(user_id: str) -> list[dict]:
+async def list_user_accounts(user_id: str) -> AccountList:
     """List all accounts for a given user."""
-    accounts = list_accounts(user_id)
-    print(f"[DEBUG] list_user_accounts called with user_id={user_id}")
-    print(f"[DEBUG] Accounts: {accounts}")
-    return [account.__dict__ for account in accounts]
+    accounts = await async_database.load_accounts(user_id)
+    logger.debug("list_user_accounts called with user_id=%s", user_id)
+    logger.debug("Accounts: %s", accounts)
+    return AccountList([AccountSummary.from_account(account) for account in accounts])
 
 # Tool 2: List target accounts that can receive transfers
 @mcp.tool()
-def list_target_accounts(user_id: str, from_account: str) -> list[dict]:
+async def list_target_accounts(user_id: str, from_account: str) -> AccountList:
     """List all other accounts this user can transfer to."""
-    accounts = list_transfer_target_accounts(user_id, from_account)
-    print(f"[DEBUG] list_target_accounts called with user_id={user_id}, from_account={from_account}")
-    print(f"[DEBUG] Transfer targets: {accounts}")
-    return [account.__dict__ for account in accounts]
+    accounts = await async_database.load_transfer_target_accounts(user_id, from_account)
+    logger.debug("list_target_accounts called with user_id=%s, from_account=%s", user_id, from_account)
+    logger.debug("Transfer targets: %s", accounts)
+    return AccountList([AccountSummary.from_account(account) for account in accounts])
 
 # Tool 3: Transfer funds between two accounts
 @mcp.tool()
-def transfer_funds(user_id: str, from_account: str, to_account: str, amount: str) -> str:
-    """Transfer funds from one account to another."""
-    print(f"[DEBUG] transfer_funds called with user_id={user_id}, from_account={from_account}, to_account={to_account}, amount={amount}")
+async def transfer_funds(user_id: str, from_account: str, to_account: str, amount: str,
+                         idempotency_key: Optional[str] = None) -> TransferResult:
+    """
+    Transfer funds from one account to another.
+
+    A retry with the same ``idempotency_key`` reports the earlier transfer instead of moving the money again.
+    """
+    logger.debug("transfer_funds called with user_id=%s, from_account=%s, to_account=%s, amount=%s, key=%s",
+                 user_id, from_account, to_account, amount, idempotency_key)
     try:
         # Convert amount to Decimal, handling any formatting issues
         clean_amount = amount.replace('$', '').replace(',', '')
         decimal_amount = Decimal(clean_amount)
         
-        # Debug the parameters
-        print(f"[DEBUG] Parsed amount: {decimal_amount} (type: {type(decimal_amount)})")
-        print(f"[DEBUG] from_account: {from_account} (type: {type(from_account)})")
-        print(f"[DEBUG] to_account: {to_account} (type: {type(to_account)})")
+        logger.debug("Parsed amount: %r", decimal_amount)
         
         # Call the transfer function
-        transfer_between_accounts(user_id, from_account, to_account, decimal_amount)
-        return f"✅ Transferred ${clean_amount} from {from_account} to {to_account}."
+        outcome, = await async_database.transfer_many(
+            user_id, [Transfer(from_account, to_account, decimal_amount, idempotency_key)])
+        if outcome.duplicate:
+            message = f"✅ The transfer of ${clean_amount} from {from_account} to {to_account} was already completed."
+        else:
+            message = f"✅ Transferred ${clean_amount} from {from_account} to {to_account}."
+        return TransferResult(success=True, message=message,
+                              from_account=from_account, to_account=to_account, amount=clean_amount)
     except Exception as e:
-        print(f"[ERROR] Transfer failed: {str(e)}")
-        return f"❌ Transfer failed: {str(e)}"
+        logger.error("Transfer failed: %s", e)
+        return TransferResult(success=False, message=f"❌ Transfer failed: {str(e)}",
+                              from_account=from_account, to_account=to_account, amount=amount)
+
+# Tool 3b: Apply a batch of transfers atomically
+@mcp.tool()
+async def transfer_many(user_id: str, transfers: List[Transfer]) -> BulkTransferResult:
+    """
+    Apply a batch of transfers between the user's accounts in one transaction: all of them or none.
+
+    Each transfer may carry an ``idempotency_key``; transfers whose key was used before are
+    skipped and reported as duplicates, so a batch can be retried safely.
+    """
+    logger.debug("transfer_many called with user_id=%s, %d transfers", user_id, len(transfers))
+    try:
+        outcomes = await async_database.transfer_many(user_id, transfers)
+    except Exception as e:
+        logger.error("Bulk transfer failed: %s", e)
+        return BulkTransferResult(success=False, message=f"❌ No transfers were applied: {str(e)}")
+
+    summaries = [TransferSummary.from_outcome(outcome) for outcome in outcomes]
+    duplicates = sum(summary.duplicate for summary in summaries)
+    applied = len(summaries) - duplicates
+    return BulkTransferResult(success=True,
+                              message=f"✅ Applied {applied} transfers; skipped {duplicates} duplicates.",
+                              applied=applied, duplicates=duplicates, transfers=summaries)
 
 # Tool 4: Get account balance
 @mcp.tool()
-def get_account_balance(user_id: str, account_number: str) -> dict:
-    """Get the balance of a specific account."""
-    print(f'[DEBUG] get_account_balance called with user_id={user_id}, account_number={account_number}')
+async def get_account_balance(user_id: str, account_number: str) -> AccountBalance:
+    """Get the balance of a specific account. Fails if the user has no such account."""
+    logger.debug("get_account_balance called with user_id=%s, account_number=%s", user_id, account_number)
     
     # Find the account in the user's accounts
-    accounts = list_accounts(user_id)
+    accounts = await async_database.load_accounts(user_id)
     for account in accounts:
         if account.account_number == account_number:
-            return {
-                "account_number": account.account_number,
-                "account_name": account.account_name,
-                "balance": str(account.balance),
-                "currency": "CAD"
-            }
+            return AccountBalance(account_number=account.account_number,
+                                  account_name=account.account_name,
+                                  balance=str(account.balance))
     
-    return {"error": f"Account {account_number} not found."}
+    # Reported to the client as an error result
+    raise ValueError(f"Account {account_number} not found.")
+
+# Tool 4b: Get an account's balance at a past moment
+@mcp.tool()
+async def get_balance_as_of(user_id: str, account_number: str, timestamp: str) -> BalanceAsOf:
+    """
+    Get the balance a specific account had at a past moment, after the transfers made up to then.
+
+    ``timestamp`` is an ISO date or date-time, e.g. "2025-03-01" or "2025-03-01T09:30"; a date
+    alone means the end of that day, and a time without an offset is the server's local time.
+    Fails if the user has no such account or no balance is recorded for it.
+    """
+    logger.debug("get_balance_as_of called with user_id=%s, account_number=%s, timestamp=%s",
+                 user_id, account_number, timestamp)
+
+    try:
+        moment = datetime.datetime.fromisoformat(timestamp)
+    except ValueError:
+        raise ValueError(f"Invalid timestamp {timestamp!r}; use an ISO date such as 2025-03-01.") from None
+    if len(timestamp.strip()) <= len("YYYY-MM-DD"):
+        moment = datetime.datetime.combine(moment.date(), datetime.time.max)
+    # Transfers are stored in UTC
+    as_of = utc_timestamp(moment)
+
+    accounts = await async_database.load_accounts(user_id)
+    for account in accounts:
+        if account.account_number == account_number:
+            balance = await async_database.load_balance_as_of(account_number, as_of)
+            if balance is None:
+                # Reported to the client as an error result
+                raise ValueError(f"No balance recorded for account {account_number} as of {timestamp}.")
+            return BalanceAsOf(account_number=account.account_number, account_name=account.account_name,
+                               as_of=as_of, balance=str(balance))
+
+    # Reported to the client as an error result
+    raise ValueError(f"Account {account_number} not found.")
 
 # Tool 5: Get transaction history
 @mcp.tool()
-def get_transaction_history(user_id: str, account_number: str, days: int = 30) -> list[dict]:
-    """Get the transaction history for a specific account."""
-    print(f"[DEBUG] get_transaction_history called with user_id={user_id}, account_number={account_number}, days={days}")
-    
-    # Connect to the database to get transaction history
-    import sqlite3
-    from chatbot.database import DB_FILE
-    
-    con = sqlite3.connect(DB_FILE)
-    con.row_factory = sqlite3.Row
-    cur = con.cursor()
+async def get_transaction_history(user_id: str, account_number: str, days: int = 30, limit: int = 20,
+                            cursor: Optional[str] = None) -> TransactionHistory:
+    """
+    Get the transaction history for a specific account, newest first, one page at a time.
+
+    Returns at most ``limit`` transactions, the total number in the date range and a
+    ``next_cursor``; pass that as ``cursor`` to get the following page.
+    """
+    logger.debug("get_transaction_history called with user_id=%s, account_number=%s, days=%s, limit=%s, cursor=%s",
+                 user_id, account_number, days, limit, cursor)
     
     # Calculate the date range
-    today = datetime.datetime.now()
-    start_date = (today - datetime.timedelta(days=days)).isoformat()
-    
-    # Query for transactions with balances
-    cur.execute("""
-        SELECT 
-            TransactionNumber, 
-            TransferDateTime, 
-            CASE 
-                WHEN FromAccountNumber = :account_number THEN 'debit' 
-                ELSE 'credit' 
-            END as transaction_type,
-            CASE 
-                WHEN FromAccountNumber = :account_number THEN -Amount 
-                ELSE Amount 
-            END as amount,
-            CASE 
-                WHEN FromAccountNumber = :account_number THEN 'Transfer to ' || ToAccountNumber
-                ELSE 'Transfer from ' || FromAccountNumber
-            END as description,
-            CASE 
-                WHEN FromAccountNumber = :account_number THEN FromAccountBalance
-                ELSE ToAccountBalance
-            END as balance_after
-        FROM Transfers
-        WHERE (FromAccountNumber = :account_number OR ToAccountNumber = :account_number)
-        AND TransferDateTime >= :start_date
-        ORDER BY TransferDateTime DESC
-    """, {"account_number": account_number, "start_date": start_date})
+    now = datetime.datetime.now(datetime.timezone.utc)
+    start_date = utc_timestamp(now - datetime.timedelta(days=days))
+    limit = max(1, min(limit, TRANSACTION_HISTORY_MAX_LIMIT))
     
-    rows = cur.fetchall()
+    # Query for one page of transactions with balances
+    rows, total, next_cursor = await async_database.load_transaction_history(
+        account_number, start_date, limit, cursor)
     
     # Create transaction objects using stored balances
     transactions = []
     
     for row in rows:
-        amount = Decimal(str(row['amount']))
-        
-        transaction = {
-            "transaction_id": row['TransactionNumber'],
-            "date": row['TransferDateTime'].split('T')[0],  # Just the date part
-            "description": row['description'],
-            "amount": str(amount),
-            "transaction_type": row['transaction_type'],
-            "balance_after": str(row['balance_after'])
-        }
-        transactions.append(transaction)
+        transactions.append(Transaction(
+            transaction_id=row['TransactionNumber'],
+            # Just the date part, in the server's local time
+            date=datetime.datetime.fromisoformat(row['TransferDateTime']).astimezone().date().isoformat(),
+            description=row['description'],
+            amount=str(row['amount']),
+            transaction_type=row['transaction_type'],
+            balance_after=str(row['balance_after'])
+        ))
     
-    con.close()
-    print(f"[DEBUG] Returning: {len(transactions)} transactions")
-    return transactions
+    logger.debug("Returning %d of %d transactions", len(transactions), total)
+    return TransactionHistory(account_number=account_number, transactions=transactions,
+                              total=total, next_cursor=next_cursor)
+
+# Prometheus metrics for the tools, database and RAG stages served by this process
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> Response:
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
+# Hit rate and time saved by the RAG answer cache
+@mcp.custom_route("/rag/cache/stats", methods=["GET"])
+async def rag_cache_stats(request: Request) -> Response:
+    cache = getattr(chatbot, "answer_cache", None)
+    return JSONResponse(cache.stats() if cache is not None else {"enabled": False})
+
+# How often tool calls reused a database connection instead of opening one
+@mcp.custom_route("/db/stats", methods=["GET"])
+async def db_stats(request: Request) -> Response:
+    return JSONResponse(db.stats())
 
 # Run the MCP server using SSE transport
 if __name__ == "__main__":
-    print("[INFO] Starting MCP server on http://127.0.0.1:8050 using SSE transport...")
+    get_rag_chatbot()
+    logger.info("Starting MCP server on http://%s:%s using SSE transport...", MCP_HOST, MCP_PORT)
     mcp.run(transport="sse")
@@ -0,0 +1,193 @@
+"""Prometheus metrics for the chatbot pipeline."""
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Buckets from 1ms to 60s cover everything from a SQLite lookup to a slow LLM call
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_LATENCY = Histogram(
+    "chatbot_stage_duration_seconds",
+    "Time spent in each stage of the chat pipeline.",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+
+TOOL_CALL_LATENCY = Histogram(
+    "chatbot_tool_call_duration_seconds",
+    "Round-trip time of MCP call_tool requests.",
+    ["tool"],
+    buckets=LATENCY_BUCKETS
+)
+
+DB_LATENCY = Histogram(
+    "chatbot_db_duration_seconds",
+    "Time spent in each SQLite data access function.",
+    ["function"],
+    buckets=LATENCY_BUCKETS
+)
+
+DB_CONNECTION_ACQUIRES = Counter(
+    "chatbot_db_connection_acquires_total",
+    "SQLite connections handed to data-access functions, by whether one was opened or reused.",
+    ["result"]
+)
+
+DB_CONNECTIONS_OPEN = Gauge(
+    "chatbot_db_connections_open",
+    "Persistent SQLite connections currently open in this process."
+)
+
+DB_GROUP_COMMIT_SIZE = Histogram(
+    "chatbot_db_group_commit_size",
+    "Writes committed together in one transaction by the single-writer queue.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+
+DB_BUSY_ERRORS = Counter(
+    "chatbot_db_busy_errors_total",
+    "Write transactions that failed because SQLite reported the database busy or locked.",
+    ["function"]
+)
+
+DB_EXECUTOR_WAIT = Histogram(
+    "chatbot_db_executor_wait_seconds",
+    "Time async database calls waited for a read or write executor thread.",
+    ["kind"],
+    buckets=LATENCY_BUCKETS
+)
+
+DB_EXECUTOR_IN_FLIGHT = Gauge(
+    "chatbot_db_executor_in_flight",
+    "Async database calls queued or running on the read or write executor.",
+    ["kind"]
+)
+
+ADMISSION_QUEUE_WAIT = Histogram(
+    "chatbot_admission_queue_wait_seconds",
+    "Time admitted requests waited for an execution slot.",
+    buckets=LATENCY_BUCKETS
+)
+
+ADMISSION_EXECUTION = Histogram(
+    "chatbot_admission_execution_seconds",
+    "Time admitted requests spent executing on the background loop.",
+    buckets=LATENCY_BUCKETS
+)
+
+ADMISSION_REJECTED = Counter(
+    "chatbot_admission_rejected_total",
+    "Requests rejected by admission control.",
+    ["status"]
+)
+
+FAST_PATH_DECISIONS = Counter(
+    "chatbot_fast_path_decisions_total",
+    "Messages considered by the fast-path router, by outcome.",
+    ["result"]
+)
+
+FAST_PATH_CONFIDENCE = Histogram(
+    "chatbot_fast_path_confidence",
+    "Confidence of fast-path routing decisions.",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0)
+)
+
+INTENT_PREDICTIONS = Counter(
+    "chatbot_intent_predictions_total",
+    "Messages classified by the local intent classifier, by predicted intent.",
+    ["intent"]
+)
+
+INTENT_GATED = Counter(
+    "chatbot_intent_gated_total",
+    "Messages answered from a template because of their predicted intent, without the LLM.",
+    ["intent"]
+)
+
+LLM_RETRIES = Counter(
+    "chatbot_llm_retries_total",
+    "Gemini calls retried after a retryable error or attempt timeout.",
+    ["reason"]
+)
+
+LLM_HEDGES = Counter(
+    "chatbot_llm_hedges_total",
+    "Hedged second Gemini requests, by whether they were sent or won.",
+    ["result"]
+)
+
+LLM_TIMEOUTS = Counter(
+    "chatbot_llm_timeouts_total",
+    "Gemini calls abandoned because the overall deadline passed."
+)
+
+RAG_CACHE_LOOKUPS = Counter(
+    "chatbot_rag_cache_lookups_total",
+    "RAG answer cache lookups, by exact hit, semantic hit or miss.",
+    ["result"]
+)
+
+RAG_CACHE_SAVED_SECONDS = Counter(
+    "chatbot_rag_cache_saved_seconds_total",
+    "RAG generation time avoided by answering from the cache."
+)
+
+MCP_CONNECTION_HEALTHY = Gauge(
+    "chatbot_mcp_connection_healthy",
+    "Whether each pooled MCP connection is connected and passing health checks.",
+    ["connection"]
+)
+
+MCP_CONNECTION_OUTSTANDING = Gauge(
+    "chatbot_mcp_connection_outstanding_requests",
+    "MCP requests in flight on each pooled connection.",
+    ["connection"]
+)
+
+MCP_CONNECTION_REQUESTS = Counter(
+    "chatbot_mcp_connection_requests_total",
+    "MCP tool calls sent on each pooled connection, by outcome.",
+    ["connection", "result"]
+)
+
+MCP_CONNECTION_RECONNECTS = Counter(
+    "chatbot_mcp_connection_reconnects_total",
+    "Times each pooled MCP connection was lost or failed to connect.",
+    ["connection"]
+)
+
+SESSION_LOOKUPS = Counter(
+    "chatbot_session_lookups_total",
+    "Assistant session pool lookups.",
+    ["result"]
+)
+
+SESSION_POOL_SIZE = Gauge(
+    "chatbot_session_pool_size",
+    "Number of live assistant sessions."
+)
+
+
+def time_stage(stage: str):
+    """Time a pipeline stage; usable as a context manager or a decorator."""
+    return STAGE_LATENCY.labels(stage).time()
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record a stage duration measured by the caller."""
+    STAGE_LATENCY.labels(stage).observe(seconds)
+
+
+def time_tool_call(tool: str):
+    """Time an MCP tool round-trip."""
+    return TOOL_CALL_LATENCY.labels(tool).time()
+
+
+def time_db(function: str):
+    """Time a database function."""
+    return DB_LATENCY.labels(function).time()
+
+
+def render_metrics():
+    """Return the current metrics in Prometheus text format and its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,7 @@
+-- Transaction history looks transfers up by either side and a date range, newest first:
+-- one index per side lets SQLite answer each half of the OR with a range scan.
+CREATE INDEX IF NOT EXISTS IX_Transfers_From_DateTime ON Transfers (FromAccountNumber, TransferDateTime);
+CREATE INDEX IF NOT EXISTS IX_Transfers_To_DateTime ON Transfers (ToAccountNumber, TransferDateTime);
+
+-- Account listings and transfer targets are looked up by owner.
+CREATE INDEX IF NOT EXISTS IX_Accounts_UserId ON Accounts (UserId);
@@ -0,0 +1,8 @@
+-- Transaction history pages are ordered by (TransferDateTime, TransactionNumber) and resume
+-- below a cursor on both columns: extend the per-side indexes so each side is read in order.
+DROP INDEX IF EXISTS IX_Transfers_From_DateTime;
+DROP INDEX IF EXISTS IX_Transfers_To_DateTime;
+CREATE INDEX IF NOT EXISTS IX_Transfers_From_DateTime_Number
+    ON Transfers (FromAccountNumber, TransferDateTime, TransactionNumber);
+CREATE INDEX IF NOT EXISTS IX_Transfers_To_DateTime_Number
+    ON Transfers (ToAccountNumber, TransferDateTime, TransactionNumber);
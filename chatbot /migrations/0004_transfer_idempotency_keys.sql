@@ -0,0 +1,11 @@
+-- Idempotency keys of applied transfers, scoped to the owner: a retried transfer
+-- whose key is already here is reported as a duplicate instead of being applied again.
+CREATE TABLE IF NOT EXISTS TransferIdempotencyKeys (
+  UserId             TEXT    NOT NULL,
+  IdempotencyKey     TEXT    NOT NULL,
+  TransactionNumber  TEXT    NOT NULL,
+  CreatedDateTime    TEXT    NOT NULL,
+  PRIMARY KEY (UserId, IdempotencyKey),
+  FOREIGN KEY(UserId)            REFERENCES UserCredentials(UserId),
+  FOREIGN KEY(TransactionNumber) REFERENCES Transfers(TransactionNumber)
+) WITHOUT ROWID;
@@ -0,0 +1,68 @@
+-- Point-in-time balances: every account gets an opening checkpoint (its balance before
+-- any transfer) and another one every 64 transfers in or out of it, so the balance at
+-- any moment is the latest checkpoint before it plus at most 64 transfer amounts.
+-- Checkpoints are ordered like the transaction history, by (date-time, transaction);
+-- the opening checkpoint has empty strings for both, which sort before any transfer.
+CREATE TABLE IF NOT EXISTS BalanceCheckpoints (
+  AccountNumber       TEXT    NOT NULL,
+  CheckpointDateTime  TEXT    NOT NULL,
+  TransactionNumber   TEXT    NOT NULL,
+  Balance             NUMERIC NOT NULL,
+  PRIMARY KEY (AccountNumber, CheckpointDateTime, TransactionNumber),
+  FOREIGN KEY(AccountNumber) REFERENCES Accounts(AccountNumber)
+) WITHOUT ROWID;
+
+-- Transfers since the account's latest checkpoint
+ALTER TABLE Accounts ADD COLUMN TransfersSinceCheckpoint INTEGER NOT NULL DEFAULT 0;
+
+-- Backfill: opening balances are today's balance less everything transferred since,
+-- rounded to cents because the sums of NUMERIC amounts are floating point
+INSERT OR IGNORE INTO BalanceCheckpoints (AccountNumber, CheckpointDateTime, TransactionNumber, Balance)
+SELECT a.AccountNumber, '', '',
+       ROUND(a.Balance
+             - COALESCE((SELECT SUM(Amount) FROM Transfers WHERE ToAccountNumber = a.AccountNumber), 0)
+             + COALESCE((SELECT SUM(Amount) FROM Transfers WHERE FromAccountNumber = a.AccountNumber), 0), 2)
+  FROM Accounts a;
+
+-- Backfill: every 64th transfer of each account, with the balance stored on the transfer
+WITH sides AS (
+    SELECT FromAccountNumber AS AccountNumber, TransferDateTime, TransactionNumber, FromAccountBalance AS Balance
+      FROM Transfers
+    UNION ALL
+    SELECT ToAccountNumber, TransferDateTime, TransactionNumber, ToAccountBalance
+      FROM Transfers
+), numbered AS (
+    SELECT *, ROW_NUMBER() OVER (PARTITION BY AccountNumber
+                                 ORDER BY TransferDateTime, TransactionNumber) AS Position
+      FROM sides
+)
+INSERT OR IGNORE INTO BalanceCheckpoints (AccountNumber, CheckpointDateTime, TransactionNumber, Balance)
+SELECT AccountNumber, TransferDateTime, TransactionNumber, Balance
+  FROM numbered
+ WHERE Position % 64 = 0;
+
+UPDATE Accounts SET TransfersSinceCheckpoint = (
+    (SELECT COUNT(*) FROM Transfers WHERE FromAccountNumber = Accounts.AccountNumber)
+    + (SELECT COUNT(*) FROM Transfers WHERE ToAccountNumber = Accounts.AccountNumber)) % 64;
+
+CREATE TRIGGER IF NOT EXISTS TR_Accounts_OpeningCheckpoint
+AFTER INSERT ON Accounts
+BEGIN
+  INSERT OR IGNORE INTO BalanceCheckpoints (AccountNumber, CheckpointDateTime, TransactionNumber, Balance)
+  VALUES (NEW.AccountNumber, '', '', NEW.Balance);
+END;
+
+-- Maintained by every writer of Transfers, so a checkpoint is never more than 64 transfers behind
+CREATE TRIGGER IF NOT EXISTS TR_Transfers_BalanceCheckpoints
+AFTER INSERT ON Transfers
+BEGIN
+  UPDATE Accounts SET TransfersSinceCheckpoint = TransfersSinceCheckpoint + 1
+   WHERE AccountNumber IN (NEW.FromAccountNumber, NEW.ToAccountNumber);
+  INSERT OR IGNORE INTO BalanceCheckpoints (AccountNumber, CheckpointDateTime, TransactionNumber, Balance)
+  SELECT AccountNumber, NEW.TransferDateTime, NEW.TransactionNumber,
+         CASE AccountNumber WHEN NEW.FromAccountNumber THEN NEW.FromAccountBalance ELSE NEW.ToAccountBalance END
+    FROM Accounts
+   WHERE AccountNumber IN (NEW.FromAccountNumber, NEW.ToAccountNumber) AND TransfersSinceCheckpoint >= 64;
+  UPDATE Accounts SET TransfersSinceCheckpoint = 0
+   WHERE AccountNumber IN (NEW.FromAccountNumber, NEW.ToAccountNumber) AND TransfersSinceCheckpoint >= 64;
+END;
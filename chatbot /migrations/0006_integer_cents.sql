@@ -0,0 +1,107 @@
+-- Money is stored as a whole number of cents. NUMERIC columns kept balances and amounts
+-- as floating point, so sums drifted by fractions of a cent; integers add up exactly.
+-- The CENTS declared type (with INTEGER affinity) is what chatbot.db_connection's
+-- converter recognises to return these columns as Decimal dollars.
+--
+-- SQLite can't change a column's type, so each table is rebuilt and its data copied,
+-- multiplied by 100. The triggers reference the rebuilt tables and are recreated last.
+DROP TRIGGER IF EXISTS TR_Accounts_OpeningCheckpoint;
+DROP TRIGGER IF EXISTS TR_Transfers_BalanceCheckpoints;
+
+CREATE TABLE Accounts_Cents (
+  AccountNumber             TEXT    NOT NULL PRIMARY KEY,
+  UserId                    TEXT    NOT NULL,
+  AccountName               TEXT    NOT NULL,
+  Balance                   CENTS INTEGER NOT NULL,
+  CurrencyCode              TEXT    NOT NULL,
+  TransfersSinceCheckpoint  INTEGER NOT NULL DEFAULT 0,
+  FOREIGN KEY(UserId) REFERENCES UserCredentials(UserId)
+);
+INSERT INTO Accounts_Cents (AccountNumber, UserId, AccountName, Balance, CurrencyCode, TransfersSinceCheckpoint)
+SELECT AccountNumber, UserId, AccountName, CAST(ROUND(Balance * 100) AS INTEGER), CurrencyCode,
+       TransfersSinceCheckpoint
+  FROM Accounts;
+DROP TABLE Accounts;
+ALTER TABLE Accounts_Cents RENAME TO Accounts;
+CREATE INDEX IF NOT EXISTS IX_Accounts_UserId ON Accounts (UserId);
+
+CREATE TABLE Transfers_Cents (
+  TransactionNumber   TEXT    NOT NULL PRIMARY KEY,
+  FromAccountNumber   TEXT    NOT NULL,
+  ToAccountNumber     TEXT    NOT NULL,
+  TransferDateTime    TEXT    NOT NULL,
+  Amount              CENTS INTEGER NOT NULL,
+  FromAccountBalance  CENTS INTEGER NOT NULL,
+  ToAccountBalance    CENTS INTEGER NOT NULL,
+  FOREIGN KEY(FromAccountNumber) REFERENCES Accounts(AccountNumber),
+  FOREIGN KEY(ToAccountNumber)   REFERENCES Accounts(AccountNumber)
+);
+INSERT INTO Transfers_Cents (TransactionNumber, FromAccountNumber, ToAccountNumber, TransferDateTime,
+                             Amount, FromAccountBalance, ToAccountBalance)
+SELECT TransactionNumber, FromAccountNumber, ToAccountNumber, TransferDateTime,
+       CAST(ROUND(Amount * 100) AS INTEGER), CAST(ROUND(FromAccountBalance * 100) AS INTEGER),
+       CAST(ROUND(ToAccountBalance * 100) AS INTEGER)
+  FROM Transfers;
+DROP TABLE Transfers;
+ALTER TABLE Transfers_Cents RENAME TO Transfers;
+CREATE INDEX IF NOT EXISTS IX_Transfers_From_DateTime_Number
+    ON Transfers (FromAccountNumber, TransferDateTime, TransactionNumber);
+CREATE INDEX IF NOT EXISTS IX_Transfers_To_DateTime_Number
+    ON Transfers (ToAccountNumber, TransferDateTime, TransactionNumber);
+
+CREATE TABLE Transactions_Cents (
+  TransactionNumber    NUMERIC NOT NULL,
+  AccountNumber        TEXT    NOT NULL,
+  OtherAccountNumber   TEXT    NOT NULL,
+  TransactionDateTime  TEXT    NOT NULL,
+  TransactionTypeCode  TEXT    NOT NULL,
+  Amount               CENTS INTEGER NOT NULL,
+  BalanceAfter         CENTS INTEGER NOT NULL,
+  CONSTRAINT PK_Transactions
+    PRIMARY KEY (TransactionNumber, AccountNumber),
+  FOREIGN KEY(AccountNumber)      REFERENCES Accounts(AccountNumber),
+  FOREIGN KEY(OtherAccountNumber) REFERENCES Accounts(AccountNumber)
+);
+INSERT INTO Transactions_Cents (TransactionNumber, AccountNumber, OtherAccountNumber, TransactionDateTime,
+                                TransactionTypeCode, Amount, BalanceAfter)
+SELECT TransactionNumber, AccountNumber, OtherAccountNumber, TransactionDateTime, TransactionTypeCode,
+       CAST(ROUND(Amount * 100) AS INTEGER), CAST(ROUND(BalanceAfter * 100) AS INTEGER)
+  FROM Transactions;
+DROP TABLE Transactions;
+ALTER TABLE Transactions_Cents RENAME TO Transactions;
+
+CREATE TABLE BalanceCheckpoints_Cents (
+  AccountNumber       TEXT    NOT NULL,
+  CheckpointDateTime  TEXT    NOT NULL,
+  TransactionNumber   TEXT    NOT NULL,
+  Balance             CENTS INTEGER NOT NULL,
+  PRIMARY KEY (AccountNumber, CheckpointDateTime, TransactionNumber),
+  FOREIGN KEY(AccountNumber) REFERENCES Accounts(AccountNumber)
+) WITHOUT ROWID;
+INSERT INTO BalanceCheckpoints_Cents (AccountNumber, CheckpointDateTime, TransactionNumber, Balance)
+SELECT AccountNumber, CheckpointDateTime, TransactionNumber, CAST(ROUND(Balance * 100) AS INTEGER)
+  FROM BalanceCheckpoints;
+DROP TABLE BalanceCheckpoints;
+ALTER TABLE BalanceCheckpoints_Cents RENAME TO BalanceCheckpoints;
+
+-- As in 0005
+CREATE TRIGGER IF NOT EXISTS TR_Accounts_OpeningCheckpoint
+AFTER INSERT ON Accounts
+BEGIN
+  INSERT OR IGNORE INTO BalanceCheckpoints (AccountNumber, CheckpointDateTime, TransactionNumber, Balance)
+  VALUES (NEW.AccountNumber, '', '', NEW.Balance);
+END;
+
+CREATE TRIGGER IF NOT EXISTS TR_Transfers_BalanceCheckpoints
+AFTER INSERT ON Transfers
+BEGIN
+  UPDATE Accounts SET TransfersSinceCheckpoint = TransfersSinceCheckpoint + 1
+   WHERE AccountNumber IN (NEW.FromAccountNumber, NEW.ToAccountNumber);
+  INSERT OR IGNORE INTO BalanceCheckpoints (AccountNumber, CheckpointDateTime, TransactionNumber, Balance)
+  SELECT AccountNumber, NEW.TransferDateTime, NEW.TransactionNumber,
+         CASE AccountNumber WHEN NEW.FromAccountNumber THEN NEW.FromAccountBalance ELSE NEW.ToAccountBalance END
+    FROM Accounts
+   WHERE AccountNumber IN (NEW.FromAccountNumber, NEW.ToAccountNumber) AND TransfersSinceCheckpoint >= 64;
+  UPDATE Accounts SET TransfersSinceCheckpoint = 0
+   WHERE AccountNumber IN (NEW.FromAccountNumber, NEW.ToAccountNumber) AND TransfersSinceCheckpoint >= 64;
+END;
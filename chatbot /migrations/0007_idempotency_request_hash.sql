@@ -0,0 +1,4 @@
+-- A fingerprint of the transfer each idempotency key was first used for, so reusing a
+-- key for a different transfer is rejected instead of reported as a duplicate of the
+-- first one. Keys recorded before this migration have none and are trusted as before.
+ALTER TABLE TransferIdempotencyKeys ADD COLUMN RequestHash TEXT;
@@ -0,0 +1,111 @@
+-- Transfers are numbered in commit order and their times stored in UTC. Local wall-clock
+-- times repeat an hour when daylight saving time ends and jump when the clock is stepped,
+-- so ordering by them put transfers out of order and point-in-time balances counted some
+-- twice or missed them. TransferSequence only ever grows, so checkpoints and the
+-- transfers after them are found by it; the times only pick the point in the sequence.
+-- For that the transfer functions never stamp a transfer before the one committed ahead
+-- of it, even if the clock has gone back.
+--
+-- Times written before this migration are taken to be in the migrating machine's local
+-- time, which is what the transfer functions used, and rewritten as UTC to the microsecond
+-- with an explicit offset, e.g. 2025-03-01T14:30:00.000000+00:00, so they sort as strings.
+-- A transfer stamped before one inserted ahead of it, as in the hour repeated when daylight
+-- saving time ends, takes that transfer's time. The tables are rebuilt as in 0006, keeping
+-- the order the transfers were inserted in.
+DROP TRIGGER IF EXISTS TR_Accounts_OpeningCheckpoint;
+DROP TRIGGER IF EXISTS TR_Transfers_BalanceCheckpoints;
+
+CREATE TABLE Transfers_Sequenced (
+  TransferSequence    INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+  TransactionNumber   TEXT    NOT NULL UNIQUE,
+  FromAccountNumber   TEXT    NOT NULL,
+  ToAccountNumber     TEXT    NOT NULL,
+  TransferDateTime    TEXT    NOT NULL,
+  Amount              CENTS INTEGER NOT NULL,
+  FromAccountBalance  CENTS INTEGER NOT NULL,
+  ToAccountBalance    CENTS INTEGER NOT NULL,
+  FOREIGN KEY(FromAccountNumber) REFERENCES Accounts(AccountNumber),
+  FOREIGN KEY(ToAccountNumber)   REFERENCES Accounts(AccountNumber)
+);
+WITH converted AS (
+    SELECT rowid AS Position, TransactionNumber, FromAccountNumber, ToAccountNumber,
+           strftime('%Y-%m-%dT%H:%M:%S', TransferDateTime, 'utc')
+               || substr(TransferDateTime || '.000000', 20, 7) || '+00:00' AS TransferDateTime,
+           Amount, FromAccountBalance, ToAccountBalance
+      FROM Transfers
+)
+INSERT INTO Transfers_Sequenced (TransactionNumber, FromAccountNumber, ToAccountNumber, TransferDateTime,
+                                 Amount, FromAccountBalance, ToAccountBalance)
+SELECT TransactionNumber, FromAccountNumber, ToAccountNumber,
+       MAX(TransferDateTime) OVER (ORDER BY Position),
+       Amount, FromAccountBalance, ToAccountBalance
+  FROM converted
+ ORDER BY Position;
+DROP TABLE Transfers;
+ALTER TABLE Transfers_Sequenced RENAME TO Transfers;
+CREATE INDEX IF NOT EXISTS IX_Transfers_From_DateTime_Number
+    ON Transfers (FromAccountNumber, TransferDateTime, TransactionNumber);
+CREATE INDEX IF NOT EXISTS IX_Transfers_To_DateTime_Number
+    ON Transfers (ToAccountNumber, TransferDateTime, TransactionNumber);
+-- The transfers in or out of an account between two checkpoints
+CREATE INDEX IF NOT EXISTS IX_Transfers_From_Sequence ON Transfers (FromAccountNumber, TransferSequence);
+CREATE INDEX IF NOT EXISTS IX_Transfers_To_Sequence ON Transfers (ToAccountNumber, TransferSequence);
+
+UPDATE TransferIdempotencyKeys
+   SET CreatedDateTime = strftime('%Y-%m-%dT%H:%M:%S', CreatedDateTime, 'utc')
+                         || substr(CreatedDateTime || '.000000', 20, 7) || '+00:00';
+
+-- Checkpoints are keyed by the sequence number of the transfer they follow; the opening
+-- checkpoint has 0, which comes before any transfer
+CREATE TABLE BalanceCheckpoints_Sequenced (
+  AccountNumber     TEXT    NOT NULL,
+  TransferSequence  INTEGER NOT NULL,
+  Balance           CENTS INTEGER NOT NULL,
+  PRIMARY KEY (AccountNumber, TransferSequence),
+  FOREIGN KEY(AccountNumber) REFERENCES Accounts(AccountNumber)
+) WITHOUT ROWID;
+INSERT INTO BalanceCheckpoints_Sequenced (AccountNumber, TransferSequence, Balance)
+SELECT AccountNumber, 0, Balance
+  FROM BalanceCheckpoints
+ WHERE CheckpointDateTime = '' AND TransactionNumber = '';
+
+-- Every 64th transfer of each account in the new order, with the balance stored on the
+-- transfer; the count since the last checkpoint in Accounts stays the same
+WITH sides AS (
+    SELECT FromAccountNumber AS AccountNumber, TransferSequence, FromAccountBalance AS Balance
+      FROM Transfers
+    UNION ALL
+    SELECT ToAccountNumber, TransferSequence, ToAccountBalance
+      FROM Transfers
+), numbered AS (
+    SELECT *, ROW_NUMBER() OVER (PARTITION BY AccountNumber ORDER BY TransferSequence) AS Position
+      FROM sides
+)
+INSERT OR IGNORE INTO BalanceCheckpoints_Sequenced (AccountNumber, TransferSequence, Balance)
+SELECT AccountNumber, TransferSequence, Balance
+  FROM numbered
+ WHERE Position % 64 = 0;
+DROP TABLE BalanceCheckpoints;
+ALTER TABLE BalanceCheckpoints_Sequenced RENAME TO BalanceCheckpoints;
+
+-- As in 0006, keyed by TransferSequence
+CREATE TRIGGER IF NOT EXISTS TR_Accounts_OpeningCheckpoint
+AFTER INSERT ON Accounts
+BEGIN
+  INSERT OR IGNORE INTO BalanceCheckpoints (AccountNumber, TransferSequence, Balance)
+  VALUES (NEW.AccountNumber, 0, NEW.Balance);
+END;
+
+CREATE TRIGGER IF NOT EXISTS TR_Transfers_BalanceCheckpoints
+AFTER INSERT ON Transfers
+BEGIN
+  UPDATE Accounts SET TransfersSinceCheckpoint = TransfersSinceCheckpoint + 1
+   WHERE AccountNumber IN (NEW.FromAccountNumber, NEW.ToAccountNumber);
+  INSERT OR IGNORE INTO BalanceCheckpoints (AccountNumber, TransferSequence, Balance)
+  SELECT AccountNumber, NEW.TransferSequence,
+         CASE AccountNumber WHEN NEW.FromAccountNumber THEN NEW.FromAccountBalance ELSE NEW.ToAccountBalance END
+    FROM Accounts
+   WHERE AccountNumber IN (NEW.FromAccountNumber, NEW.ToAccountNumber) AND TransfersSinceCheckpoint >= 64;
+  UPDATE Accounts SET TransfersSinceCheckpoint = 0
+   WHERE AccountNumber IN (NEW.FromAccountNumber, NEW.ToAccountNumber) AND TransfersSinceCheckpoint >= 64;
+END;
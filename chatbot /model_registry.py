@@ -0,0 +1,68 @@
+"""Shared Gemini model instances and system prompts for the banking assistant."""
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from chatbot.config_client import MODEL_CONFIG, SYSTEM_INSTRUCTIONS, TOOL_DEFINITIONS
+from chatbot.llm_provider import get_provider
+
+# Number of formatted per-user system prompts to keep
+SYSTEM_PROMPT_CACHE_SIZE = 1024
+
+
+class ModelRegistry:
+    """
+    Builds each Gemini model once per (model name, temperature, tool set) and reuses it.
+
+    Models come from the configured LLM provider.  ``GenerativeModel`` holds no
+    per-request state, so one instance can serve every user and every concurrent
+    request.  Tool sets are registered by name so their
+    schema is converted to a tool configuration only once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tool_sets: Dict[str, List[dict]] = {}
+        self._models: Dict[Tuple[str, float, Optional[str]], Any] = {}
+
+    def register_tools(self, name: str, function_declarations: List[dict]):
+        """Register a named set of function declarations."""
+        with self._lock:
+            self._tool_sets[name] = [{"function_declarations": function_declarations}]
+            # Models built from an older definition of this tool set are stale
+            for key in [key for key in self._models if key[2] == name]:
+                del self._models[key]
+
+    def get_model(self, model_name: str = MODEL_CONFIG["model_name"],
+                  temperature: float = MODEL_CONFIG["temperature"],
+                  tool_set: Optional[str] = "banking") -> Any:
+        """
+        Return the shared model for this configuration, building it on first use.
+
+        Pass ``tool_set=None`` for a plain text model with no function calling.
+        """
+        key = (model_name, temperature, tool_set)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                tools = tool_config = None
+                if tool_set is not None:
+                    tools = self._tool_sets[tool_set]
+                    tool_config = {"function_calling_config": MODEL_CONFIG["tool_calling_config"]}
+                model = get_provider().generative_model(model_name, temperature, tools, tool_config)
+                self._models[key] = model
+            return model
+
+
+model_registry = ModelRegistry()
+model_registry.register_tools("banking", TOOL_DEFINITIONS)
+
+
+@lru_cache(maxsize=SYSTEM_PROMPT_CACHE_SIZE)
+def system_instructions_for(user_id: str) -> str:
+    """Return the system instructions formatted for a user."""
+    return SYSTEM_INSTRUCTIONS.format(user_id=user_id)
@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal
+from typing import Optional
 
 
 @dataclass
@@ -22,4 +23,34 @@ class Account:
         self.balance = Decimal("0")
     
     def __str__(self):
-        return f"{self.account_name} ({self.account_number}): {self.balance}"
\ No newline at end of file
+        return f"{self.account_name} ({self.account_number}): {self.balance}"
+
+@dataclass
+class Transfer:
+    """One transfer between two accounts of the same owner, as requested by a client."""
+
+    from_account: str
+    """The account number the fund is transferred from."""
+
+    to_account: str
+    """The account number the fund is transferred to."""
+
+    amount: Decimal
+    """The amount to transfer; must be positive."""
+
+    idempotency_key: Optional[str] = None
+    """Client-chosen key; a transfer whose key the owner has already used is not applied again."""
+
+
+@dataclass
+class TransferOutcome:
+    """What happened to one requested transfer."""
+
+    transaction_id: str
+    """The TransactionNumber of the transfer, or of the earlier one with the same idempotency key."""
+
+    transfer: Transfer
+    """The transfer as requested."""
+
+    duplicate: bool = False
+    """True if the idempotency key had been used before and nothing was applied."""
@@ -0,0 +1,208 @@
+"""Semantic cache of RAG answers to repeated banking questions."""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
+
+import numpy as np
+
+from chatbot.config import RAG_CACHE_MAX_ENTRIES, RAG_CACHE_TTL, RAG_CACHE_SIMILARITY
+from chatbot.logger import get_logger
+from chatbot.metrics import RAG_CACHE_LOOKUPS, RAG_CACHE_SAVED_SECONDS
+
+logger = get_logger(__name__)
+
+
+# Products and plans whose questions read alike but whose answers differ,
+# e.g. "TFSA contribution limit" and "RRSP contribution limit"
+PRODUCT_TERMS = frozenset({
+    "tfsa", "rrsp", "resp", "rrif", "fhsa", "rdsp", "gic", "heloc", "mortgage", "loan", "chequing",
+    "checking", "saving", "credit", "debit", "visa", "mastercard", "avion", "westjet", "cashback",
+    "insurance", "business", "student", "youth", "senior", "usd",
+})
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase the question and drop punctuation and extra whitespace."""
+    return " ".join(re.sub(r"[^\w\s$%]", " ", question.lower()).split())
+
+
+def question_terms(normalized: str) -> FrozenSet[str]:
+    """The product names and numbers in a normalized question, with plurals made singular."""
+    terms = set()
+    for word in normalized.split():
+        if word.endswith("s") and word[:-1] in PRODUCT_TERMS:
+            word = word[:-1]
+        if word in PRODUCT_TERMS or any(char.isdigit() for char in word):
+            terms.add(word)
+    return frozenset(terms)
+
+
+class _CacheEntry:
+    def __init__(self, answer: Dict[str, Any], embedding: Optional[np.ndarray], terms: FrozenSet[str],
+                 latency: float):
+        self.answer = answer
+        self.embedding = embedding
+        self.terms = terms
+        self.latency = latency
+        self.created = time.monotonic()
+
+
+class SemanticAnswerCache:
+    """
+    Caches RAG answers by question, matching rephrasings by embedding similarity.
+
+    A question is looked up first by its normalized text, then by cosine
+    similarity of its embedding against the cached questions; a match needs a
+    similarity of at least ``similarity_threshold`` and the same product names
+    and numbers (see ``question_terms``), since embeddings of "TFSA contribution
+    limit" and "RRSP contribution limit" are close enough to pass any useful
+    threshold.  Entries expire after
+    ``ttl`` seconds and the least recently used are evicted beyond
+    ``max_entries``.  The whole cache is cleared when ``build_id`` returns a
+    different value, i.e. when the vector store has been rebuilt.
+    """
+
+    def __init__(self, embed: Optional[Callable[[str], List[float]]] = None,
+                 build_id: Optional[Callable[[], Optional[str]]] = None,
+                 max_entries: int = RAG_CACHE_MAX_ENTRIES, ttl: float = RAG_CACHE_TTL,
+                 similarity_threshold: float = RAG_CACHE_SIMILARITY):
+        self._embed = embed
+        self._build_id = build_id
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._current_build = build_id() if build_id else None
+        self._exact_hits = 0
+        self._semantic_hits = 0
+        self._misses = 0
+        self._saved_seconds = 0.0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get_or_compute(self, question: str, compute: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Return the cached answer for the question, or compute, cache and return it.
+
+        Exceptions from ``compute`` propagate and nothing is cached.
+        """
+        key = normalize_question(question)
+        self._check_build()
+
+        entry = self._get_exact(key)
+        if entry is not None:
+            self._record_hit("exact", entry)
+            return entry.answer
+
+        terms = question_terms(key)
+        embedding = self._embedding(question)
+        if embedding is not None:
+            entry = self._get_similar(embedding, terms)
+            if entry is not None:
+                self._record_hit("semantic", entry)
+                return entry.answer
+
+        with self._lock:
+            self._misses += 1
+        RAG_CACHE_LOOKUPS.labels("miss").inc()
+
+        started = time.perf_counter()
+        answer = compute(question)
+        self._put(key, _CacheEntry(answer, embedding, terms, time.perf_counter() - started))
+        return answer
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _check_build(self):
+        """Drop every entry if the vector store was rebuilt since they were cached."""
+        if self._build_id is None:
+            return
+        build = self._build_id()
+        with self._lock:
+            if build != self._current_build:
+                self._current_build = build
+                self._entries.clear()
+                self._invalidations += 1
+
+    def _embedding(self, question: str) -> Optional[np.ndarray]:
+        """Unit-length embedding of the question, or None if embedding isn't available."""
+        if self._embed is None:
+            return None
+        try:
+            vector = np.asarray(self._embed(question), dtype=np.float32)
+        except Exception as e:
+            logger.warning("Embedding failed, using exact matches only: %s", e)
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _expired(self, entry: _CacheEntry) -> bool:
+        return time.monotonic() - entry.created > self.ttl
+
+    def _get_exact(self, key: str) -> Optional[_CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _get_similar(self, embedding: np.ndarray, terms: FrozenSet[str]) -> Optional[_CacheEntry]:
+        """The most similar cached question about the same products and numbers, if similar enough."""
+        with self._lock:
+            keys = [key for key, entry in self._entries.items()
+                    if entry.embedding is not None and entry.terms == terms and not self._expired(entry)]
+            if not keys:
+                return None
+            matrix = np.stack([self._entries[key].embedding for key in keys])
+            scores = matrix @ embedding
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity_threshold:
+                return None
+            self._entries.move_to_end(keys[best])
+            return self._entries[keys[best]]
+
+    def _put(self, key: str, entry: _CacheEntry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def _record_hit(self, kind: str, entry: _CacheEntry):
+        with self._lock:
+            if kind == "exact":
+                self._exact_hits += 1
+            else:
+                self._semantic_hits += 1
+            self._saved_seconds += entry.latency
+        RAG_CACHE_LOOKUPS.labels(kind).inc()
+        RAG_CACHE_SAVED_SECONDS.inc(entry.latency)
+
+    def stats(self) -> Dict[str, Any]:
+        """Report hit rate and the RAG time saved by the cache."""
+        with self._lock:
+            hits = self._exact_hits + self._semantic_hits
+            lookups = hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "similarity_threshold": self.similarity_threshold,
+                "exact_hits": self._exact_hits,
+                "semantic_hits": self._semantic_hits,
+                "misses": self._misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "saved_seconds": self._saved_seconds,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
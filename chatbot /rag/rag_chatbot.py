@@ -1,22 +1,25 @@
 import os
 import sys
 from dotenv import load_dotenv
-import google.generativeai as genai
 from langchain.chains import RetrievalQA
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 # Handle imports whether called directly or from MCP
 try:
-    from chatbot.rag.vector_store import load_vector_store, create_vector_store
+    from chatbot.rag.vector_store import load_vector_store, create_vector_store, read_build_id
     from chatbot.rag.document_loader import load_documents, split_documents
 except ImportError:
-    from vector_store import load_vector_store, create_vector_store
+    from vector_store import load_vector_store, create_vector_store, read_build_id
     from document_loader import load_documents, split_documents
 
+from chatbot.config import RAG_CACHE_ENABLED
+from chatbot.llm_provider import get_provider
+from chatbot.logger import get_logger
+from chatbot.metrics import time_stage
+from chatbot.rag.answer_cache import SemanticAnswerCache
+
 load_dotenv()
 
-# Configure the Gemini API
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+logger = get_logger(__name__)
 
 class RBCChatbot:
     _instance = None
@@ -42,15 +45,15 @@ class RBCChatbot:
         self._ensure_vector_store_exists(persist_directory)
         self.vector_store = load_vector_store(persist_directory)
         
-        # Initialize the LLM with explicit API key
-        api_key = os.getenv("GEMINI_API_KEY")
-        self.llm = ChatGoogleGenerativeAI(model="gemini-1.5-pro", temperature=0.2, google_api_key=api_key)
+        # Initialize the LLM from the configured provider
+        self.llm = get_provider().chat_model("gemini-1.5-pro", 0.2)
         
         # Create the retrieval chain
+        self.retriever = self.vector_store.as_retriever(search_kwargs={"k": 5})
         self.qa_chain = RetrievalQA.from_chain_type(
             llm=self.llm,
             chain_type="stuff",
-            retriever=self.vector_store.as_retriever(search_kwargs={"k": 5}),
+            retriever=self.retriever,
             return_source_documents=True
         )
         
@@ -62,6 +65,14 @@ class RBCChatbot:
         and suggest the user contact RBC directly. Always be professional, helpful, and concise.
         """
         
+        # Repeated and rephrased questions are answered from the cache
+        self.answer_cache = None
+        if RAG_CACHE_ENABLED:
+            self.answer_cache = SemanticAnswerCache(
+                embed=self.vector_store.embeddings.embed_query,
+                build_id=lambda: read_build_id(persist_directory)
+            )
+        
         self._initialized = True
     
     def _ensure_vector_store_exists(self, persist_directory):
@@ -69,47 +80,57 @@ class RBCChatbot:
         from chatbot.config import DOCS_DIRECTORY
         
         if not os.path.exists(persist_directory):
-            print("Vector store not found. Creating new vector store...")
+            logger.info("Vector store not found. Creating new vector store...")
             if os.path.exists(DOCS_DIRECTORY):
                 documents = load_documents(DOCS_DIRECTORY)
                 chunks = split_documents(documents)
                 create_vector_store(chunks, persist_directory)
             else:
-                print(f"Warning: Documents directory {DOCS_DIRECTORY} not found.")
-                print("Creating empty vector store.")
+                logger.warning("Documents directory %s not found. Creating empty vector store.", DOCS_DIRECTORY)
                 # Create an empty vector store
                 create_vector_store([], persist_directory)
     
     def answer_question(self, question):
-        """Answer a question using RAG"""
+        """Answer a question using RAG, from the answer cache when possible"""
         try:
-            # Combine the system prompt with the user's question
-            full_query = f"{self.system_prompt}\n\nQuestion: {question}"
-            
-            # Get the answer from the chain using invoke instead of __call__
-            result = self.qa_chain.invoke({"query": full_query})
-            
-            # Extract the answer and sources
-            answer = result["result"]
-            source_docs = result["source_documents"]
-            
-            # Format sources for citation
-            sources = []
-            for doc in source_docs:
-                if hasattr(doc, "metadata") and "source" in doc.metadata:
-                    sources.append(doc.metadata["source"])
-            
-            # Return the answer and unique sources
-            return {
-                "answer": answer,
-                "sources": list(set(sources))
-            }
+            if self.answer_cache is not None:
+                return self.answer_cache.get_or_compute(question, self._generate_answer)
+            return self._generate_answer(question)
         except Exception as e:
+            # Errors are returned as answers but never cached
             return {
                 "answer": f"I encountered an error: {str(e)}",
                 "sources": []
             }
     
+    def _generate_answer(self, question):
+        """Run retrieval and generation for a question"""
+        # Combine the system prompt with the user's question
+        full_query = f"{self.system_prompt}\n\nQuestion: {question}"
+        
+        # Run the two halves of the chain separately so each can be timed
+        with time_stage("rag_retrieval"):
+            source_docs = self.retriever.invoke(full_query)
+        
+        with time_stage("rag_generation"):
+            result = self.qa_chain.combine_documents_chain.invoke({
+                "input_documents": source_docs,
+                "question": full_query
+            })
+        answer = result["output_text"]
+        
+        # Format sources for citation
+        sources = []
+        for doc in source_docs:
+            if hasattr(doc, "metadata") and "source" in doc.metadata:
+                sources.append(doc.metadata["source"])
+        
+        # Return the answer and unique sources
+        return {
+            "answer": answer,
+            "sources": list(set(sources))
+        }
+    
     def get_relevant_documents(self, query):
         """Retrieve relevant documents for a query without generating an answer"""
         try:
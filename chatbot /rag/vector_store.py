@@ -1,28 +1,28 @@
 import os
+import uuid
 from langchain_chroma import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from dotenv import load_dotenv
-import google.generativeai as genai
 
 load_dotenv()
 
-# Configure the Gemini API with the API key from .env
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found in environment variables")
-genai.configure(api_key=api_key)
-
 from chatbot.config import VECTOR_DB_DIR
+from chatbot.llm_provider import get_provider
+from chatbot.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Embedding model used to build and query the store
+EMBEDDING_MODEL = "models/embedding-001"
+
+# Marker file rewritten on every build so caches of answers can tell the store changed
+BUILD_ID_FILE = "build_id"
 
 def create_vector_store(documents, persist_directory=None):
     if persist_directory is None:
         persist_directory = VECTOR_DB_DIR
     """Create a vector store from document chunks"""
-    # Initialize the embeddings using Gemini with explicit API key
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
-        google_api_key=api_key
-    )
+    # Initialize the embeddings from the configured LLM provider
+    embeddings = get_provider().embeddings(EMBEDDING_MODEL)
     
     # Create the vector store (persistence is automatic)
     vector_store = Chroma.from_documents(
@@ -30,18 +30,39 @@ def create_vector_store(documents, persist_directory=None):
         embedding=embeddings,
         persist_directory=persist_directory
     )
-    print(f"Vector store created with {len(documents)} document chunks")
-    print(f"Vector store persisted to {persist_directory}")
+    write_build_id(persist_directory)
+    logger.info("Vector store created with %d document chunks", len(documents))
+    logger.info("Vector store persisted to %s", persist_directory)
     return vector_store
 
+def write_build_id(persist_directory=None):
+    """Record a new build ID for the vector store and return it"""
+    if persist_directory is None:
+        persist_directory = VECTOR_DB_DIR
+    build_id = uuid.uuid4().hex
+    os.makedirs(persist_directory, exist_ok=True)
+    path = os.path.join(persist_directory, BUILD_ID_FILE)
+    # Write then rename so readers never see a partial ID
+    with open(path + ".tmp", "w") as f:
+        f.write(build_id)
+    os.replace(path + ".tmp", path)
+    return build_id
+
+def read_build_id(persist_directory=None):
+    """Return the vector store's build ID, or None for a store built before IDs were recorded"""
+    if persist_directory is None:
+        persist_directory = VECTOR_DB_DIR
+    try:
+        with open(os.path.join(persist_directory, BUILD_ID_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
 def load_vector_store(persist_directory=None):
     if persist_directory is None:
         persist_directory = VECTOR_DB_DIR
     """Load an existing vector store"""
-    # Use the same API key as in create_vector_store
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
-        google_api_key=api_key
-    )
+    # Use the same embeddings as in create_vector_store
+    embeddings = get_provider().embeddings(EMBEDDING_MODEL)
     vector_store = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
     return vector_store
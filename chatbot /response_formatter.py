@@ -1,15 +1,21 @@
 """Response formatter for the banking assistant."""
-import json
-import random
-from decimal import Decimal
-from typing import Dict, List, Any, Optional, Union
+from typing import Any
+from chatbot.logger import get_logger
+from chatbot.metrics import time_stage
+from chatbot.tool_results import (AccountBalance, AccountList, BalanceAsOf, BankingAnswer, ToolError,
+                                  TransactionHistory, TransferResult)
+
+logger = get_logger(__name__)
 
 class ResponseFormatter:
-    """Formats responses from function calls into user-friendly messages."""
+    """Formats the typed results of function calls into user-friendly messages."""
     
     @staticmethod
+    @time_stage("format_response")
     def format_response(function_name: str, result: Any) -> str:
         """Format a function result based on the function name."""
+        if isinstance(result, ToolError):
+            return ResponseFormatter.format_generic(result)
         formatter_method = getattr(
             ResponseFormatter, 
             f"format_{function_name}", 
@@ -20,188 +26,108 @@ class ResponseFormatter:
     @staticmethod
     def format_generic(result: Any) -> str:
         """Generic formatter for any result."""
-        if isinstance(result, dict) and result.get("skip_response", False):
-            return ""
-        
-        if isinstance(result, dict) and "error" in result:
-            return f"I'm sorry, there was an error: {result['error']}"
+        if isinstance(result, ToolError):
+            if result.skip_response:
+                return ""
+            return f"I'm sorry, there was an error: {result.error}"
             
         return ""
     
     @staticmethod
-    def format_get_account_balance(result: Any) -> str:
+    def format_get_account_balance(result: AccountBalance) -> str:
         """Format account balance information."""
         try:
-            # If it's a dictionary with balance info
-            if isinstance(result, dict):
-                if 'balance' in result:
-                    return (f"Your {result.get('account_name', 'account')} "
-                           f"({result.get('account_number', '')}) has a balance of "
-                           f"{result.get('balance', '')} {result.get('currency', 'CAD')}.")
-            
-            # If it's a list, try to find the first item with balance info
-            if isinstance(result, list):
-                for item in result:
-                    if isinstance(item, dict) and 'balance' in item:
-                        return (f"Your {item.get('account_name', 'account')} "
-                               f"({item.get('account_number', '')}) has a balance of "
-                               f"{item.get('balance', '')} {item.get('currency', 'CAD')}.")
-            
-            # If we couldn't extract structured data, return a generic message
+            return (f"Your {result.account_name or 'account'} "
+                    f"({result.account_number}) has a balance of "
+                    f"{result.balance} {result.currency}.")
+        except Exception as e:
+            logger.warning("Error formatting balance: %s", e)
             return "I found your account balance information."
+    
+    @staticmethod
+    def format_get_balance_as_of(result: BalanceAsOf) -> str:
+        """Format an account's balance at a past moment."""
+        try:
+            return (f"On {result.as_of.split('T')[0]}, your {result.account_name or 'account'} "
+                    f"({result.account_number}) had a balance of "
+                    f"{result.balance} {result.currency}.")
         except Exception as e:
-            print(f"Error formatting balance: {e}")
+            logger.warning("Error formatting past balance: %s", e)
             return "I found your account balance information."
     
     @staticmethod
-    def format_list_user_accounts(result: Any) -> str:
+    def format_list_user_accounts(result: AccountList) -> str:
         """Format a list of accounts."""
         try:
-            accounts = ResponseFormatter._extract_accounts(result)
-            if accounts and len(accounts) > 0:
+            if result.accounts:
                 account_lines = ["Here are your accounts:"]
-                for account in accounts:
+                for account in result.accounts:
                     account_lines.append(
-                        f"- {account.get('account_name', 'Account')} "
-                        f"({account.get('account_number', '')})"
+                        f"- {account.account_name or 'Account'} "
+                        f"({account.account_number})"
                     )
                 return "\n".join(account_lines)
             else:
                 return "You don't have any accounts set up yet."
         except Exception as e:
-            print(f"Error formatting accounts: {e}")
+            logger.warning("Error formatting accounts: %s", e)
             return "I found your accounts but couldn't format them properly."
     
     @staticmethod
-    def format_transfer_funds(result: Any) -> str:
+    def format_transfer_funds(result: TransferResult) -> str:
         """Format transfer result."""
         try:
-            if isinstance(result, str):
-                if "Transferred" in result:
-                    return result
-                elif "failed" in result:
-                    return result
-                else:
-                    return "I've completed the transfer for you."
-            else:
-                return "I've completed the transfer for you."
+            return result.message or "I've completed the transfer for you."
         except Exception as e:
-            print(f"Error formatting transfer result: {e}")
+            logger.warning("Error formatting transfer result: %s", e)
             return "The transfer has been processed."
     
     @staticmethod
-    def format_get_transaction_history(result: Any) -> str:
+    def format_get_transaction_history(result: TransactionHistory) -> str:
         """Format transaction history."""
         try:
-            # Handle both list and single transaction object formats
-            transactions = []
-            
-            if isinstance(result, list):
-                transactions = result
-            elif isinstance(result, dict):
-                # Single transaction as a dict
-                transactions = [result]
-            elif isinstance(result, str):
-                # Try to parse JSON string
-                try:
-                    json_data = json.loads(result)
-                    if isinstance(json_data, list):
-                        transactions = json_data
-                    elif isinstance(json_data, dict):
-                        transactions = [json_data]
-                except:
-                    pass
-            
-            if transactions and len(transactions) > 0:
+            transactions = result.transactions
+            if transactions:
                 lines = [f"Here are the recent transactions for your account:"]
-                for i, transaction in enumerate(transactions[:5]):  # Show only first 5 transactions
-                    date = transaction.get('date', 'Unknown date')
-                    desc = transaction.get('description', 'Transaction')
-                    amount = transaction.get('amount', '0.00')
-                    lines.append(f"- {date}: {desc} - {amount}")
-                if len(transactions) > 5:
-                    lines.append(f"...and {len(transactions) - 5} more transactions.")
+                for transaction in transactions:  # The client only asks for the page it shows
+                    lines.append(f"- {transaction.date}: {transaction.description} - {transaction.amount}")
+                if result.total > len(transactions):
+                    lines.append(f"...and {result.total - len(transactions)} more transactions.")
                 return "\n".join(lines)
             else:
                 return "I couldn't find any transactions for this account."
         except Exception as e:
-            print(f"Error formatting transaction history: {e}")
+            logger.warning("Error formatting transaction history: %s", e)
             return "I found your transaction history but couldn't format it properly."
     
     @staticmethod
-    def format_answer_banking_question(result: Any) -> str:
+    def format_answer_banking_question(result: BankingAnswer) -> str:
         """Format RAG answer."""
         try:
-            if isinstance(result, dict) and "answer" in result:
-                answer = result["answer"]
-                
-                # Check if the answer indicates no information was found
-                if ("I don't have information" in answer or 
-                    "I don't have specific information" in answer):
-                    return ("I'm sorry, but I don't have specific information about that in my "
-                           "RBC knowledge base. I can only answer questions about RBC banking "
-                           "products, services, and policies. Is there something else I can "
-                           "help you with regarding RBC?")
-                else:
-                    response = answer
-                
-                # Optionally add sources
-                if "sources" in result and result["sources"]:
-                    sources = result["sources"]
-                    if len(sources) == 1:
-                        response += f"\n\nSource: {sources[0]}"
-                    elif len(sources) > 1:
-                        response += "\n\nSources:"
-                        for source in sources:
-                            response += f"\n- {source}"
-                
-                return response
-            else:
-                # Try to extract answer from complex object
-                answer = ResponseFormatter._extract_rag_answer(result)
-                if answer:
-                    return answer
-                else:
-                    return "I couldn't find specific information about that in my knowledge base."
-        except Exception as e:
-            print(f"Error formatting RAG answer: {e}")
-            return "I found some information but couldn't format it properly."
-    
-    @staticmethod
-    def _extract_accounts(result: Any) -> List[Dict[str, Any]]:
-        """Extract accounts from a complex result object."""
-        accounts = []
-        
-        # If result is a list of dictionaries
-        if isinstance(result, list):
-            for item in result:
-                if isinstance(item, dict) and 'account_name' in item and 'account_number' in item:
-                    accounts.append(item)
-        
-        # If result is a dictionary with account info
-        elif isinstance(result, dict) and 'account_name' in result and 'account_number' in result:
-            accounts.append(result)
-        
-        return accounts
-    
-    @staticmethod
-    def _extract_rag_answer(result: Any) -> Optional[str]:
-        """Extract the answer from a RAG result."""
-        try:
-            # If it's a dictionary with an answer
-            if isinstance(result, dict) and 'answer' in result:
-                return result['answer']
+            answer = result.answer
+            if not answer:
+                return "I couldn't find specific information about that in my knowledge base."
+            
+            # Check if the answer indicates no information was found
+            if ("I don't have information" in answer or 
+                "I don't have specific information" in answer):
+                return ("I'm sorry, but I don't have specific information about that in my "
+                       "RBC knowledge base. I can only answer questions about RBC banking "
+                       "products, services, and policies. Is there something else I can "
+                       "help you with regarding RBC?")
             
-            # If it's a list, try to find the first item with an answer
-            if isinstance(result, list):
-                for item in result:
-                    if isinstance(item, dict) and 'answer' in item:
-                        return item['answer']
+            response = answer
             
-            # If it's a string, return it directly
-            if isinstance(result, str):
-                return result
+            # Optionally add sources
+            sources = result.sources
+            if len(sources) == 1:
+                response += f"\n\nSource: {sources[0]}"
+            elif len(sources) > 1:
+                response += "\n\nSources:"
+                for source in sources:
+                    response += f"\n- {source}"
             
-            return None
-        except:
-            return None
+            return response
+        except Exception as e:
+            logger.warning("Error formatting RAG answer: %s", e)
+            return "I found some information but couldn't format it properly."
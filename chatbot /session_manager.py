@@ -0,0 +1,158 @@
+"""Per-user session pool for the banking assistant."""
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Any
+
+from chatbot.config import SESSION_MAX_COUNT, SESSION_IDLE_TIMEOUT
+from chatbot.mcp.client_sse import InteractiveBankingAssistant
+from chatbot.mcp.connection_pool import MCPConnectionPool
+from chatbot.logger import get_logger
+from chatbot.metrics import SESSION_LOOKUPS, SESSION_POOL_SIZE
+
+logger = get_logger(__name__)
+
+
+class _SessionEntry:
+    """An assistant plus the bookkeeping the pool needs for it."""
+
+    def __init__(self, assistant: InteractiveBankingAssistant):
+        self.assistant = assistant
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        self.closed = False
+        self.ready = asyncio.ensure_future(assistant.initialize_session())
+
+
+class SessionManager:
+    """
+    Keeps one InteractiveBankingAssistant per user, keyed by the JWT subject.
+
+    Assistants are created lazily on a user's first message.  The pool is capped
+    at ``max_sessions`` with least-recently-used eviction, and sessions idle for
+    longer than ``idle_timeout`` seconds are closed.  Every assistant talks to MCP
+    through one shared connection pool.  All methods must be called from the
+    event loop that owns the MCP sessions.
+    """
+
+    def __init__(self, max_sessions: int = SESSION_MAX_COUNT,
+                 idle_timeout: float = SESSION_IDLE_TIMEOUT,
+                 factory: Callable[[str], InteractiveBankingAssistant] = None,
+                 pool: MCPConnectionPool = None):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.pool = pool or MCPConnectionPool()
+        self._factory = factory or (lambda user_id: InteractiveBankingAssistant(
+            user_id=user_id, pool=self.pool, allow_user_switch=False))
+        self._sessions: "OrderedDict[str, _SessionEntry]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        SESSION_POOL_SIZE.set_function(lambda: len(self._sessions))
+
+    def _get_entry(self, user_id: str) -> _SessionEntry:
+        """Return the user's session, creating it (and evicting others) if needed."""
+        self._expire_idle()
+
+        entry = self._sessions.get(user_id)
+        if entry is not None and entry.ready.done() and entry.ready.exception() is not None:
+            # The MCP connection never came up; drop it and build a fresh one
+            self._sessions.pop(user_id)
+            entry = None
+
+        if entry is not None:
+            self._hits += 1
+            SESSION_LOOKUPS.labels("hit").inc()
+            self._sessions.move_to_end(user_id)
+        else:
+            self._misses += 1
+            SESSION_LOOKUPS.labels("miss").inc()
+            entry = _SessionEntry(self._factory(user_id))
+            self._sessions[user_id] = entry
+            while len(self._sessions) > self.max_sessions:
+                _, evicted = self._sessions.popitem(last=False)
+                self._evictions += 1
+                asyncio.ensure_future(self._close_entry(evicted))
+
+        entry.last_used = time.monotonic()
+        return entry
+
+    def _expire_idle(self):
+        """Close sessions that have not been used within the idle timeout."""
+        cutoff = time.monotonic() - self.idle_timeout
+        # The dict is kept in recency order, so stop at the first fresh entry
+        while self._sessions:
+            user_id, entry = next(iter(self._sessions.items()))
+            if entry.last_used >= cutoff or entry.lock.locked():
+                break
+            self._sessions.pop(user_id)
+            self._expirations += 1
+            asyncio.ensure_future(self._close_entry(entry))
+
+    @staticmethod
+    async def _close_entry(entry: _SessionEntry):
+        """Close an evicted session once any in-flight message has finished."""
+        try:
+            async with entry.lock:
+                # A message still waiting on the lock sees this and moves to a fresh session
+                entry.closed = True
+                await entry.ready
+                await entry.assistant.close_session()
+        except Exception as e:
+            logger.warning("Error closing session for %s: %s", entry.assistant.user_id, e)
+
+    @asynccontextmanager
+    async def _locked_entry(self, user_id: str):
+        """
+        Hold the lock of the user's session while a message is handled.
+
+        Messages from the same user are handled one at a time so their
+        conversation history stays consistent.  A session evicted while the
+        message waited for its lock is closed by then, so a fresh one is used.
+        """
+        while True:
+            entry = self._get_entry(user_id)
+            await entry.ready
+            async with entry.lock:
+                if entry.closed:
+                    continue
+                try:
+                    yield entry
+                finally:
+                    entry.last_used = time.monotonic()
+                return
+
+    async def send_message(self, user_id: str, message: str):
+        """Send a message on behalf of a user through that user's own assistant."""
+        async with self._locked_entry(user_id) as entry:
+            return await entry.assistant.send_message(message)
+
+    async def stream_message(self, user_id: str, message: str):
+        """Stream a reply for a user, yielding text pieces as the assistant produces them."""
+        async with self._locked_entry(user_id) as entry:
+            async for chunk in entry.assistant.send_message_stream(message):
+                yield chunk
+
+    async def close_all(self):
+        """Close every session in the pool, then the shared MCP connections."""
+        entries = list(self._sessions.values())
+        self._sessions.clear()
+        await asyncio.gather(*(self._close_entry(entry) for entry in entries))
+        await self.pool.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Report pool size and hit rate."""
+        lookups = self._hits + self._misses
+        return {
+            "size": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "idle_timeout": self.idle_timeout,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            "mcp_pool": self.pool.stats(),
+        }
@@ -0,0 +1,220 @@
+"""
+Typed results of the banking MCP tools.
+
+The server's tools return these dataclasses, so FastMCP publishes an output
+schema for each tool and sends the result as ``structuredContent``.  The
+client decodes that dictionary once with ``decode_tool_result`` and the
+response formatter works on the objects directly.
+"""
+import json
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional
+
+from chatbot.models import Account, TransferOutcome
+
+
+def _from_dict(cls, data: Dict[str, Any]):
+    """Build a flat result dataclass from a dict, ignoring keys it doesn't declare."""
+    names = {f.name for f in fields(cls)}
+    return cls(**{key: value for key, value in data.items() if key in names})
+
+
+@dataclass
+class AccountSummary:
+    """One of the user's accounts."""
+
+    account_number: str
+    account_name: str
+    balance: str
+
+    @classmethod
+    def from_account(cls, account: Account) -> "AccountSummary":
+        return cls(account.account_number, account.account_name, str(account.balance))
+
+
+@dataclass
+class AccountList:
+    """Result of ``list_user_accounts`` and ``list_target_accounts``."""
+
+    accounts: List[AccountSummary] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AccountList":
+        return cls([_from_dict(AccountSummary, item) for item in data.get("accounts", [])])
+
+
+@dataclass
+class AccountBalance:
+    """Result of ``get_account_balance``."""
+
+    account_number: str
+    account_name: str
+    balance: str
+    currency: str = "CAD"
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AccountBalance":
+        return _from_dict(cls, data)
+
+
+@dataclass
+class BalanceAsOf:
+    """Result of ``get_balance_as_of``."""
+
+    account_number: str
+    account_name: str
+    as_of: str
+    """The moment the balance is for, as an ISO timestamp."""
+    balance: str
+    currency: str = "CAD"
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BalanceAsOf":
+        return _from_dict(cls, data)
+
+
+@dataclass
+class TransferResult:
+    """Result of ``transfer_funds``; a failed transfer is reported here rather than raised."""
+
+    success: bool
+    message: str
+    from_account: str = ""
+    to_account: str = ""
+    amount: str = ""
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TransferResult":
+        return _from_dict(cls, data)
+
+
+@dataclass
+class TransferSummary:
+    """One transfer of a ``transfer_many`` batch."""
+
+    transaction_id: str
+    from_account: str
+    to_account: str
+    amount: str
+    idempotency_key: Optional[str] = None
+    duplicate: bool = False
+    """True if the idempotency key had already been used, so this transfer wasn't applied again."""
+
+    @classmethod
+    def from_outcome(cls, outcome: TransferOutcome) -> "TransferSummary":
+        transfer = outcome.transfer
+        return cls(outcome.transaction_id, transfer.from_account, transfer.to_account, str(transfer.amount),
+                   transfer.idempotency_key, outcome.duplicate)
+
+
+@dataclass
+class BulkTransferResult:
+    """Result of ``transfer_many``; a rejected batch is reported here rather than raised."""
+
+    success: bool
+    message: str
+    applied: int = 0
+    duplicates: int = 0
+    transfers: List[TransferSummary] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BulkTransferResult":
+        return cls(data.get("success", False), data.get("message", ""), data.get("applied", 0),
+                   data.get("duplicates", 0),
+                   [_from_dict(TransferSummary, item) for item in data.get("transfers", [])])
+
+
+@dataclass
+class Transaction:
+    """One transfer in an account's history."""
+
+    transaction_id: str
+    date: str
+    description: str
+    amount: str
+    transaction_type: str
+    balance_after: str
+
+
+@dataclass
+class TransactionHistory:
+    """Result of ``get_transaction_history``: one page of transactions, newest first."""
+
+    account_number: str
+    transactions: List[Transaction] = field(default_factory=list)
+    total: int = 0
+    """Number of transactions in the requested date range, across all pages."""
+    next_cursor: Optional[str] = None
+    """Pass as ``cursor`` to get the next page; None on the last page."""
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TransactionHistory":
+        transactions = [_from_dict(Transaction, item) for item in data.get("transactions", [])]
+        return cls(data.get("account_number", ""), transactions,
+                   data.get("total", len(transactions)), data.get("next_cursor"))
+
+
+@dataclass
+class BankingAnswer:
+    """Result of ``answer_banking_question``."""
+
+    answer: str
+    sources: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BankingAnswer":
+        return _from_dict(cls, data)
+
+
+@dataclass
+class ToolError:
+    """A tool call that failed, or that was refused before reaching the server."""
+
+    error: str
+    skip_response: bool = False
+    """Say nothing rather than apologise, e.g. when the model asked for no tool at all."""
+
+
+# Result type of each MCP tool, keyed by tool name
+TOOL_RESULT_TYPES = {
+    "list_user_accounts": AccountList,
+    "list_target_accounts": AccountList,
+    "get_account_balance": AccountBalance,
+    "get_balance_as_of": BalanceAsOf,
+    "transfer_funds": TransferResult,
+    "transfer_many": BulkTransferResult,
+    "get_transaction_history": TransactionHistory,
+    "answer_banking_question": BankingAnswer,
+}
+
+
+def _text_content(result: Any) -> str:
+    return "\n".join(getattr(block, "text", "") for block in getattr(result, "content", None) or [])
+
+
+def decode_tool_result(function_name: str, result: Any) -> Any:
+    """
+    Turn an MCP ``CallToolResult`` into the tool's result object, or a ``ToolError``.
+
+    The structured content is used as is; servers that predate output schemas
+    send the same object as a single JSON text block, which is parsed instead.
+    Results that are already decoded are returned unchanged.
+    """
+    if isinstance(result, (ToolError, *TOOL_RESULT_TYPES.values())):
+        return result
+
+    if getattr(result, "isError", False):
+        return ToolError(_text_content(result) or f"{function_name} failed")
+
+    result_type = TOOL_RESULT_TYPES.get(function_name)
+    if result_type is None:
+        return ToolError(f"Unknown tool: {function_name}")
+
+    data: Optional[Dict[str, Any]] = getattr(result, "structuredContent", None)
+    if data is None:
+        text = _text_content(result)
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return ToolError(f"Unexpected result from {function_name}: {text[:200]}")
+    return result_type.from_dict(data)
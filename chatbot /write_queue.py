@@ -0,0 +1,121 @@
+"""Single-writer queue that commits concurrent database writes together (group commit)."""
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Tuple, TypeVar
+
+from chatbot.config import DB_GROUP_COMMIT_MAX_BATCH, DB_GROUP_COMMIT_WINDOW_MS
+from chatbot.db_connection import ConnectionProvider, is_busy_error
+from chatbot.logger import get_logger
+from chatbot.metrics import DB_BUSY_ERRORS, DB_GROUP_COMMIT_SIZE
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+_Write = Tuple[Future, contextvars.Context, Callable[..., Any], tuple]
+
+
+class WriteQueue:
+    """
+    Runs every write on one thread and commits the writes that queued up meanwhile in one transaction.
+
+    A write is a function taking the connection as its first argument.  The writer
+    thread takes the next write plus up to ``max_batch - 1`` more already waiting
+    (waiting up to ``window_ms`` for stragglers), opens one ``BEGIN IMMEDIATE``
+    transaction, runs each write under its own savepoint and commits once, so the
+    whole group costs one lock acquisition and one journal sync.  A write that
+    raises is rolled back to its savepoint and its caller gets the exception; the
+    rest of the group still commits.  Callers' futures resolve only after the
+    commit, so with ``synchronous=FULL`` (the default ``DB_SYNCHRONOUS``) a result
+    always describes durable data; with ``NORMAL`` the WAL isn't synced on commit
+    and the last acknowledged writes can be lost on power failure.
+
+    Because there is only ever one writer in the process, writes never wait on
+    each other for SQLite's lock; they queue here instead.
+    """
+
+    def __init__(self, provider: ConnectionProvider, max_batch: int = DB_GROUP_COMMIT_MAX_BATCH,
+                 window_ms: float = DB_GROUP_COMMIT_WINDOW_MS):
+        self.provider = provider
+        self.max_batch = max(1, max_batch)
+        self.window_ms = window_ms
+        self._queue: "queue.SimpleQueue[_Write]" = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, write: Callable[..., T], *args) -> "Future[T]":
+        """Queue ``write(connection, *args)`` and return a future for its result."""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                    self._thread.start()
+        future: Future = Future()
+        self._queue.put((future, contextvars.copy_context(), write, args))
+        return future
+
+    def run(self, write: Callable[..., T], *args) -> T:
+        """Queue a write and wait until it has been committed."""
+        return self.submit(write, *args).result()
+
+    def _next_group(self) -> List[_Write]:
+        group = [self._queue.get()]
+        deadline = time.monotonic() + self.window_ms / 1000
+        while len(group) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                group.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return group
+
+    def _run(self):
+        while True:
+            group = self._next_group()
+            try:
+                self._commit(group)
+            except BaseException as e:
+                # The transaction as a whole failed, so none of its writes took effect
+                if is_busy_error(e):
+                    DB_BUSY_ERRORS.labels("group_commit").inc()
+                logger.error("Group commit of %d writes failed: %s", len(group), e)
+                for future, *_ in group:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _commit(self, group: List[_Write]):
+        con = self.provider.connection()
+        outcomes = []
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            for future, context, write, args in group:
+                if not future.set_running_or_notify_cancel():
+                    outcomes.append(None)
+                    continue
+                con.execute("SAVEPOINT queued_write")
+                try:
+                    result = context.run(write, con, *args)
+                except Exception as e:
+                    con.execute("ROLLBACK TO queued_write")
+                    con.execute("RELEASE queued_write")
+                    outcomes.append((False, e))
+                else:
+                    con.execute("RELEASE queued_write")
+                    outcomes.append((True, result))
+            con.commit()
+        except BaseException:
+            if con.in_transaction:
+                con.rollback()
+            raise
+        DB_GROUP_COMMIT_SIZE.observe(len(group))
+
+        for (future, *_), outcome in zip(group, outcomes):
+            if outcome is not None:
+                succeeded, value = outcome
+                if succeeded:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
@@ -1,5 +1,19 @@
 let accessToken = null;
 
+// A message that fails to get through is sent again with the same X-Request-ID, which the
+// server uses as the idempotency key of any transfer it makes, so a retry can't repeat one
+const MAX_SEND_ATTEMPTS = 3;
+const RETRYABLE_STATUSES = [429, 502, 503, 504];
+
+function newRequestId() {
+  if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+  return Date.now().toString(36) + Math.random().toString(36).slice(2);
+}
+
+function sleep(ms) {
+  return new Promise(resolve => setTimeout(resolve, ms));
+}
+
 // Toggle the visibility of the chat popup
 function toggleChat() {
   const chatPopup = document.getElementById('chat-popup');
@@ -97,31 +111,110 @@ async function sendMessage() {
     return;
   }
 
-  try {
-    // Show typing indicator
-    showTypingIndicator();
-    
-    const res = await fetch('/chat', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-        'Authorization': `Bearer ${accessToken}`
-      },
-      body: JSON.stringify({ message })
-    });
-    
-    // Remove typing indicator
-    removeTypingIndicator();
-    
-    const data = await res.json();
-    appendMessage('Bot', data.reply);
-  } catch (err) {
-    // Remove typing indicator
-    removeTypingIndicator();
-    
-    console.error('Chat error:', err);
-    appendMessage('System', '⚠️ Could not send message.');
+  const requestId = newRequestId();
+  showTypingIndicator();
+
+  for (let attempt = 1; ; attempt++) {
+    let res;
+    try {
+      res = await fetch('/chat/stream', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${accessToken}`,
+          'X-Request-ID': requestId
+        },
+        body: JSON.stringify({ message })
+      });
+    } catch (err) {
+      if (attempt < MAX_SEND_ATTEMPTS) {
+        await sleep(1000 * attempt);
+        continue;
+      }
+      removeTypingIndicator();
+      console.error('Chat error:', err);
+      appendMessage('System', '⚠️ Could not send message.');
+      return;
+    }
+
+    // Busy or timed out: wait as long as the server asks, then try again
+    if (RETRYABLE_STATUSES.includes(res.status) && attempt < MAX_SEND_ATTEMPTS) {
+      const retryAfter = parseFloat(res.headers.get('Retry-After')) || attempt;
+      await sleep(1000 * retryAfter);
+      continue;
+    }
+
+    try {
+      // Errors before streaming starts come back as plain JSON
+      if (!res.ok || !res.body) {
+        removeTypingIndicator();
+        const data = await res.json();
+        appendMessage('Bot', data.reply);
+        return;
+      }
+
+      await readReplyStream(res.body);
+    } catch (err) {
+      removeTypingIndicator();
+      console.error('Chat error:', err);
+      appendMessage('System', '⚠️ Could not send message.');
+    }
+    return;
+  }
+}
+
+// Render a server-sent-events reply into a bot message as the pieces arrive
+async function readReplyStream(body) {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  const chatBox = document.getElementById('chat-box');
+  let buffer = '';
+  let reply = '';
+  let msgElem = null;
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let eventType = 'message';
+      let data = '';
+      for (const line of rawEvent.split('\n')) {
+        if (line.startsWith('event: ')) eventType = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      const payload = data ? JSON.parse(data) : {};
+
+      if (eventType === 'error') {
+        removeTypingIndicator();
+        appendMessage('System', payload.error);
+        return;
+      }
+      if (eventType === 'done') {
+        removeTypingIndicator();
+        return;
+      }
+
+      // First piece of text replaces the typing indicator with the bot message
+      if (!msgElem) {
+        removeTypingIndicator();
+        msgElem = document.createElement('div');
+        msgElem.classList.add('message', 'bot-message');
+        chatBox.appendChild(msgElem);
+      }
+      // Model text can echo user input and tool data, so it is shown as text, never parsed as HTML
+      reply += payload.delta;
+      msgElem.textContent = reply;
+      chatBox.scrollTop = chatBox.scrollHeight;
+    }
   }
+  removeTypingIndicator();
 }
 
 // Make the chat popup draggable
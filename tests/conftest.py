@@ -0,0 +1,22 @@
+"""Make the ``chatbot`` package importable when pytest runs from the repository root."""
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# The MCP server migrates and opens the default database when imported; keep that off bank.db
+os.environ.setdefault("CHATBOT_DB_FILE", os.path.join(tempfile.mkdtemp(prefix="chatbot-tests-"), "bank.db"))
+
+from chatbot.database import apply_migrations  # noqa: E402
+from chatbot.db_connection import ConnectionProvider  # noqa: E402
+
+
+@pytest.fixture
+def provider(tmp_path):
+    """Connections to a scratch database with every migration applied."""
+    provider = ConnectionProvider(str(tmp_path / "bank.db"))
+    apply_migrations(provider.connection())
+    yield provider
+    provider.close()
@@ -0,0 +1,46 @@
+"""Semantic hits in the RAG answer cache."""
+import zlib
+
+import numpy as np
+
+from chatbot.rag.answer_cache import SemanticAnswerCache, normalize_question, question_terms
+
+
+def embed(question: str):
+    """A stand-in embedding that, like real ones, barely tells products apart."""
+    words = normalize_question(question).split()
+    vector = np.zeros(64, dtype=np.float32)
+    for word in words:
+        weight = 0.1 if word in ("tfsa", "rrsp") else 1.0
+        vector[zlib.crc32(word.encode()) % 64] += weight
+    return vector
+
+
+def answer(question: str):
+    return {"answer": f"about {question}", "sources": []}
+
+
+def test_question_terms_are_products_and_numbers():
+    assert question_terms(normalize_question("What are the TFSAs limits for 2024?")) == {"tfsa", "2024"}
+    assert question_terms(normalize_question("Savings account fees")) == {"saving"}
+
+
+def test_rephrasing_about_the_same_product_is_a_semantic_hit():
+    cache = SemanticAnswerCache(embed=embed, similarity_threshold=0.9)
+    first = cache.get_or_compute("What is the TFSA contribution limit?", answer)
+
+    assert cache.get_or_compute("what is the tfsa contribution limit, please", answer) is first
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_similar_question_about_another_product_is_a_miss():
+    cache = SemanticAnswerCache(embed=embed, similarity_threshold=0.9)
+    cache.get_or_compute("What is the TFSA contribution limit?", answer)
+    vectors = [embed(q) for q in ("What is the TFSA contribution limit?", "What is the RRSP contribution limit?")]
+    similarity = vectors[0] @ vectors[1] / np.linalg.norm(vectors[0]) / np.linalg.norm(vectors[1])
+    assert similarity >= 0.9
+
+    result = cache.get_or_compute("What is the RRSP contribution limit?", answer)
+
+    assert result["answer"] == "about What is the RRSP contribution limit?"
+    assert cache.stats()["semantic_hits"] == 0
@@ -0,0 +1,85 @@
+"""Point-in-time balances: a clock that goes back, the move to UTC times and the MCP tool's errors."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from chatbot import database
+from chatbot.database import apply_migrations, apply_transfer, load_balance_as_of, load_migrations, utc_timestamp
+from chatbot.db_connection import ConnectionProvider
+
+# test1's seeded accounts
+CHEQUING, SAVING, CREDIT = "1234567890", "2345678901", "3456789012"
+
+START = datetime(2025, 3, 1, 10, tzinfo=timezone.utc)
+
+
+def at(**offset) -> str:
+    return utc_timestamp(START + timedelta(**offset))
+
+
+class SteppedClock(datetime):
+    """A ``datetime`` whose ``now()`` returns the moments in ``moments`` in turn."""
+    moments = iter(())
+
+    @classmethod
+    def now(cls, tz=None):
+        return next(cls.moments)
+
+
+def test_transfers_made_after_the_clock_goes_back_are_counted_once(provider, monkeypatch):
+    # 64 transfers, enough for a checkpoint, then the clock goes back an hour for 6 more
+    moments = [START + timedelta(minutes=i) for i in range(64)]
+    moments += [START + timedelta(hours=-1, minutes=i) for i in range(6)]
+    monkeypatch.setattr(SteppedClock, "moments", iter(moments))
+    monkeypatch.setattr(database, "datetime", SteppedClock)
+    with provider.transaction("IMMEDIATE") as con:
+        for _ in range(70):
+            apply_transfer(con, "test1", CHEQUING, SAVING, Decimal("1.00"))
+    monkeypatch.undo()
+
+    con = provider.connection()
+    times = [row[0] for row in con.execute("SELECT TransferDateTime FROM Transfers ORDER BY TransferSequence")]
+    assert times == sorted(times) and times[-7:] == [at(minutes=63)] * 7
+    assert load_balance_as_of(CHEQUING, at(hours=-2), con) == Decimal("100000.00")
+    assert load_balance_as_of(CHEQUING, at(minutes=30), con) == Decimal("99969.00")
+    assert load_balance_as_of(CHEQUING, at(minutes=63, microseconds=-1), con) == Decimal("99937.00")
+    assert load_balance_as_of(CHEQUING, at(minutes=63), con) == Decimal("99930.00")
+    assert load_balance_as_of(CHEQUING, at(days=1), con) == Decimal("99930.00")
+    assert load_balance_as_of(SAVING, at(days=1), con) == Decimal("100070.00")
+
+
+def test_migration_stores_times_in_utc_in_insertion_order(tmp_path, monkeypatch):
+    provider = ConnectionProvider(str(tmp_path / "bank.db"))
+    con = provider.connection()
+    migrations = load_migrations()
+    monkeypatch.setattr(database, "load_migrations", lambda: [m for m in migrations if m[0] < 8])
+    apply_migrations(con)
+    # Local times, as written before migration 0008; the second transfer is stamped earlier
+    con.executemany(
+        "INSERT INTO Transfers (TransactionNumber, FromAccountNumber, ToAccountNumber, TransferDateTime, "
+        "Amount, FromAccountBalance, ToAccountBalance) VALUES (?, ?, ?, ?, 100, ?, ?)",
+        [("T1", CHEQUING, SAVING, "2025-03-01T09:40:00.250000", 9999900, 10000100),
+         ("T2", CHEQUING, SAVING, "2025-03-01T09:10:00", 9999800, 10000200)])
+    monkeypatch.undo()
+    apply_migrations(con)
+
+    # The second transfer takes the first one's time
+    first_time = utc_timestamp(datetime(2025, 3, 1, 9, 40, 0, 250000))
+    rows = con.execute("SELECT TransactionNumber, TransferDateTime FROM Transfers ORDER BY TransferSequence")
+    assert [tuple(row) for row in rows] == [("T1", first_time), ("T2", first_time)]
+    assert load_balance_as_of(CHEQUING, utc_timestamp(datetime(2025, 3, 1, 9)), con) == Decimal("100000.00")
+    assert load_balance_as_of(CHEQUING, first_time, con) == Decimal("99998.00")
+    provider.close()
+
+
+def test_balance_as_of_without_a_checkpoint_is_an_error():
+    from chatbot.db_connection import db
+    from chatbot.mcp import server_sse
+
+    with db.transaction() as con:
+        con.execute("DELETE FROM BalanceCheckpoints WHERE AccountNumber=?", (CREDIT,))
+
+    with pytest.raises(ValueError, match=f"No balance recorded for account {CREDIT}"):
+        asyncio.run(server_sse.get_balance_as_of("test1", CREDIT, "2025-03-01"))
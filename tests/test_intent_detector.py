@@ -0,0 +1,49 @@
+"""The compiled keyword matcher against the substring checks it replaced."""
+import dataclasses
+
+import pytest
+
+from chatbot.benchmarks.intent_matching import legacy_checks, matcher_checks
+from chatbot.intent_detector import IntentDetector, KeywordMatcher, scan_text
+
+# Keywords with an inflection, where the word-boundary matcher must agree with the
+# old substring checks (it differs on purpose only inside other words, e.g. "discard")
+INFLECTED_MESSAGES = [
+    "what are savings bonds",
+    "savings",
+    "my savings balance",
+    "transfers",
+    "transferring funds to my brother",
+    "I deposited $20",
+    "deposits",
+    "my credit cards",
+    "credited yet?",
+    "any fees on payments?",
+    "loans for students",
+    "statements please",
+    "show my transactions",
+    "interest rates on mortgages",
+    "investments",
+    "withdrawals limit",
+    "insurances",
+    "sending money abroad",
+]
+
+
+@pytest.mark.parametrize("message", INFLECTED_MESSAGES)
+def test_inflected_keywords_match_like_the_substring_checks(message):
+    assert matcher_checks(KeywordMatcher(), message) == legacy_checks(message)
+
+
+def test_account_name_still_counts_as_the_banking_keyword_inside_it():
+    assert IntentDetector.is_banking_related("what are savings bonds")
+
+
+def test_cached_scans_cannot_be_changed_by_callers():
+    matches = scan_text("my savings balance")
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        matches.categories = frozenset()
+    with pytest.raises(AttributeError):
+        matches.categories.add("transfer")
+    assert scan_text("my savings balance").categories == {"banking"}
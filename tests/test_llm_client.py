@@ -0,0 +1,39 @@
+"""The hedge delay is taken from whole generate calls only."""
+import asyncio
+
+from chatbot.llm_client import HEDGE_MIN_SAMPLES, ResilientLLM
+
+
+class SlowModel:
+    """Answers after ``latency`` seconds; a stream's first chunk arrives at once."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def generate_content_async(self, contents, stream=False):
+        if stream:
+            return self._chunks()
+        await asyncio.sleep(self.latency)
+        return "response"
+
+    async def _chunks(self):
+        yield "first"
+        await asyncio.sleep(self.latency)
+        yield "rest"
+
+
+def test_streams_do_not_shorten_the_hedge_delay():
+    client = ResilientLLM(hedge=True, hedge_min_delay=0.0)
+    model = SlowModel(latency=0.02)
+
+    async def scenario():
+        for _ in range(HEDGE_MIN_SAMPLES):
+            await client.generate(model, "prompt")
+        before = client.hedge_delay()
+        for _ in range(5 * HEDGE_MIN_SAMPLES):
+            assert [chunk async for chunk in client.stream(model, "prompt")] == ["first", "rest"]
+        return before, client.hedge_delay()
+
+    before, after = asyncio.run(scenario())
+    assert before >= 0.02
+    assert after == before
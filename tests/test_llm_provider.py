@@ -0,0 +1,18 @@
+"""A provider that is missing part of the interface cannot be constructed."""
+import pytest
+
+from chatbot.llm_provider import LLMProvider
+from chatbot.loadtest.stub_gemini import StubProvider
+
+
+def test_an_incomplete_provider_fails_at_construction():
+    class GenerativeOnly(LLMProvider):
+        def generative_model(self, model_name, temperature, tools=None, tool_config=None):
+            return None
+
+    with pytest.raises(TypeError, match="chat_model"):
+        GenerativeOnly()
+
+
+def test_the_load_test_stub_implements_the_interface():
+    assert StubProvider().name == "stub"
@@ -0,0 +1,59 @@
+"""Schema migrations and the indexes the history queries depend on."""
+import pytest
+
+from chatbot.database import (BALANCE_CHECKPOINT_SQL, BALANCE_CUTOFF_SQL, BALANCE_DELTA_SQL, TRANSACTION_COUNT_SQL,
+                              apply_migrations, explain_query_plan, history_page_sql, load_migrations)
+
+HISTORY_PARAMS = {"account_number": "1234567890", "start_date": "2025-01-01T00:00:00", "limit": 21,
+                  "before_time": "2025-06-01T00:00:00", "before_number": "T1"}
+BALANCE_PARAMS = {"account_number": "1234567890", "as_of": "2025-06-01T00:00:00.000000+00:00",
+                  "since_sequence": 0, "until_sequence": 64}
+
+
+def test_migrations_bring_the_schema_to_the_latest_version(provider):
+    con = provider.connection()
+    latest = load_migrations()[-1][0]
+
+    assert con.execute("PRAGMA user_version").fetchone()[0] == latest
+    assert apply_migrations(con) == []
+
+
+def assert_uses_indexes(plan, table):
+    steps = [step for step in plan if f" {table} " in f"{step} "]
+    assert steps, plan
+    for step in steps:
+        assert step.startswith(f"SEARCH {table} USING ") and "INDEX" in step, plan
+
+
+@pytest.mark.parametrize("sql", [history_page_sql(False), history_page_sql(True), TRANSACTION_COUNT_SQL],
+                         ids=["first page", "next page", "count"])
+def test_history_queries_search_the_transfer_indexes(provider, sql):
+    plan = explain_query_plan(sql, HISTORY_PARAMS, provider.connection())
+
+    assert_uses_indexes(plan, "Transfers")
+    assert any("IX_Transfers_From_DateTime_Number" in step for step in plan), plan
+    assert any("IX_Transfers_To_DateTime_Number" in step for step in plan), plan
+
+
+def test_account_lookup_by_owner_uses_the_user_index(provider):
+    plan = explain_query_plan("SELECT AccountNumber, AccountName, Balance FROM Accounts WHERE UserId=:user_id",
+                              {"user_id": "test1"}, provider.connection())
+
+    assert_uses_indexes(plan, "Accounts")
+    assert any("IX_Accounts_UserId" in step for step in plan), plan
+
+
+@pytest.mark.parametrize("sql, index", [(BALANCE_CUTOFF_SQL, "DateTime_Number"), (BALANCE_DELTA_SQL, "Sequence")],
+                         ids=["cutoff", "delta"])
+def test_balance_queries_search_the_transfer_indexes(provider, sql, index):
+    plan = explain_query_plan(sql, BALANCE_PARAMS, provider.connection())
+
+    assert_uses_indexes(plan, "Transfers")
+    assert any(f"IX_Transfers_From_{index}" in step for step in plan), plan
+    assert any(f"IX_Transfers_To_{index}" in step for step in plan), plan
+
+
+def test_checkpoint_lookup_searches_the_primary_key(provider):
+    plan = explain_query_plan(BALANCE_CHECKPOINT_SQL, BALANCE_PARAMS, provider.connection())
+
+    assert plan == ["SEARCH BalanceCheckpoints USING PRIMARY KEY (AccountNumber=? AND TransferSequence<?)"]
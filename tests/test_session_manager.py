@@ -0,0 +1,91 @@
+"""Per-user sessions: eviction races, the user every tool call runs as and transfer idempotency keys."""
+import asyncio
+
+import pytest
+
+from chatbot.logger import request_id_context, request_id_from_header
+from chatbot.mcp.client_sse import InteractiveBankingAssistant
+from chatbot.session_manager import SessionManager
+
+
+class FakeAssistant:
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.closed = False
+
+    async def initialize_session(self):
+        await asyncio.sleep(0.02)
+
+    async def close_session(self):
+        self.closed = True
+
+    async def send_message(self, message):
+        assert not self.closed, "message handled by a closed assistant"
+        return message
+
+
+class FakePool:
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, name, args):
+        self.calls.append((name, args))
+        return None
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {}
+
+
+def test_message_waiting_on_evicted_session_gets_a_fresh_one():
+    async def scenario():
+        manager = SessionManager(max_sessions=1, factory=FakeAssistant, pool=FakePool())
+        # Takes alice's session and waits for it to connect...
+        waiting = asyncio.ensure_future(manager.send_message("alice", "hello"))
+        await asyncio.sleep(0)
+        # ...while bob's first message evicts it, queueing its close on the lock first
+        await manager.send_message("bob", "hi")
+        return await waiting
+
+    assert asyncio.run(scenario()) == "hello"
+
+
+def test_web_session_tools_always_run_as_the_session_user():
+    pool = FakePool()
+    assistant = InteractiveBankingAssistant(user_id="alice", pool=pool, allow_user_switch=False)
+
+    assistant._local_reply("user mallory")
+    asyncio.run(assistant._execute_function_call(
+        "list_user_accounts", {"user_id": "mallory"}))
+
+    assert assistant.user_id == "alice"
+    assert pool.calls == [("list_user_accounts", {"user_id": "alice"})]
+
+
+def test_transfer_keys_name_the_call_not_how_the_amount_is_written():
+    pool = FakePool()
+    assistant = InteractiveBankingAssistant(user_id="alice", pool=pool, allow_user_switch=False)
+
+    async def turn(amount):
+        with request_id_context("req-1"):
+            for index in range(2):
+                await assistant._execute_function_call(
+                    "transfer_funds", {"from_account": "1", "to_account": "2", "amount": amount}, index)
+
+    asyncio.run(turn("50.0"))
+    asyncio.run(turn("$50"))
+    keys = [args["idempotency_key"] for _, args in pool.calls]
+    assert keys == ["chat:req-1:0", "chat:req-1:1"] * 2
+
+
+@pytest.mark.parametrize("header", [None, "", "a" * 65, "id\nforged log line", "id with spaces", "ü"])
+def test_malformed_request_ids_are_replaced(header):
+    request_id = request_id_from_header(header)
+    assert request_id != header and request_id_from_header(request_id) == request_id
+
+
+def test_well_formed_request_ids_are_kept():
+    assert request_id_from_header("retry-1.A_b") == "retry-1.A_b"
+    assert request_id_from_header("a" * 64) == "a" * 64
@@ -0,0 +1,151 @@
+"""Transfers on a scratch database: overdrafts under contention, group commit and idempotency keys."""
+import sqlite3
+import threading
+from decimal import Decimal
+
+import pytest
+
+from chatbot.database import IdempotencyKeyConflict, apply_transfer, apply_transfers
+from chatbot.db_connection import ConnectionProvider, adapt_money
+from chatbot.models import Transfer
+from chatbot.write_queue import WriteQueue
+
+# test1's seeded accounts; the credit card starts at 500.00
+CHEQUING, SAVING, CREDIT = "1234567890", "2345678901", "3456789012"
+
+
+def balance(provider, account_number):
+    return provider.connection().execute(
+        "SELECT Balance FROM Accounts WHERE AccountNumber=?", (account_number,)).fetchone()[0]
+
+
+def transfer_many(provider, transfers, user_id="test1"):
+    with provider.transaction("IMMEDIATE") as con:
+        return apply_transfers(con, user_id, transfers)
+
+
+def total(provider):
+    return sum(balance(provider, account) for account in (CHEQUING, SAVING, CREDIT))
+
+
+def run_concurrently(transfer, threads: int, per_thread: int) -> list:
+    """Call ``transfer()`` from many threads at once; return what each call raised, or None."""
+    outcomes, lock, start = [], threading.Lock(), threading.Barrier(threads)
+
+    def worker():
+        start.wait()
+        for _ in range(per_thread):
+            try:
+                transfer()
+                outcome = None
+            except ValueError as e:
+                outcome = e
+            with lock:
+                outcomes.append(outcome)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return outcomes
+
+
+@pytest.mark.parametrize("mode", ["immediate", "group", "batch"])
+def test_concurrent_transfers_never_overdraw(provider, mode):
+    amount = Decimal("30.00")
+    if mode == "immediate":
+        writers = ConnectionProvider(provider.db_file, busy_timeout_ms=30000)
+
+        def transfer():
+            with writers.transaction("IMMEDIATE") as con:
+                apply_transfer(con, "test1", CREDIT, CHEQUING, amount)
+    elif mode == "group":
+        queue = WriteQueue(provider, window_ms=5)
+
+        def transfer():
+            queue.run(apply_transfer, "test1", CREDIT, CHEQUING, amount)
+    else:
+        # The path the transfer_funds and transfer_many tools take
+        queue = WriteQueue(provider, window_ms=5)
+
+        def transfer():
+            queue.run(apply_transfers, "test1", [Transfer(CREDIT, CHEQUING, amount)])
+
+    before = total(provider)
+    outcomes = run_concurrently(transfer, threads=8, per_thread=5)
+
+    applied = outcomes.count(None)
+    assert applied == 16  # 500.00 covers 16 transfers of 30.00
+    assert all(str(e) == f"Insufficient funds in account {CREDIT}." for e in outcomes if e is not None)
+    assert balance(provider, CREDIT) == Decimal("500.00") - applied * amount == Decimal("20.00")
+    assert total(provider) == before
+
+
+def test_failed_write_in_a_group_rolls_back_only_itself(provider):
+    queue = WriteQueue(provider, window_ms=200)
+    first = queue.submit(apply_transfer, "test1", CHEQUING, SAVING, Decimal("1.00"))
+    # Debits chequing, then fails on the unknown destination
+    failing = queue.submit(apply_transfer, "test1", CHEQUING, "9999999999", Decimal("2.00"))
+    last = queue.submit(apply_transfer, "test1", CHEQUING, CREDIT, Decimal("4.00"))
+
+    assert first.result(timeout=5) and last.result(timeout=5)
+    with pytest.raises(ValueError, match="Account 9999999999 not found"):
+        failing.result(timeout=5)
+    assert balance(provider, CHEQUING) == Decimal("99995.00")
+    assert balance(provider, SAVING) == Decimal("100001.00")
+    assert balance(provider, CREDIT) == Decimal("504.00")
+    transfers = provider.connection().execute("SELECT COUNT(*) FROM Transfers").fetchone()[0]
+    assert transfers == 2
+
+
+def test_cents_round_trip_exactly(provider):
+    with provider.transaction("IMMEDIATE") as con:
+        for _ in range(3):
+            apply_transfer(con, "test1", CHEQUING, SAVING, Decimal("0.10"))
+
+    row = provider.connection().execute(
+        "SELECT Amount, FromAccountBalance, ToAccountBalance FROM Transfers "
+        "ORDER BY FromAccountBalance LIMIT 1").fetchone()
+    assert tuple(row) == (Decimal("0.10"), Decimal("99999.70"), Decimal("100000.30"))
+    assert balance(provider, SAVING) == Decimal("100000.30")
+    assert provider.connection().execute(
+        "SELECT typeof(Balance), Balance FROM Accounts WHERE AccountNumber=?", (SAVING,)).fetchone()[0] == "integer"
+
+
+def test_only_money_parameters_are_bound_as_cents(provider):
+    assert adapt_money(Decimal("1.50")) == 150
+    with pytest.raises(ValueError, match="fraction of a cent"):
+        adapt_money(Decimal("0.005"))
+    # With no process-wide Decimal adapter, a Decimal bound anywhere else is refused, not scaled
+    with pytest.raises(sqlite3.ProgrammingError):
+        provider.connection().execute("SELECT ?", (Decimal("1.50"),))
+
+
+def test_retry_with_the_same_key_is_reported_as_a_duplicate(provider):
+    first, = transfer_many(provider, [Transfer(CHEQUING, SAVING, Decimal("10"), "key-1")])
+    retry, = transfer_many(provider, [Transfer(CHEQUING, SAVING, Decimal("10.00"), "key-1")])
+
+    assert retry.duplicate and retry.transaction_id == first.transaction_id
+    assert balance(provider, CHEQUING) == Decimal("99990.00")
+
+
+def test_key_reused_for_a_different_transfer_is_a_conflict(provider):
+    transfer_many(provider, [Transfer(CHEQUING, SAVING, Decimal("10"), "key-1")])
+
+    with pytest.raises(IdempotencyKeyConflict):
+        transfer_many(provider, [Transfer(CHEQUING, SAVING, Decimal("20"), "key-1")])
+    with pytest.raises(IdempotencyKeyConflict):
+        transfer_many(provider, [Transfer(SAVING, CHEQUING, Decimal("5"), "key-2"),
+                                 Transfer(SAVING, CHEQUING, Decimal("6"), "key-2")])
+
+    assert balance(provider, CHEQUING) == Decimal("99990.00")
+    assert balance(provider, SAVING) == Decimal("100010.00")
+
+
+def test_keys_are_scoped_to_their_owner(provider):
+    transfer_many(provider, [Transfer(CHEQUING, SAVING, Decimal("10"), "key-1")])
+    outcome, = transfer_many(provider, [Transfer("4567890123", "5678901234", Decimal("20"), "key-1")],
+                             user_id="test2")
+
+    assert not outcome.duplicate